@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for PDF Manager
+Generates synthetic corpora locally and times the engine operations end to
+end, so throughput and memory can be compared between releases:
+- small: many two-page text PDFs
+- huge: a few PDFs with thousands of pages
+- images: PDFs made of large, distinct raster images
+- decks: PPTX decks built from one template (shared logo and font), plus
+  PDFs that share their logo stream the way converted decks do
+
+Each case runs in a fresh process and records wall time, pages/sec and peak
+RSS.  Results can be saved as a baseline and later runs compared against it;
+the exit status is non-zero when a case regresses beyond the tolerance.
+
+Usage:
+    python pdf_bench.py [--scale 0.2] [--save-baseline bench.json]
+    python pdf_bench.py --baseline bench.json [--tolerance 0.15]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import (DecodedStreamObject, DictionaryObject, EncodedStreamObject,
+                            NameObject, NumberObject)
+
+import pdf_engine
+import pdf_io
+import pdf_probe
+from pdf_compact import CompactOptions
+from pdf_preflight import PreflightOptions
+from pdf_stream import peak_rss_bytes
+
+DEFAULT_TOLERANCE = 0.15
+
+# Bumped whenever the generated corpora change, so stale ones are rebuilt
+CORPUS_VERSION = 1
+
+PAGE_SIZE = (612, 792)
+
+
+@dataclass
+class CaseResult:
+    name: str
+    wall_seconds: float = 0.0
+    pages: int = 0
+    peak_rss_bytes: Optional[int] = None
+    skipped: str = ""
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.wall_seconds if self.wall_seconds else 0.0
+
+
+# Corpora
+def _text_pdf(path: str, pages: int, tag: str) -> None:
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    }))
+    for i in range(pages):
+        writer.add_blank_page(*PAGE_SIZE)
+        page = writer.pages[-1]
+        content = DecodedStreamObject()
+        lines = " ".join(f"0 -14 Td ({tag} page {i + 1} line {n}) Tj" for n in range(40))
+        content.set_data(f"BT /F1 11 Tf 72 740 Td {lines} ET".encode('ascii'))
+        page[NameObject('/Contents')] = writer._add_object(content)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font}),
+        })
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _image_pdf(path: str, pages: int, seed: int) -> None:
+    from PIL import Image
+
+    rng = random.Random(seed)
+    images = [Image.frombytes('RGB', (1200, 900), rng.randbytes(1200 * 900 * 3))
+              for _ in range(pages)]
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=150)
+
+
+def _logo_bytes() -> bytes:
+    return bytes(range(256)) * 1600  # 640x640 grayscale gradient
+
+
+def _deck_pdf(path: str, pages: int, tag: str) -> None:
+    writer = PdfWriter()
+    logo = EncodedStreamObject()
+    logo._data = zlib.compress(_logo_bytes())
+    logo.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Image'),
+        NameObject('/Width'): NumberObject(640),
+        NameObject('/Height'): NumberObject(640),
+        NameObject('/ColorSpace'): NameObject('/DeviceGray'),
+        NameObject('/BitsPerComponent'): NumberObject(8),
+        NameObject('/Filter'): NameObject('/FlateDecode'),
+    })
+    logo_ref = writer._add_object(logo)
+    for i in range(pages):
+        writer.add_blank_page(*PAGE_SIZE)
+        page = writer.pages[-1]
+        content = DecodedStreamObject()
+        content.set_data(f"q 120 0 0 120 40 640 cm /Logo Do Q % {tag} slide {i + 1}".encode('ascii'))
+        page[NameObject('/Contents')] = writer._add_object(content)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/XObject'): DictionaryObject({NameObject('/Logo'): logo_ref}),
+        })
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _deck_pptx(path: str, slides: int, tag: str, logo_png: str) -> None:
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]
+    for i in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"{tag} slide {i + 1}"
+        body = slide.placeholders[1].text_frame
+        body.text = "Quarterly figures"
+        for n in range(4):
+            run = body.add_paragraph().add_run()
+            run.text = f"Point {n + 1} of slide {i + 1}"
+            run.font.name = "DejaVu Sans"
+            run.font.size = Pt(20)
+        slide.shapes.add_picture(logo_png, Inches(8.5), Inches(0.2), width=Inches(1.2))
+    presentation.save(path)
+
+
+def build_corpus(root: str, scale: float = 1.0) -> Dict[str, List[str]]:
+    """Generate (or reuse) the corpora under ``root``; returns files by corpus"""
+    def count(n: int) -> int:
+        return max(1, int(n * scale))
+
+    manifest_path = os.path.join(root, "corpus.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == CORPUS_VERSION and manifest.get("scale") == scale:
+            return manifest["files"]
+
+    files: Dict[str, List[str]] = {"small": [], "huge": [], "images": [], "decks": [], "deck_pdfs": []}
+    for name in files:
+        os.makedirs(os.path.join(root, name), exist_ok=True)
+
+    for i in range(count(300)):
+        path = os.path.join(root, "small", f"small_{i:04d}.pdf")
+        _text_pdf(path, 2, f"S{i}")
+        files["small"].append(path)
+    for i in range(3):
+        path = os.path.join(root, "huge", f"huge_{i}.pdf")
+        _text_pdf(path, count(3000), f"H{i}")
+        files["huge"].append(path)
+    for i in range(count(10)):
+        path = os.path.join(root, "images", f"images_{i:02d}.pdf")
+        _image_pdf(path, 4, seed=i)
+        files["images"].append(path)
+
+    from PIL import Image
+    logo_png = os.path.join(root, "decks", "logo.png")
+    Image.frombytes('L', (640, 640), _logo_bytes()).save(logo_png)
+    for i in range(count(12)):
+        pptx_path = os.path.join(root, "decks", f"deck_{i:02d}.pptx")
+        _deck_pptx(pptx_path, 10, f"Deck {i}", logo_png)
+        files["decks"].append(pptx_path)
+        pdf_path = os.path.join(root, "deck_pdfs", f"deck_{i:02d}.pdf")
+        _deck_pdf(pdf_path, 10, f"Deck {i}")
+        files["deck_pdfs"].append(pdf_path)
+
+    with open(manifest_path, 'w') as f:
+        json.dump({"version": CORPUS_VERSION, "scale": scale, "files": files}, f, indent=2)
+    return files
+
+
+# Cases: each takes (corpus, scratch dir) and returns the number of pages processed
+def _open_huge(corpus: Dict[str, List[str]], out: str) -> int:
+    return sum(pdf_probe.page_count(source) for source in corpus["huge"])
+
+
+def _slice_huge(corpus: Dict[str, List[str]], out: str, **options: Any) -> int:
+    source = corpus["huge"][0]
+    total = pdf_probe.page_count(source)
+    return pdf_engine.slice(source, os.path.join(out, "slice.pdf"),
+                            [f"1-{total // 2}", f"{total // 2 + 1}-{total}"], **options).pages_written
+
+
+def _slice_huge_compact(corpus: Dict[str, List[str]], out: str) -> int:
+    return _slice_huge(corpus, out, compact=CompactOptions())
+
+
+def _split_huge(corpus: Dict[str, List[str]], out: str) -> int:
+    return pdf_engine.split(corpus["huge"][0], os.path.join(out, "split"),
+                            mode='every', every=100).pages_written
+
+
+def _merge(corpus_name: str, **options: Any) -> Callable[[Dict[str, List[str]], str], int]:
+    def run(corpus: Dict[str, List[str]], out: str) -> int:
+        return pdf_engine.merge(corpus[corpus_name], os.path.join(out, "merge.pdf"),
+                                **options).pages_written
+    return run
+
+
+def _remerge(corpus_name: str) -> Callable[[Dict[str, List[str]], str], int]:
+    """Incremental re-merge after one input in the middle of the list changed"""
+    def inputs(corpus: Dict[str, List[str]], out: str) -> List[str]:
+        return [os.path.join(out, "in", f"{i:05d}.pdf") for i in range(len(corpus[corpus_name]))]
+
+    def setup(corpus: Dict[str, List[str]], out: str) -> None:
+        copies = inputs(corpus, out)
+        os.makedirs(os.path.dirname(copies[0]))
+        for source, copy in zip(corpus[corpus_name], copies):
+            shutil.copyfile(source, copy)
+        pdf_engine.merge(copies, os.path.join(out, "merge.pdf"), incremental=True)
+        with open(copies[len(copies) // 2], 'ab') as f:
+            f.write(b"\n% changed\n")
+
+    def run(corpus: Dict[str, List[str]], out: str) -> int:
+        return pdf_engine.merge(inputs(corpus, out), os.path.join(out, "merge.pdf"),
+                                incremental=True).pages_written
+
+    run.setup = setup  # untimed, see _run_case
+    return run
+
+
+def _buffered(case: Callable[[Dict[str, List[str]], str], int]) -> Callable[[Dict[str, List[str]], str], int]:
+    """``case`` with inputs read into memory instead of memory-mapped (pdf_io)"""
+    def run(corpus: Dict[str, List[str]], out: str) -> int:
+        pdf_io.USE_MMAP = False  # each case has its own process
+        return case(corpus, out)
+    return run
+
+
+def _convert_decks(engine: str) -> Callable[[Dict[str, List[str]], str], int]:
+    def run(corpus: Dict[str, List[str]], out: str) -> int:
+        result = pdf_engine.convert(corpus["decks"], os.path.join(out, "decks.pdf"), cache=False,
+                                    engine=engine)
+        return pdf_probe.page_count(result.output_file)
+    return run
+
+
+CASES: Dict[str, Callable[[Dict[str, List[str]], str], int]] = {
+    "open_huge": _open_huge,
+    "open_huge_buffered": _buffered(_open_huge),
+    "slice_huge": _slice_huge,
+    "slice_huge_buffered": _buffered(_slice_huge),
+    "slice_huge_compact": _slice_huge_compact,
+    "split_huge_every_100": _split_huge,
+    "split_huge_every_100_buffered": _buffered(_split_huge),
+    "merge_small": _merge("small"),
+    "merge_small_streaming": _merge("small", streaming=True),
+    "merge_small_compact": _merge("small", compact=CompactOptions()),
+    "merge_small_preflight": _merge("small", preflight=PreflightOptions()),
+    "merge_huge": _merge("huge"),
+    "merge_huge_streaming": _merge("huge", streaming=True),
+    "merge_huge_streaming_buffered": _buffered(_merge("huge", streaming=True)),
+    "merge_huge_preflight": _merge("huge", preflight=PreflightOptions()),
+    "merge_images": _merge("images"),
+    "remerge_small_one_changed": _remerge("small"),
+    "remerge_huge_one_changed": _remerge("huge"),
+    "merge_decks_dedup": _merge("deck_pdfs", dedup=True),
+    "merge_decks_streaming_dedup": _merge("deck_pdfs", streaming=True, dedup=True),
+    "convert_decks": _convert_decks("libreoffice"),
+    "convert_decks_draft": _convert_decks("draft"),
+}
+
+
+def _case_peak_rss() -> Optional[int]:
+    # ru_maxrss carries over the parent's peak through fork and exec on Linux;
+    # VmHWM belongs to this process's own address space
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return peak_rss_bytes()
+
+
+def _run_case(name: str, corpus: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Body of one benchmark process"""
+    result = CaseResult(name)
+    with tempfile.TemporaryDirectory(prefix="pdf-bench-") as out:
+        setup = getattr(CASES[name], "setup", None)
+        if setup is not None:
+            setup(corpus, out)
+        start = time.perf_counter()
+        try:
+            result.pages = CASES[name](corpus, out)
+        except pdf_engine.ConverterNotFoundError as e:
+            result.skipped = str(e)
+        result.wall_seconds = time.perf_counter() - start
+    result.peak_rss_bytes = _case_peak_rss()
+    return asdict(result)
+
+
+def run_case(name: str, corpus: Dict[str, List[str]]) -> CaseResult:
+    """Run one case in a fresh process, so peak RSS covers that case alone"""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return CaseResult(**pool.apply(_run_case, (name, corpus)))
+
+
+# Baselines
+def compare(results: List[CaseResult], baseline: Dict[str, Any],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Describe every case that is slower or uses more memory than the baseline"""
+    regressions = []
+    previous = {case["name"]: case for case in baseline.get("cases", [])}
+    for result in results:
+        before = previous.get(result.name)
+        if result.skipped or before is None or before.get("skipped"):
+            continue
+        if result.wall_seconds > before["wall_seconds"] * (1 + tolerance):
+            regressions.append(f"{result.name}: {result.wall_seconds:.2f}s "
+                               f"(baseline {before['wall_seconds']:.2f}s)")
+        if (result.peak_rss_bytes and before.get("peak_rss_bytes")
+                and result.peak_rss_bytes > before["peak_rss_bytes"] * (1 + tolerance)):
+            regressions.append(f"{result.name}: peak RSS {result.peak_rss_bytes / 2**20:.0f} MB "
+                               f"(baseline {before['peak_rss_bytes'] / 2**20:.0f} MB)")
+    return regressions
+
+
+def _print_table(results: List[CaseResult]) -> None:
+    print(f"{'case':32} {'wall s':>8} {'pages':>7} {'pages/s':>9} {'peak MB':>8}")
+    for r in results:
+        if r.skipped:
+            print(f"{r.name:32} skipped: {r.skipped.splitlines()[0]}")
+            continue
+        rss = f"{r.peak_rss_bytes / 2**20:.0f}" if r.peak_rss_bytes else "-"
+        print(f"{r.name:32} {r.wall_seconds:8.2f} {r.pages:7d} {r.pages_per_second:9.0f} {rss:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark PDF Manager operations")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "pdf-bench-corpus"),
+                        help="where synthetic inputs are generated and reused")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply corpus sizes")
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="run only these cases (repeatable)")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown/growth before a case counts as a regression")
+    parser.add_argument("--save-baseline", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    print(f"Generating corpus in {args.corpus_dir}...")
+    corpus = build_corpus(args.corpus_dir, args.scale)
+
+    results = []
+    for name in args.case or list(CASES):
+        print(f"Running {name}...", flush=True)
+        results.append(run_case(name, corpus))
+    _print_table(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "scale": args.scale,
+                "cases": [asdict(r) for r in results],
+            }, f, indent=2)
+        print(f"Saved results to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of PPTX -> PDF conversion results
+Entries are keyed by the SHA-256 of the source file plus the converter
+identity and version, so an unchanged deck converted by the same office
+build is never rendered twice.  The cache has a size cap and evicts the
+least recently used entries; reads refresh an entry's mtime.  The total
+size is scanned once and then kept up to date as entries are stored, so
+storing does not walk the directory; eviction trims to
+``EVICT_TARGET_RATIO`` of the cap to leave room for the next entries.
+
+Writes go to a temporary file in the cache directory followed by
+``os.replace``, so concurrent workers (threads or processes) only ever see
+complete PDFs, and losing a race simply overwrites an identical entry.
+
+A conversion batch pins its keys while it runs, so eviction by this
+process (its own puts or another batch's) never deletes a PDF it is about
+to merge; the cache is trimmed once the batch releases them.  Pins are not
+seen by other processes sharing the directory (the CLI, server or
+watcher); they only protect entries by recency there, as the entries a
+batch uses were just read or written.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, Iterable, Optional
+
+import pdf_metrics
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+
+# Eviction deletes down to this fraction of max_bytes
+EVICT_TARGET_RATIO = 0.9
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pdf-manager", "conversions")
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """Content-addressed store of converted PDFs with LRU eviction"""
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        self._pins: Dict[str, int] = {}  # path -> number of batches using it
+        self._size: Optional[int] = None  # bytes stored, as of the last scan plus puts since
+        self._pinned_over = False  # the last scan could not get under the cap for pins
+
+    def key(self, input_file: str, converter_id: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(converter_id.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(file_digest(input_file).encode('ascii'))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached PDF for ``key`` (marking it recently used) or None"""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pdf_metrics.count(cache_misses=1)
+            return None
+        pdf_metrics.count(cache_hits=1)
+        return path
+
+    def pin(self, keys: Iterable[str]) -> None:
+        """Keep the entries for ``keys`` from being evicted until ``release``"""
+        with self._evict_lock:
+            for key in keys:
+                path = self.path(key)
+                self._pins[path] = self._pins.get(path, 0) + 1
+
+    def release(self, keys: Iterable[str]) -> None:
+        """Undo ``pin`` and trim the cache back to ``max_bytes``"""
+        with self._evict_lock:
+            for key in keys:
+                path = self.path(key)
+                self._pins[path] -= 1
+                if not self._pins[path]:
+                    del self._pins[path]
+            self._pinned_over = False
+        self.evict()
+
+    def put(self, key: str, pdf_file: str) -> str:
+        """Store a copy of ``pdf_file`` under ``key`` and return the cached path
+
+        A PDF larger than the whole cache is not stored; ``pdf_file`` itself
+        is returned.
+        """
+        size = os.path.getsize(pdf_file)
+        if size > self.max_bytes:
+            return pdf_file
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out, open(pdf_file, 'rb') as src:
+                shutil.copyfileobj(src, out)
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        with self._evict_lock:
+            if self._size is not None:
+                self._size += size - replaced
+            scan = self._size is None or (self._size > self.max_bytes and not self._pinned_over)
+        if scan:
+            self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Delete least recently used entries until the cache fits ``max_bytes``
+
+        Once over the cap, entries are deleted down to EVICT_TARGET_RATIO of
+        it.  Pinned entries and ``keep`` are never deleted, even if the
+        cache stays over its cap.
+        """
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    if not name.endswith('.pdf'):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue  # evicted by another process
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+
+            if total > self.max_bytes:
+                target = self.max_bytes * EVICT_TARGET_RATIO
+                for _, size, path in sorted(entries):
+                    if total <= target:
+                        break
+                    if path == keep or path in self._pins:
+                        continue
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+            self._size = total
+            self._pinned_over = total > self.max_bytes
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        with self._evict_lock:
+            self._size = 0
+            self._pinned_over = False
+
+
+_default_cache: Optional[ConversionCache] = None
+
+
+def default_cache() -> ConversionCache:
+    """The shared cache under ``default_cache_dir()``"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ConversionCache()
+    return _default_cache
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Batch command line for PDF Manager
+Runs the jobs listed in a JSON or YAML manifest without opening the GUI:
+
+    {
+      "workers": 4,
+      "jobs": [
+        {"id": "intro", "type": "slice", "input": "book.pdf",
+         "output": "out/intro.pdf", "ranges": ["1-12"], "compact": "web"},
+        {"type": "split", "input": "book.pdf", "output": "out/chapters",
+         "mode": "bookmarks", "name_template": "{index:02d}_{title}.pdf"},
+        {"type": "merge", "inputs": ["a.pdf", "b.pdf"], "output": "out/ab.pdf",
+         "streaming": false, "dedup": true, "append": false, "incremental": false,
+         "compact": true, "preflight": "repair"},
+        {"type": "convert", "inputs": ["deck1.pptx", "deck2.pptx"],
+         "output": "out/decks.pdf", "engine": "auto", "optimize": {"target_dpi": 150}},
+        {"type": "optimize", "input": "scans.pdf", "output": "out/scans.pdf",
+         "target_dpi": 120, "quality": 70, "image_format": "jpeg"}
+      ]
+    }
+
+Relative paths are resolved against the manifest's folder.  Jobs run
+concurrently; a JSON summary is printed to stdout and the exit status is 1
+if any job failed (2 if the manifest itself is invalid).  YAML manifests
+need PyYAML.  ``"compact"`` is true (object streams), ``"web"`` (also
+linearized, needs qpdf) or a mapping of CompactOptions fields;
+``"preflight"`` is true (check merge inputs first), ``"repair"`` or a
+mapping of PreflightOptions fields.
+
+Usage:
+    python pdf_cli.py manifest.json [--workers 4] [--metrics metrics.jsonl] [--profile-dir profiles]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, is_dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import pdf_engine
+import pdf_metrics
+from pdf_compact import CompactOptions
+from pdf_engine import EngineError
+from pdf_optimize import OptimizeOptions
+from pdf_preflight import PreflightOptions
+
+DEFAULT_WORKERS = 2
+
+JobSpec = Dict[str, Any]
+
+
+class ManifestError(Exception):
+    pass
+
+
+def load_document(path: str) -> Any:
+    """Parse a JSON or YAML (.yaml/.yml) file"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if path.lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ManifestError("YAML manifests require PyYAML (pip install pyyaml)")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Read a JSON or YAML (.yaml/.yml) manifest"""
+    manifest = load_document(path)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("jobs"), list):
+        raise ManifestError("The manifest must contain a list of jobs")
+    for index, job in enumerate(manifest["jobs"], 1):
+        if not isinstance(job, dict):
+            raise ManifestError(f"Job {index} is not a mapping")
+        job.setdefault("id", f"job-{index}")
+    return manifest
+
+
+def _path(base_dir: str, value: Optional[str]) -> Optional[str]:
+    if not value:
+        return value
+    return os.path.join(base_dir, os.path.expanduser(value))
+
+
+def _output(base_dir: str, value: Optional[str]) -> Optional[str]:
+    """Resolve an output file path, creating its folder"""
+    path = _path(base_dir, value)
+    if path and os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def _paths(base_dir: str, values: Any) -> List[str]:
+    if not isinstance(values, list):
+        raise EngineError("'inputs' must be a list of files")
+    return [_path(base_dir, value) for value in values]
+
+
+def _optimize_options(job: JobSpec) -> Optional[OptimizeOptions]:
+    """``"optimize": true`` or a mapping of OptimizeOptions fields"""
+    value = job.get("optimize")
+    if not value:
+        return None
+    if value is True:
+        return OptimizeOptions()
+    if not isinstance(value, dict):
+        raise EngineError("'optimize' must be true or a mapping of options")
+    try:
+        return OptimizeOptions(**value)
+    except TypeError as e:
+        raise EngineError(f"Invalid optimize options: {e}")
+
+
+def _compact_options(job: JobSpec) -> Optional[CompactOptions]:
+    """``"compact": true``, ``"web"`` (linearized too) or a mapping of CompactOptions fields"""
+    value = job.get("compact")
+    if not value:
+        return None
+    if value is True:
+        return CompactOptions()
+    if value == "web":
+        return CompactOptions(linearize=True)
+    if not isinstance(value, dict):
+        raise EngineError("'compact' must be true, \"web\" or a mapping of options")
+    try:
+        return CompactOptions(**value)
+    except TypeError as e:
+        raise EngineError(f"Invalid compact options: {e}")
+
+
+def _preflight_options(job: JobSpec) -> Optional[PreflightOptions]:
+    """``"preflight": true``, ``"repair"`` or a mapping of PreflightOptions fields"""
+    value = job.get("preflight")
+    if not value:
+        return None
+    if value is True:
+        return PreflightOptions()
+    if value == "repair":
+        return PreflightOptions(repair=True)
+    if not isinstance(value, dict):
+        raise EngineError("'preflight' must be true, \"repair\" or a mapping of options")
+    try:
+        return PreflightOptions(**value)
+    except TypeError as e:
+        raise EngineError(f"Invalid preflight options: {e}")
+
+
+def _run_slice(job: JobSpec, base_dir: str, **hooks: Any) -> Any:
+    return pdf_engine.slice(_path(base_dir, job.get("input")), _output(base_dir, job.get("output")),
+                            job.get("ranges") or [], append=bool(job.get("append", False)),
+                            compact=_compact_options(job), **hooks)
+
+
+def _run_split(job: JobSpec, base_dir: str, **hooks: Any) -> Any:
+    return pdf_engine.split(_path(base_dir, job.get("input")), _path(base_dir, job.get("output")),
+                            mode=job.get("mode", "ranges"), ranges=job.get("ranges"),
+                            every=job.get("every"),
+                            name_template=job.get("name_template", pdf_engine.DEFAULT_NAME_TEMPLATE),
+                            workers=job.get("workers"), **hooks)
+
+
+def _run_merge(job: JobSpec, base_dir: str, **hooks: Any) -> Any:
+    return pdf_engine.merge(_paths(base_dir, job.get("inputs")), _output(base_dir, job.get("output")),
+                            streaming=bool(job.get("streaming", False)),
+                            dedup=bool(job.get("dedup", False)),
+                            append=bool(job.get("append", False)),
+                            optimize=_optimize_options(job),
+                            compact=_compact_options(job),
+                            preflight=_preflight_options(job),
+                            incremental=bool(job.get("incremental", False)), **hooks)
+
+
+def _run_convert(job: JobSpec, base_dir: str, **hooks: Any) -> Any:
+    return pdf_engine.convert(_paths(base_dir, job.get("inputs")), _output(base_dir, job.get("output")),
+                              cache=bool(job.get("cache", True)),
+                              dedup=bool(job.get("dedup", False)),
+                              optimize=_optimize_options(job),
+                              compact=_compact_options(job),
+                              engine=job.get("engine", "auto"), **hooks)
+
+
+def _run_optimize(job: JobSpec, base_dir: str, **hooks: Any) -> Any:
+    options = {key: job[key] for key in ("target_dpi", "quality", "image_format") if key in job}
+    return pdf_engine.optimize_images(_path(base_dir, job.get("input")),
+                                      _output(base_dir, job.get("output")), **options, **hooks)
+
+
+JOB_TYPES: Dict[str, Callable[..., Any]] = {
+    "slice": _run_slice,
+    "split": _run_split,
+    "merge": _run_merge,
+    "convert": _run_convert,
+    "optimize": _run_optimize,
+}
+
+
+def run_job(job: JobSpec, base_dir: str = "", progress: Optional[pdf_engine.ProgressCallback] = None,
+            cancel: Optional[threading.Event] = None) -> Any:
+    """Run one manifest job through pdf_engine and return the engine's result"""
+    runner = JOB_TYPES.get(job.get("type"))
+    if runner is None:
+        raise EngineError(f"Unknown job type: {job.get('type')!r} "
+                          f"(expected one of {', '.join(JOB_TYPES)})")
+    return runner(job, base_dir, progress=progress, cancel=cancel)
+
+
+def _summarize(job: JobSpec, started: float, result: Any = None,
+               error: Optional[BaseException] = None) -> Dict[str, Any]:
+    summary = {
+        "id": job["id"],
+        "type": job.get("type"),
+        "status": "failed" if error is not None else "ok",
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    if error is not None:
+        summary["error"] = str(error) or type(error).__name__
+    elif is_dataclass(result):
+        summary["result"] = asdict(result)
+    return summary
+
+
+def run_manifest(manifest: Dict[str, Any], base_dir: str = "", workers: Optional[int] = None,
+                 on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """Run every job concurrently; returns one summary per job, in manifest order"""
+    jobs = manifest["jobs"]
+    workers = max(1, workers or manifest.get("workers") or DEFAULT_WORKERS)
+
+    def run(job: JobSpec) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return _summarize(job, started, result=run_job(job, base_dir))
+        except Exception as e:
+            return _summarize(job, started, error=e)
+
+    summaries: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-batch") as executor:
+        futures = {executor.submit(run, job): index for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            summary = summaries[futures[future]] = future.result()
+            if on_done is not None:
+                on_done(summary)
+    return summaries
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run PDF Manager jobs from a manifest")
+    parser.add_argument("manifest", help="JSON or YAML job manifest")
+    parser.add_argument("--workers", type=int, help="jobs run at once (overrides the manifest)")
+    parser.add_argument("--quiet", action="store_true", help="no per-job lines on stderr")
+    parser.add_argument("--metrics", metavar="FILE", help="append JSON-lines timings of each job to FILE")
+    parser.add_argument("--profile-dir", metavar="DIR", help="write a cProfile dump of each job to DIR")
+    args = parser.parse_args(argv)
+    if args.metrics or args.profile_dir:
+        pdf_metrics.configure(args.metrics, args.profile_dir)
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError, ManifestError) as e:
+        print(f"Invalid manifest: {e}", file=sys.stderr)
+        return 2
+
+    def report(summary: Dict[str, Any]) -> None:
+        if not args.quiet:
+            detail = summary.get("error", f"{summary['seconds']}s").splitlines()[0]
+            print(f"[{summary['status']}] {summary['id']} ({summary['type']}): {detail}",
+                  file=sys.stderr, flush=True)
+
+    base_dir = os.path.dirname(os.path.abspath(args.manifest))
+    summaries = run_manifest(manifest, base_dir, args.workers, on_done=report)
+    failed = sum(1 for summary in summaries if summary["status"] != "ok")
+    json.dump({"jobs": summaries, "succeeded": len(summaries) - failed, "failed": failed},
+              sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
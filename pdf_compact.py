@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Compact PDF output for PDF Manager
+PyPDF2 writes every object on its own with a classic cross-reference
+table, which adds up for documents with many pages: each page, annotation
+and font dictionary costs its own uncompressed ``n 0 obj`` block and a
+20-byte xref line.  ``compact_pdf`` rewrites a finished file with:
+
+- object streams: non-stream objects packed ``OBJECTS_PER_STREAM`` at a
+  time into Flate-compressed /ObjStm streams
+- a compressed cross-reference stream instead of the xref table
+- Flate compression of streams stored without any filter
+- only objects reachable from the document catalog and info dictionary,
+  which drops pages left behind by incremental updates
+
+Object numbers are kept, so nothing inside the objects is rewritten.
+
+Linearization ("fast web view", first page displayable before the whole
+file has downloaded) needs hint tables that are only worth getting from a
+dedicated tool: it is done by ``qpdf`` when that is installed.
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from PyPDF2.generic import (ArrayObject, DictionaryObject, EncodedStreamObject, IndirectObject,
+                            NameObject, NumberObject, StreamObject)
+
+from pdf_io import open_reader, replacing
+from pdf_stream import write_xref_stream
+
+PDF_HEADER = b"%PDF-1.7\n%\xE2\xE3\xCF\xD3\n"
+
+# Objects per object stream; larger streams compress better but must be
+# decompressed whole to read any one object
+OBJECTS_PER_STREAM = 100
+
+# Drop the reader's parsed-object cache once it holds this many objects
+READER_CACHE_LIMIT = 5000
+
+QPDF_TIMEOUT_SECONDS = 600
+
+QPDF_MISSING_MESSAGE = (
+    "Fast web view (linearization) requires qpdf:\n"
+    "- Ubuntu/Debian: sudo apt-get install qpdf\n"
+    "- Mac: brew install qpdf\n"
+    "- Windows: https://github.com/qpdf/qpdf/releases"
+)
+
+ObjectKey = Tuple[int, int]
+
+
+class CompactCancelled(Exception):
+    pass
+
+
+class QpdfNotFoundError(Exception):
+    pass
+
+
+@dataclass
+class CompactOptions:
+    object_streams: bool = True  # object streams and a cross-reference stream
+    linearize: bool = False  # fast web view, through qpdf
+
+
+@dataclass
+class CompactResult:
+    output_file: str
+    original_bytes: int
+    compacted_bytes: int
+    seconds: float = 0.0
+    objects_packed: int = 0  # objects moved into object streams
+    linearized: bool = False
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.compacted_bytes
+
+
+def find_qpdf() -> Optional[str]:
+    return shutil.which('qpdf')
+
+
+def compact_pdf(input_file: str, output_file: Optional[str] = None,
+                options: Optional[CompactOptions] = None,
+                progress: Optional[Callable[[int, int, str], None]] = None,
+                cancel: Optional[threading.Event] = None) -> CompactResult:
+    """Rewrite ``input_file`` with object streams and/or linearized
+
+    The result goes to ``output_file`` (by default ``input_file`` is
+    replaced).  Raises QpdfNotFoundError when linearization is asked for
+    without qpdf installed.
+    """
+    options = options or CompactOptions()
+    output_file = output_file or input_file
+    qpdf = None
+    if options.linearize:
+        qpdf = find_qpdf()
+        if qpdf is None:
+            raise QpdfNotFoundError(QPDF_MISSING_MESSAGE)
+
+    started = time.perf_counter()
+    result = CompactResult(output_file, os.path.getsize(input_file), 0)
+    if qpdf is None and not options.object_streams:
+        if output_file != input_file:
+            shutil.copyfile(input_file, output_file)
+        result.compacted_bytes = result.original_bytes
+        return result
+    with replacing(output_file) as partial_file:
+        if qpdf is not None:
+            _linearize(qpdf, input_file, partial_file, options.object_streams)
+            result.linearized = True
+        else:
+            with open(partial_file, 'wb') as out:
+                result.objects_packed = _write_compact(input_file, out, progress, cancel)
+    result.compacted_bytes = os.path.getsize(output_file)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _linearize(qpdf: str, input_file: str, output_file: str, object_streams: bool) -> None:
+    command = [qpdf, '--linearize', f"--object-streams={'generate' if object_streams else 'preserve'}",
+               input_file, output_file]
+    completed = subprocess.run(command, capture_output=True, timeout=QPDF_TIMEOUT_SECONDS)
+    # Exit status 3 means success with warnings
+    if completed.returncode not in (0, 3):
+        message = completed.stderr.decode('utf-8', 'replace').strip()
+        raise RuntimeError(f"qpdf failed: {message or completed.returncode}")
+
+
+def _references(obj: Any) -> List[IndirectObject]:
+    """Indirect references directly inside ``obj``"""
+    found = []
+    pending = [obj]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, IndirectObject):
+            found.append(value)
+        elif isinstance(value, DictionaryObject):  # stream dictionaries included
+            pending.extend(value.values())
+        elif isinstance(value, ArrayObject):
+            pending.extend(value)
+    return found
+
+
+def _serialize(obj: Any) -> bytes:
+    buffer = io.BytesIO()
+    obj.write_to_stream(buffer, None)
+    return buffer.getvalue()
+
+
+def _flate_encoded(obj: StreamObject) -> EncodedStreamObject:
+    """``obj`` Flate-compressed, keeping its dictionary
+
+    StreamObject.flate_encode would keep only /Filter, dropping an image's
+    /Width, /ColorSpace..., a font's /Length1 or a form's /BBox.
+    """
+    encoded = EncodedStreamObject()
+    for key, value in obj.items():
+        if key not in ('/Length', '/DecodeParms'):
+            encoded[NameObject(key)] = value
+    encoded[NameObject('/Filter')] = NameObject('/FlateDecode')
+    encoded._data = zlib.compress(obj.get_data())
+    return encoded
+
+
+class _CompactWriter:
+    """Writes objects under their own numbers, packing what it can into object streams"""
+
+    def __init__(self, stream: BinaryIO, next_number: int) -> None:
+        self.stream = stream
+        self.next_number = next_number
+        # number -> (1, offset, generation) or (2, object stream number, index)
+        self.entries: Dict[int, Tuple[int, int, int]] = {}
+        self.packed: List[Tuple[int, bytes]] = []
+        self.packed_total = 0
+        stream.write(PDF_HEADER)
+
+    def write(self, key: ObjectKey, obj: Any) -> None:
+        number, generation = key
+        if isinstance(obj, StreamObject) or generation != 0:
+            if isinstance(obj, StreamObject) and '/Filter' not in obj:
+                obj = _flate_encoded(obj)
+            self._write_direct(number, generation, obj)
+            return
+        self.packed.append((number, _serialize(obj)))
+        if len(self.packed) >= OBJECTS_PER_STREAM:
+            self.flush()
+
+    def _write_direct(self, number: int, generation: int, obj: Any) -> None:
+        self.entries[number] = (1, self.stream.tell(), generation)
+        self.stream.write(f"{number} {generation} obj\n".encode('ascii'))
+        obj.write_to_stream(self.stream, None)
+        self.stream.write(b"\nendobj\n")
+
+    def flush(self) -> None:
+        """Write the objects collected so far as one object stream"""
+        if not self.packed:
+            return
+        stream_number = self.next_number
+        self.next_number += 1
+        header = []
+        body = io.BytesIO()
+        for index, (number, data) in enumerate(self.packed):
+            header.append(f"{number} {body.tell()}")
+            body.write(data)
+            body.write(b"\n")
+            self.entries[number] = (2, stream_number, index)
+        header_bytes = " ".join(header).encode('ascii') + b"\n"
+        object_stream = EncodedStreamObject()
+        object_stream[NameObject('/Type')] = NameObject('/ObjStm')
+        object_stream[NameObject('/N')] = NumberObject(len(self.packed))
+        object_stream[NameObject('/First')] = NumberObject(len(header_bytes))
+        object_stream[NameObject('/Filter')] = NameObject('/FlateDecode')
+        object_stream._data = zlib.compress(header_bytes + body.getvalue())
+        self._write_direct(stream_number, 0, object_stream)
+        self.packed_total += len(self.packed)
+        self.packed = []
+
+    def close(self, trailer: DictionaryObject) -> None:
+        """Write the cross-reference stream carrying ``trailer``'s /Root, /Info and /ID"""
+        self.flush()
+        xref_number = self.next_number
+        entries = {number: self.entries.get(number, (0, 0, 65535 if number == 0 else 0))
+                   for number in range(xref_number)}
+        xref_trailer = DictionaryObject({NameObject('/Size'): NumberObject(xref_number + 1)})
+        for key in ('/Root', '/Info', '/ID'):
+            if key in trailer:
+                xref_trailer[NameObject(key)] = trailer.raw_get(key)
+        write_xref_stream(self.stream, xref_number, entries, xref_trailer)
+
+
+def _write_compact(input_file: str, out: BinaryIO,
+                   progress: Optional[Callable[[int, int, str], None]],
+                   cancel: Optional[threading.Event]) -> int:
+    """Copy the objects reachable from the trailer of ``input_file``; returns how many were packed"""
+    reader = open_reader(input_file)
+    if reader.is_encrypted:
+        raise ValueError("Cannot compact an encrypted PDF")
+    trailer = reader.trailer
+    # Object streams are numbered above every object the file defines
+    highest = max([int(trailer.get('/Size', 1)) - 1, *reader.xref_objStm,
+                   *(number for table in reader.xref.values() for number in table)])
+    writer = _CompactWriter(out, highest + 1)
+
+    roots = [trailer.raw_get(key) for key in ('/Root', '/Info') if key in trailer]
+    pending = deque(ref for ref in roots if isinstance(ref, IndirectObject))
+    seen = {(ref.idnum, ref.generation) for ref in pending}
+    total = max(1, int(trailer.get('/Size', 1)) - 1)
+    written = 0
+    while pending:
+        ref = pending.popleft()
+        key = (ref.idnum, ref.generation)
+        obj = reader.get_object(IndirectObject(key[0], key[1], reader))
+        if obj is None:
+            continue  # a missing object reads as null; leave it out
+        for child in _references(obj):
+            child_key = (child.idnum, child.generation)
+            if child_key not in seen:
+                seen.add(child_key)
+                pending.append(child)
+        writer.write(key, obj)
+        written += 1
+        if len(reader.resolved_objects) > READER_CACHE_LIMIT:
+            reader.resolved_objects.clear()
+        if written % 1000 == 0:
+            if cancel is not None and cancel.is_set():
+                raise CompactCancelled("Compaction cancelled")
+            if progress is not None:
+                progress(min(written, total), total, f"Packed {written} objects")
+    writer.close(trailer)
+    return writer.packed_total
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+PPTX conversion backends for PDF Manager
+- find_libreoffice: locate the LibreOffice command (cached)
+- libreoffice_id / powerpoint_id: converter identity used in cache keys
+- LibreOfficePool: N concurrent headless soffice workers, one process per file
+- ResidentLibreOfficePool: N long-lived soffice listeners driven over UNO
+
+LibreOffice locks its user profile, so two soffice processes sharing the
+default profile cannot run at the same time.  Every pool worker therefore
+gets its own ``-env:UserInstallation`` directory, which is kept for the life
+of the pool so only the first conversion per worker pays profile creation.
+
+The resident pool goes further and keeps each soffice running between
+conversions, so a warm conversion costs only the render time.  It needs the
+``uno`` module that ships with LibreOffice (python3-uno on Debian/Ubuntu);
+without it callers fall back to LibreOfficePool.
+"""
+
+import atexit
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+LIBREOFFICE_COMMANDS = ['libreoffice', 'soffice']
+
+# Per-file limit before a stuck soffice process is killed
+DEFAULT_TIMEOUT_SECONDS = 300
+
+# How often a running soffice process is checked for cancellation
+CANCEL_POLL_SECONDS = 0.2
+
+# How long a resident soffice may take to start accepting UNO connections
+OFFICE_START_TIMEOUT_SECONDS = 60
+
+# How long a resident soffice gets to shut down when asked over UNO (pool
+# shutdown) or with SIGTERM (hung or cancelled), before it is killed
+OFFICE_STOP_TIMEOUT_SECONDS = 5
+
+# Export filter used when storing presentations through UNO
+IMPRESS_PDF_FILTER = "impress_pdf_Export"
+
+_libreoffice_cmd = None
+_libreoffice_version = None
+_libreoffice_lock = threading.Lock()
+
+
+class ConversionError(Exception):
+    """Raised when a document could not be converted"""
+
+
+class ConversionCancelled(ConversionError):
+    """Raised when a conversion is stopped through its cancel event"""
+
+
+def default_workers() -> int:
+    """One soffice worker per CPU"""
+    return os.cpu_count() or 1
+
+
+def _probe_libreoffice() -> Tuple[Optional[str], Optional[str]]:
+    for cmd in LIBREOFFICE_COMMANDS:
+        path = shutil.which(cmd)
+        if path is None:
+            continue
+        try:
+            result = subprocess.run([path, '--version'], capture_output=True, text=True, check=True)
+            return path, result.stdout.strip()
+        except (subprocess.CalledProcessError, OSError):
+            continue
+    return None, None
+
+
+def find_libreoffice(refresh: bool = False) -> Optional[str]:
+    """Return the first LibreOffice command that answers ``--version``
+
+    The result is remembered for the life of the process; a miss is not, so
+    installing LibreOffice while the app is open still works.
+    """
+    global _libreoffice_cmd, _libreoffice_version
+    with _libreoffice_lock:
+        if _libreoffice_cmd is None or refresh:
+            _libreoffice_cmd, _libreoffice_version = _probe_libreoffice()
+        return _libreoffice_cmd
+
+
+def libreoffice_id(libreoffice_cmd: str) -> str:
+    """Identity and version of a LibreOffice command, e.g. for cache keys"""
+    if libreoffice_cmd == find_libreoffice():
+        version = _libreoffice_version
+    else:
+        result = subprocess.run([libreoffice_cmd, '--version'], capture_output=True, text=True)
+        version = result.stdout.strip()
+    return f"libreoffice:{version or libreoffice_cmd}"
+
+
+def powerpoint_id() -> str:
+    """Identity and version of the registered PowerPoint COM server"""
+    try:
+        import winreg
+
+        with winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, r"PowerPoint.Application\CurVer") as key:
+            version = winreg.QueryValue(key, None)
+    except (ImportError, OSError):
+        version = "unknown"
+    return f"powerpoint:{version}"
+
+
+def resident_available() -> bool:
+    """True when the LibreOffice UNO bridge can be imported"""
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def run_command(cmd: List[str], cancel: Optional[threading.Event] = None,
+                timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    """subprocess.run() that kills the child on cancel or after ``timeout`` seconds"""
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    waited = 0.0
+    while True:
+        try:
+            stdout, stderr = proc.communicate(timeout=CANCEL_POLL_SECONDS)
+            return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+        except subprocess.TimeoutExpired:
+            waited += CANCEL_POLL_SECONDS
+            if cancel is not None and cancel.is_set():
+                proc.kill()
+                proc.communicate()
+                raise ConversionCancelled("Operation cancelled")
+            if timeout is not None and waited >= timeout:
+                proc.kill()
+                proc.communicate()
+                raise ConversionError(f"Timed out after {timeout:g}s")
+
+
+class LibreOfficePool:
+    """Converts documents to PDF with up to ``workers`` soffice processes at once"""
+
+    def __init__(self, libreoffice_cmd: str, workers: Optional[int] = None,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS) -> None:
+        self.libreoffice_cmd = libreoffice_cmd
+        self.workers = workers or default_workers()
+        self.timeout = timeout
+        self.profile_root = tempfile.mkdtemp(prefix="pdfmanager-lo-")
+        self.profiles: "queue.Queue[str]" = queue.Queue()
+        for i in range(self.workers):
+            self.profiles.put(os.path.join(self.profile_root, f"worker-{i}"))
+
+    def convert_one(self, input_file: str, outdir: str,
+                    cancel: Optional[threading.Event] = None,
+                    timeout: Optional[float] = None) -> str:
+        """Convert a single file into ``outdir`` and return the PDF path
+
+        ``timeout`` overrides the pool's for this conversion.
+        """
+        profile = self.profiles.get()
+        try:
+            result = run_command(
+                [self.libreoffice_cmd,
+                 f"-env:UserInstallation={Path(profile).as_uri()}",
+                 '--headless', '--convert-to', 'pdf', '--outdir', outdir, input_file],
+                cancel=cancel,
+                timeout=timeout or self.timeout
+            )
+        except ConversionCancelled:
+            raise
+        except ConversionError as e:
+            raise ConversionError(f"LibreOffice conversion of {input_file} failed: {str(e)}")
+        finally:
+            self.profiles.put(profile)
+
+        if result.returncode != 0:
+            raise ConversionError(f"LibreOffice conversion failed: {result.stderr}")
+
+        basename = os.path.splitext(os.path.basename(input_file))[0]
+        pdf_file = os.path.join(outdir, f"{basename}.pdf")
+        if not os.path.exists(pdf_file):
+            raise ConversionError(f"LibreOffice produced no PDF for {input_file}")
+        return pdf_file
+
+    def convert_all(self, input_files: Sequence[str], outdir: str,
+                    cancel: Optional[threading.Event] = None,
+                    on_done: Optional[Callable[[int, str], None]] = None,
+                    timeout: Optional[float] = None) -> List[str]:
+        """Convert ``input_files`` concurrently; PDFs are returned in input order
+
+        Each file is written to its own subdirectory of ``outdir`` so decks
+        with the same name from different folders do not overwrite each other.
+        ``on_done(index, input_file)`` is called as each conversion finishes.
+        ``timeout`` (per file) overrides the pool's for this call only.
+        """
+        # Stop the remaining workers as soon as one file fails
+        stop = threading.Event()
+
+        def work(index: int, input_file: str) -> str:
+            if stop.is_set() or (cancel is not None and cancel.is_set()):
+                raise ConversionCancelled("Operation cancelled")
+            file_outdir = os.path.join(outdir, str(index))
+            os.makedirs(file_outdir, exist_ok=True)
+            return self.convert_one(input_file, file_outdir, cancel=_AnyEvent(cancel, stop), timeout=timeout)
+
+        results: List[Optional[str]] = [None] * len(input_files)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="soffice") as executor:
+            futures = {executor.submit(work, i, f): i for i, f in enumerate(input_files)}
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    results[index] = future.result()
+                    if on_done is not None:
+                        on_done(index, input_files[index])
+            except BaseException:
+                stop.set()
+                raise
+        return results
+
+    def close(self) -> None:
+        shutil.rmtree(self.profile_root, ignore_errors=True)
+
+    def __enter__(self) -> "LibreOfficePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _AnyEvent:
+    """Read-only view that is set when any of the wrapped events is set"""
+
+    def __init__(self, *events: Optional[threading.Event]) -> None:
+        self.events = [e for e in events if e is not None]
+
+    def is_set(self) -> bool:
+        return any(e.is_set() for e in self.events)
+
+
+class OfficeProcess:
+    """One resident soffice listening on a local socket, driven over UNO
+
+    The process is started on first use and restarted whenever it has
+    exited, a UNO call fails because the bridge died, or a conversion runs
+    past its timeout or is cancelled.  A hung office is killed without any
+    UNO call, which could block as long as the office does.
+    """
+
+    def __init__(self, libreoffice_cmd: str, profile_dir: str) -> None:
+        self.libreoffice_cmd = libreoffice_cmd
+        self.profile_dir = profile_dir
+        self.proc: Optional[subprocess.Popen] = None
+        self.desktop: Any = None
+
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None and self.desktop is not None
+
+    def start(self) -> None:
+        import uno
+
+        self.kill()
+        port = _free_port()
+        connection = f"socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+        self.proc = subprocess.Popen(
+            [self.libreoffice_cmd,
+             f"-env:UserInstallation={Path(self.profile_dir).as_uri()}",
+             '--headless', '--invisible', '--nologo', '--nodefault', '--norestore',
+             f"--accept={connection}"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + OFFICE_START_TIMEOUT_SECONDS
+        while True:
+            if self.proc.poll() is not None:
+                raise ConversionError(f"LibreOffice exited during startup (code {self.proc.returncode})")
+            try:
+                context = resolver.resolve(f"uno:{connection}")
+                break
+            except Exception:
+                if time.monotonic() > deadline:
+                    self.kill()
+                    raise ConversionError("LibreOffice did not start accepting connections")
+                time.sleep(CANCEL_POLL_SECONDS)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+
+    def stop(self) -> None:
+        """Ask the office to quit over UNO, killing it if it has not within OFFICE_STOP_TIMEOUT_SECONDS"""
+        desktop, self.desktop = self.desktop, None
+        if desktop is not None and self.proc is not None and self.proc.poll() is None:
+            def terminate() -> None:
+                try:
+                    desktop.terminate()
+                except Exception:
+                    pass
+            # The UNO call itself may hang; it runs on a thread nobody waits for
+            threading.Thread(target=terminate, name="uno-terminate", daemon=True).start()
+            try:
+                self.proc.wait(OFFICE_STOP_TIMEOUT_SECONDS)
+            except subprocess.TimeoutExpired:
+                pass
+        self.kill()
+
+    def kill(self) -> None:
+        """End the process without talking to it: SIGTERM, then SIGKILL after OFFICE_STOP_TIMEOUT_SECONDS"""
+        self.desktop = None
+        if self.proc is None:
+            return
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(OFFICE_STOP_TIMEOUT_SECONDS)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.proc.wait()
+        self.proc = None
+
+    def convert(self, input_file: str, pdf_file: str, timeout: float,
+                cancel: Optional[threading.Event] = None) -> None:
+        """Render ``input_file`` to ``pdf_file``, retrying once on a crashed office"""
+        for attempt in range(2):
+            if not self.running():
+                self.start()
+            try:
+                self._convert_with_watchdog(input_file, pdf_file, timeout, cancel)
+                return
+            except ConversionError:
+                raise
+            except Exception as e:
+                crashed = self.proc is None or self.proc.poll() is not None
+                if not crashed or attempt == 1:
+                    raise ConversionError(f"LibreOffice conversion of {input_file} failed: {str(e)}")
+                # The office died under us: restart it and try the document once more
+                self.kill()
+
+    def _convert_with_watchdog(self, input_file: str, pdf_file: str, timeout: float,
+                               cancel: Optional[threading.Event]) -> None:
+        outcome: List[BaseException] = []
+
+        def work() -> None:
+            try:
+                self._store_as_pdf(input_file, pdf_file)
+            except BaseException as e:
+                outcome.append(e)
+
+        worker = threading.Thread(target=work, name="uno-convert", daemon=True)
+        worker.start()
+        waited = 0.0
+        while worker.is_alive():
+            worker.join(CANCEL_POLL_SECONDS)
+            waited += CANCEL_POLL_SECONDS
+            if cancel is not None and cancel.is_set():
+                # Killing the office unblocks the UNO call; restart on next use
+                self.kill()
+                raise ConversionCancelled("Operation cancelled")
+            if waited >= timeout and worker.is_alive():
+                self.kill()
+                raise ConversionError(f"LibreOffice conversion of {input_file} failed: Timed out after {timeout:g}s")
+        if outcome:
+            raise outcome[0]
+
+    def _store_as_pdf(self, input_file: str, pdf_file: str) -> None:
+        import uno
+
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(input_file)), "_blank", 0,
+            (_property("Hidden", True), _property("ReadOnly", True))
+        )
+        if document is None:
+            raise ConversionError(f"LibreOffice could not open {input_file}")
+        try:
+            document.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(pdf_file)),
+                (_property("FilterName", IMPRESS_PDF_FILTER),)
+            )
+        finally:
+            document.close(True)
+
+
+class ResidentLibreOfficePool(LibreOfficePool):
+    """LibreOfficePool whose workers stay running between conversions"""
+
+    def __init__(self, libreoffice_cmd: str, workers: Optional[int] = None,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS) -> None:
+        super().__init__(libreoffice_cmd, workers=workers, timeout=timeout)
+        # Last in, first out: the most recently used office, already warm, is
+        # taken next, so idle slots are only started when conversions overlap
+        self.offices: "queue.LifoQueue[OfficeProcess]" = queue.LifoQueue()
+        self.all_offices = []
+        while not self.profiles.empty():
+            office = OfficeProcess(libreoffice_cmd, self.profiles.get())
+            self.all_offices.append(office)
+            self.offices.put(office)
+
+    def convert_one(self, input_file: str, outdir: str,
+                    cancel: Optional[threading.Event] = None,
+                    timeout: Optional[float] = None) -> str:
+        basename = os.path.splitext(os.path.basename(input_file))[0]
+        pdf_file = os.path.join(outdir, f"{basename}.pdf")
+
+        office = self.offices.get()
+        try:
+            office.convert(input_file, pdf_file, timeout or self.timeout, cancel=cancel)
+        finally:
+            self.offices.put(office)
+
+        if not os.path.exists(pdf_file):
+            raise ConversionError(f"LibreOffice produced no PDF for {input_file}")
+        return pdf_file
+
+    def close(self) -> None:
+        for office in self.all_offices:
+            office.stop()
+        super().close()
+
+
+# One resident pool per (soffice binary, workers); pools are only closed at
+# shutdown, since another thread may be converting on any of them
+_resident_pools: Dict[Tuple[str, int], ResidentLibreOfficePool] = {}
+_resident_lock = threading.Lock()
+
+
+def get_resident_pool(libreoffice_cmd: str, workers: Optional[int] = None) -> ResidentLibreOfficePool:
+    """Return the process-wide resident pool for ``libreoffice_cmd`` and ``workers``, creating it on first use
+
+    Office processes inside it start lazily, so asking for CPU-count workers
+    only launches as many soffice instances as conversions actually overlap.
+    Pass the timeout to ``convert_all``; the pool is shared.
+    """
+    workers = workers or default_workers()
+    with _resident_lock:
+        pool = _resident_pools.get((libreoffice_cmd, workers))
+        if pool is None:
+            pool = _resident_pools[libreoffice_cmd, workers] = ResidentLibreOfficePool(libreoffice_cmd,
+                                                                                        workers=workers)
+        return pool
+
+
+def shutdown_resident_pool() -> None:
+    with _resident_lock:
+        for pool in _resident_pools.values():
+            pool.close()
+        _resident_pools.clear()
+
+
+atexit.register(shutdown_resident_pool)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _property(name: str, value: Any) -> Any:
+    from com.sun.star.beans import PropertyValue
+
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
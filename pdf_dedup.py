@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Stream deduplication for merged PDFs
+Decks exported from the same template each embed their own copy of the same
+fonts, logos and background images.  Every stream object is fingerprinted
+(SHA-256 over its dictionary and raw data, with references replaced by the
+fingerprint of what they point to) and identical streams are collapsed into
+one shared indirect object.
+
+- DedupingPdfWriter: PdfWriter that runs the pass just before serializing,
+  used in place of PdfMerger's own writer
+- fingerprint: the hash shared with the streaming writer in pdf_stream
+"""
+
+import hashlib
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Callable, Dict
+
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NullObject, StreamObject
+
+import pdf_metrics
+
+# References nested deeper than this are hashed by identity instead of content
+MAX_FINGERPRINT_DEPTH = 32
+
+RefHash = Callable[[IndirectObject, int], bytes]
+
+
+@dataclass
+class DedupStats:
+    streams_removed: int = 0
+    bytes_saved: int = 0
+
+    def add(self, other: "DedupStats") -> None:
+        self.streams_removed += other.streams_removed
+        self.bytes_saved += other.bytes_saved
+
+
+def fingerprint(obj: Any, ref_hash: RefHash, depth: int = 0) -> bytes:
+    """SHA-256 of ``obj``; ``ref_hash(ref, depth)`` hashes referenced objects"""
+    digest = hashlib.sha256()
+    _feed(digest, obj, ref_hash, depth)
+    return digest.digest()
+
+
+def _feed(digest: Any, obj: Any, ref_hash: RefHash, depth: int) -> None:
+    if isinstance(obj, IndirectObject):
+        digest.update(b'R')
+        digest.update(ref_hash(obj, depth + 1))
+    elif isinstance(obj, StreamObject):
+        digest.update(b'S<<')
+        for key in sorted(obj.keys()):
+            if key != '/Length':  # derived from the data
+                digest.update(key.encode('utf-8'))
+                _feed(digest, obj.raw_get(key), ref_hash, depth)
+        data = obj._data
+        digest.update(b'>>%d:' % len(data))
+        digest.update(data)
+    elif isinstance(obj, DictionaryObject):
+        digest.update(b'<<')
+        for key in sorted(obj.keys()):
+            digest.update(key.encode('utf-8'))
+            _feed(digest, obj.raw_get(key), ref_hash, depth)
+        digest.update(b'>>')
+    elif isinstance(obj, ArrayObject):
+        digest.update(b'[')
+        for value in obj:
+            _feed(digest, value, ref_hash, depth)
+        digest.update(b']')
+    else:
+        buffer = BytesIO()
+        obj.write_to_stream(buffer, None)
+        digest.update(type(obj).__name__.encode('ascii'))
+        digest.update(buffer.getvalue())
+    digest.update(b';')
+
+
+def is_page_tree_node(obj: Any) -> bool:
+    return (isinstance(obj, DictionaryObject) and not isinstance(obj, StreamObject)
+            and obj.get('/Type') in ('/Page', '/Pages'))
+
+
+def dedupe_writer(writer: PdfWriter) -> DedupStats:
+    """Collapse identical stream objects already imported into ``writer``"""
+    objects = writer._objects
+    memo: Dict[int, bytes] = {}
+    in_progress = set()
+
+    def ref_hash(ref: IndirectObject, depth: int) -> bytes:
+        idnum = ref.idnum
+        if idnum in memo:
+            return memo[idnum]
+        target = objects[idnum - 1] if 0 < idnum <= len(objects) else None
+        if (idnum in in_progress or depth > MAX_FINGERPRINT_DEPTH or target is None
+                or is_page_tree_node(target)):
+            # Cycles, page links and very deep graphs compare by identity
+            return b'id:%d' % idnum
+        in_progress.add(idnum)
+        memo[idnum] = fingerprint(target, ref_hash, depth)
+        in_progress.discard(idnum)
+        return memo[idnum]
+
+    stats = DedupStats()
+    canonical: Dict[bytes, int] = {}
+    replaced: Dict[int, int] = {}
+    for index, obj in enumerate(objects):
+        if not isinstance(obj, StreamObject):
+            continue
+        idnum = index + 1
+        key = ref_hash(IndirectObject(idnum, 0, writer), 0)
+        first = canonical.setdefault(key, idnum)
+        if first != idnum:
+            replaced[idnum] = first
+            stats.streams_removed += 1
+            stats.bytes_saved += len(obj._data)
+            pdf_metrics.count(dedup_hits=1, dedup_bytes=len(obj._data))
+
+    if not replaced:
+        return stats
+
+    for index, obj in enumerate(objects):
+        if index + 1 in replaced:
+            # Keep the slot so object numbers (and the xref table) stay aligned
+            objects[index] = NullObject()
+        elif obj is not None:
+            _redirect(obj, replaced, writer)
+    return stats
+
+
+def _redirect(obj: Any, replaced: Dict[int, int], writer: PdfWriter) -> None:
+    """Point references to removed duplicates at their canonical copy"""
+    stack = [obj]
+    while stack:
+        container = stack.pop()
+        if isinstance(container, DictionaryObject):
+            items = list(container.items())
+        elif isinstance(container, ArrayObject):
+            items = list(enumerate(container))
+        else:
+            continue
+        for key, value in items:
+            if isinstance(value, IndirectObject):
+                if value.idnum in replaced:
+                    container[key] = IndirectObject(replaced[value.idnum], 0, writer)
+            elif isinstance(value, (DictionaryObject, ArrayObject)):
+                stack.append(value)
+
+
+class DedupingPdfWriter(PdfWriter):
+    """PdfWriter that collapses identical streams right before writing"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.dedup_stats = DedupStats()
+
+    def write_stream(self, stream: Any) -> None:
+        # Pull every referenced object into this writer first (write_stream
+        # would do the same), so the pass sees the complete object list
+        if not self._root:
+            self._root = self._add_object(self._root_object)
+        self._sweep_indirect_references(self._root)
+        self.dedup_stats = dedupe_writer(self)
+        super().write_stream(stream)
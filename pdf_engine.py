@@ -0,0 +1,1082 @@
+#!/usr/bin/env python3
+"""
+PDF Engine - GUI-free processing used by PDF Manager
+Operations:
+- slice: extract page ranges from a PDF into a new file
+- split: write one file per range, per N pages or per bookmark
+- merge: combine multiple PDF files into one
+- convert: convert PPTX files to PDF and merge them (office suite or draft renderer)
+- optimize_images: downsample and recompress the images of a PDF
+
+Every operation takes plain paths and returns a result object, so the same
+code runs from the Tk window, from scripts and on headless servers.
+Long operations accept an optional ``progress(done, total, message)``
+callback and a ``cancel`` event that is checked between pages and files.
+"""
+
+import multiprocessing
+import os
+import platform
+import re
+import shutil
+import tempfile
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from PyPDF2 import PdfReader, PdfWriter, PdfMerger
+from PyPDF2.generic import IndirectObject
+
+import pdf_metrics
+from pdf_cache import ConversionCache, default_cache
+from pdf_compact import (QPDF_MISSING_MESSAGE, CompactCancelled, CompactOptions, CompactResult,
+                         QpdfNotFoundError, compact_pdf, find_qpdf)
+from pdf_convert import (DEFAULT_TIMEOUT_SECONDS, ConversionCancelled, LibreOfficePool,
+                         find_libreoffice, get_resident_pool, libreoffice_id, powerpoint_id,
+                         resident_available)
+from pdf_dedup import DedupingPdfWriter, DedupStats
+from pdf_io import open_reader, replacing
+from pdf_optimize import IMAGE_FORMATS, OptimizeCancelled, OptimizeOptions, OptimizeResult, optimize_pdf
+from pdf_preflight import (PreflightCancelled, PreflightOptions, PreflightReport, XrefSnapshot,
+                           preflight as preflight_files)
+from pdf_probe import borrow_reader
+from pdf_remerge import (MergeManifest, describe_inputs, load_merge_manifest, match_segments,
+                         remove_merge_manifest, save_merge_manifest)
+from pdf_render import DEFAULT_DPI as DRAFT_DPI, draft_id, render_deck
+from pdf_select import SelectionError, compile_selection, runs
+from pdf_stream import IncrementalPdfWriter, StreamingPdfWriter, peak_rss_bytes
+
+LIBREOFFICE_MISSING_MESSAGE = (
+    "PPTX to PDF conversion requires LibreOffice on Linux/Mac.\n\n"
+    "Please install LibreOffice:\n"
+    "- Ubuntu/Debian: sudo apt-get install libreoffice\n"
+    "- Mac: brew install libreoffice\n"
+    "- Or download from: https://www.libreoffice.org/"
+)
+
+PageRange = Tuple[int, int]
+RangesInput = Union[str, Sequence[str]]
+ProgressCallback = Callable[[int, int, str], None]
+# Absolute input path -> PdfReader or repaired file to read instead (see pdf_preflight)
+Sources = Mapping[str, Any]
+
+# Pages copied per PdfWriter.append call while slicing; links between pages
+# of one batch are kept, and progress and cancel are checked between batches
+SLICE_BATCH_PAGES = 1000
+
+# 'auto' is PowerPoint on Windows, else LibreOffice, else the draft renderer
+CONVERT_ENGINES = ('auto', 'powerpoint', 'libreoffice', 'draft')
+
+COMPACT_APPEND_MESSAGE = "Compacting rewrites the whole file and cannot be combined with append"
+
+SPLIT_MODES = ('ranges', 'every', 'bookmarks')
+DEFAULT_NAME_TEMPLATE = "{stem}_{index:03d}.pdf"
+# True for the shared on-disk cache, False/None to always convert
+CacheOption = Union[ConversionCache, bool, None]
+
+
+class EngineError(Exception):
+    """Raised when an operation cannot run with the given inputs"""
+
+
+class ConverterNotFoundError(EngineError):
+    """Raised when no PPTX converter is available on this machine"""
+
+
+class Cancelled(EngineError):
+    """Raised when an operation is stopped through its cancel event"""
+
+
+@dataclass
+class SliceResult:
+    output_file: str
+    ranges: List[PageRange]  # 0-indexed, inclusive
+    pages_written: int
+    compacted: Optional[CompactResult] = None  # set when compact output was requested
+
+    @property
+    def ranges_summary(self) -> str:
+        return ", ".join([f"{s+1}-{e+1}" if s != e else f"{s+1}" for s, e in self.ranges])
+
+
+@dataclass
+class SplitPart:
+    output_file: str
+    start: int  # 0-indexed first and last page
+    end: int
+    page_count: int
+    title: str = ""
+
+
+@dataclass
+class SplitResult:
+    input_file: str
+    parts: List[SplitPart] = field(default_factory=list)
+
+    @property
+    def pages_written(self) -> int:
+        return sum(part.page_count for part in self.parts)
+
+
+@dataclass
+class MergeResult:
+    output_file: str
+    merged_files: List[str] = field(default_factory=list)
+    missing_files: List[str] = field(default_factory=list)
+    pages_written: int = 0
+    peak_rss_bytes: Optional[int] = None  # process peak, see pdf_stream.peak_rss_bytes
+    dedup: Optional[DedupStats] = None  # set when deduplication was requested
+    optimized: Optional[OptimizeResult] = None  # set when image optimization was requested
+    reused_files: List[str] = field(default_factory=list)  # taken unchanged from the previous output
+    compacted: Optional[CompactResult] = None  # set when compact output was requested
+    preflight: Optional[PreflightReport] = None  # set when inputs were checked first
+
+
+@dataclass
+class ConvertResult:
+    output_file: str
+    converter: str
+    converted_files: List[str] = field(default_factory=list)
+    missing_files: List[str] = field(default_factory=list)
+    cached_files: List[str] = field(default_factory=list)  # served without converting
+    dedup: Optional[DedupStats] = None  # set when deduplication was requested
+    optimized: Optional[OptimizeResult] = None  # set when image optimization was requested
+    compacted: Optional[CompactResult] = None  # set when compact output was requested
+
+
+def _report(progress: Optional[ProgressCallback], done: int, total: int, message: str) -> None:
+    if progress is not None:
+        progress(done, total, message)
+
+
+def _check_cancelled(cancel: Optional[threading.Event]) -> None:
+    if cancel is not None and cancel.is_set():
+        raise Cancelled("Operation cancelled")
+
+
+# Slice
+def _range_lines(ranges: RangesInput) -> List[str]:
+    if isinstance(ranges, str):
+        ranges = ranges.split('\n')
+    return [line.strip() for line in ranges if line.strip()]
+
+
+def select_pages(ranges: RangesInput, total_pages: int) -> array:
+    """0-indexed pages chosen by a pdf_select expression, in output order"""
+    try:
+        return compile_selection(_range_lines(ranges)).resolve(total_pages)
+    except SelectionError as e:
+        raise EngineError(str(e))
+
+
+def parse_page_ranges(ranges: RangesInput, total_pages: int) -> List[PageRange]:
+    """The selection as 0-indexed inclusive runs of consecutive pages"""
+    return runs(select_pages(ranges, total_pages))
+
+
+@pdf_metrics.timed_job("slice")
+def slice(input_file: str, output_file: str, ranges: RangesInput,
+          append: bool = False,
+          compact: Optional[CompactOptions] = None,
+          progress: Optional[ProgressCallback] = None,
+          cancel: Optional[threading.Event] = None) -> SliceResult:
+    """Write the pages selected by ``ranges`` from ``input_file`` to ``output_file``
+
+    With ``append``, an existing ``output_file`` is extended by an incremental
+    update instead of being replaced.  ``compact`` repacks the output with
+    object streams and/or linearizes it (see ``pdf_compact``).
+    """
+    if not input_file or not os.path.exists(input_file):
+        raise EngineError("Please select a valid input PDF file")
+    if not output_file:
+        raise EngineError("Please select an output file location")
+    if not _range_lines(ranges):
+        raise EngineError("Please add at least one page range")
+    if append and compact is not None and os.path.exists(output_file):
+        raise EngineError(COMPACT_APPEND_MESSAGE)
+    _check_compact(compact)
+
+    with borrow_reader(input_file) as reader:
+        with pdf_metrics.span("probe"):
+            pages = select_pages(ranges, len(reader.pages))
+
+        total_pages = len(pages)
+        if append and os.path.exists(output_file):
+            def copy(writer: IncrementalPdfWriter) -> None:
+                def on_page(copied: int) -> None:
+                    _check_cancelled(cancel)
+                    _report(progress, copied, total_pages, f"Copying page {pages[copied - 1] + 1}")
+                with pdf_metrics.span("copy") as span:
+                    writer.append(reader, page_indices=pages, on_page=on_page)
+                    span.add(pages=total_pages)
+
+            _append_incremental(output_file, copy)
+            return SliceResult(output_file=output_file, ranges=runs(pages), pages_written=total_pages)
+
+        writer = PdfWriter()
+        pages_written = 0
+        with pdf_metrics.span("copy") as span:
+            for batch_start in range(0, total_pages, SLICE_BATCH_PAGES):
+                _check_cancelled(cancel)
+                batch = pages[batch_start:batch_start + SLICE_BATCH_PAGES]
+                writer.append(reader, pages=batch.tolist(), import_outline=False)
+                pages_written += len(batch)
+                _report(progress, pages_written, total_pages, f"Copying page {batch[-1] + 1}")
+            span.add(pages=pages_written)
+
+        _check_cancelled(cancel)
+        _report(progress, pages_written, total_pages, "Writing output")
+        with pdf_metrics.span("write") as span:
+            with replacing(output_file) as partial_file:
+                with open(partial_file, 'wb') as output:
+                    writer.write(output)
+            span.add(output_bytes=os.path.getsize(output_file))
+
+    return SliceResult(output_file=output_file, ranges=runs(pages), pages_written=pages_written,
+                       compacted=_compact_output(output_file, compact, progress, cancel))
+
+
+# Split
+# The source as opened by a split worker process, once per process
+_split_reader: Optional[PdfReader] = None
+
+
+def _bookmark_sections(reader: PdfReader) -> List[Tuple[Sequence[int], str]]:
+    """(pages, title) for each top-level bookmark, in page order"""
+    starts = {}
+    for item in reader.outline:
+        if isinstance(item, list):  # children of the previous entry
+            continue
+        try:
+            page = reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if page is not None and page >= 0:
+            starts.setdefault(page, str(item.title or ""))
+    if not starts:
+        raise EngineError("The PDF has no bookmarks to split by")
+
+    pages = sorted(starts)
+    if pages[0] != 0:
+        starts[0] = "Start"
+        pages.insert(0, 0)
+    bounds = pages[1:] + [len(reader.pages)]
+    return [(range(start, bound), starts[start]) for start, bound in zip(pages, bounds)]
+
+
+def _safe_title(title: str) -> str:
+    return re.sub(r'[^\w\- ]+', '_', title).strip() or "untitled"
+
+
+def _write_split_part(reader: PdfReader, page_indices: Sequence[int], output_file: str) -> str:
+    with replacing(output_file) as partial_file, open(partial_file, 'wb') as out:
+        writer = StreamingPdfWriter(out)
+        writer.append(reader, page_indices=page_indices)
+        writer.close()
+    return output_file
+
+
+def _open_split_source(input_file: str) -> None:
+    """Worker initializer: parse the source once for all the parts this process writes"""
+    global _split_reader
+    _split_reader = open_reader(input_file)
+    len(_split_reader.pages)
+
+
+def _write_split_part_in_worker(page_indices: Sequence[int], output_file: str) -> str:
+    return _write_split_part(_split_reader, page_indices, output_file)
+
+
+@pdf_metrics.timed_job("split")
+def split(input_file: str, output_dir: str, mode: str = 'ranges',
+          ranges: Optional[RangesInput] = None, every: Optional[int] = None,
+          name_template: str = DEFAULT_NAME_TEMPLATE, workers: Optional[int] = None,
+          progress: Optional[ProgressCallback] = None,
+          cancel: Optional[threading.Event] = None) -> SplitResult:
+    """Write one PDF per range, per ``every`` pages or per top-level bookmark
+
+    With one worker the source is parsed once and the parts written in this
+    process.  Otherwise they are written in parallel by worker processes,
+    each parsing the source once through a memory map that shares its pages.
+    ``name_template`` is a format string with ``{stem}``, ``{index}``
+    (1-based), ``{start}``, ``{end}`` (1-based pages) and ``{title}``.
+    """
+    if not input_file or not os.path.exists(input_file):
+        raise EngineError("Please select a valid input PDF file")
+    if not output_dir:
+        raise EngineError("Please select an output folder")
+    if mode not in SPLIT_MODES:
+        raise EngineError(f"Unknown split mode: {mode}")
+    if mode == 'ranges' and not _range_lines(ranges or []):
+        raise EngineError("Please add at least one page range")
+    if mode == 'every' and (not every or every < 1):
+        raise EngineError("Please enter a positive number of pages per file")
+
+    with borrow_reader(input_file) as reader:
+        with pdf_metrics.span("probe"):
+            total_pages = len(reader.pages)
+
+        if mode == 'ranges':
+            # One part per item of the selection expression
+            try:
+                groups = compile_selection(_range_lines(ranges)).groups(total_pages)
+            except SelectionError as e:
+                raise EngineError(str(e))
+            sections = [(group, "") for group in groups if len(group)]
+        elif mode == 'every':
+            sections = [(range(start, min(start + every, total_pages)), "")
+                        for start in range(0, total_pages, every)]
+        else:
+            sections = _bookmark_sections(reader)
+        if not sections:
+            raise EngineError("The selection does not include any pages")
+
+        stem = os.path.splitext(os.path.basename(input_file))[0]
+        result = SplitResult(input_file=input_file)
+        jobs = []
+        for index, (pages, title) in enumerate(sections, 1):
+            start, end = pages[0], pages[-1]
+            try:
+                name = name_template.format(stem=stem, index=index, start=start + 1, end=end + 1,
+                                            title=_safe_title(title) if title else "")
+            except (KeyError, IndexError, ValueError) as e:
+                raise EngineError(f"Invalid file name template: {str(e)}")
+            output_file = os.path.join(output_dir, name)
+            result.parts.append(SplitPart(output_file, start, end, len(pages), title))
+            jobs.append((list(pages), output_file))
+
+        if len({part.output_file for part in result.parts}) != len(result.parts):
+            raise EngineError("The file name template gives several parts the same name; "
+                              "include {index} or {start}")
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        workers = min(workers or os.cpu_count() or 1, len(jobs))
+        with pdf_metrics.span("write", parts=len(jobs), workers=workers) as span:
+            if workers < 2:
+                for done, (page_indices, output_file) in enumerate(jobs, 1):
+                    _check_cancelled(cancel)
+                    _write_split_part(reader, page_indices, output_file)
+                    _report(progress, done, len(jobs), f"Wrote {os.path.basename(output_file)}")
+            else:
+                # spawn, not fork: split runs on GUI, batch, server and watcher
+                # threads, and a child forked from a threaded process can
+                # deadlock on a lock another thread held
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                         initializer=_open_split_source, initargs=(input_file,)) as executor:
+                    pending = {executor.submit(_write_split_part_in_worker, *job) for job in jobs}
+                    done = 0
+                    try:
+                        while pending:
+                            finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                output_file = future.result()
+                                done += 1
+                                _report(progress, done, len(jobs), f"Wrote {os.path.basename(output_file)}")
+                            _check_cancelled(cancel)
+                    except BaseException:
+                        for future in pending:
+                            future.cancel()
+                        raise
+            span.add(pages=result.pages_written)
+
+    return result
+
+
+# Incremental updates
+def _append_incremental(output_file: str, copy: Callable[[IncrementalPdfWriter], None],
+                        dedup: bool = False) -> IncrementalPdfWriter:
+    """Run ``copy`` on a writer appending to ``output_file``; undone on failure"""
+    with open(output_file, 'r+b') as out:
+        writer = IncrementalPdfWriter(out, dedup=dedup)
+        try:
+            copy(writer)
+            with pdf_metrics.span("write") as span:
+                writer.close()
+                span.add(output_bytes=out.tell() - writer.original_size)
+        except BaseException:
+            out.truncate(writer.original_size)
+            raise
+    return writer
+
+
+# Image optimization
+def _optimize_output(output_file: str, options: Optional[OptimizeOptions],
+                     progress: Optional[ProgressCallback],
+                     cancel: Optional[threading.Event]) -> Optional[OptimizeResult]:
+    """Downsample and recompress the images of a finished output in place"""
+    if options is None:
+        return None
+    return _optimize_output_to(output_file, None, options, progress, cancel)
+
+
+def _optimize_output_to(input_file: str, output_file: Optional[str], options: OptimizeOptions,
+                        progress: Optional[ProgressCallback],
+                        cancel: Optional[threading.Event]) -> OptimizeResult:
+    _check_cancelled(cancel)
+    try:
+        with pdf_metrics.span("optimize") as span:
+            optimized = optimize_pdf(input_file, output_file, options=options, progress=progress,
+                                     cancel=cancel)
+            span.add(images=optimized.images_recompressed)
+            return optimized
+    except OptimizeCancelled:
+        raise Cancelled("Operation cancelled")
+
+
+@pdf_metrics.timed_job("optimize")
+def optimize_images(input_file: str, output_file: Optional[str] = None,
+                    target_dpi: int = 150, quality: int = 75, image_format: str = 'auto',
+                    progress: Optional[ProgressCallback] = None,
+                    cancel: Optional[threading.Event] = None) -> OptimizeResult:
+    """Downsample and recompress the images of a PDF (in place by default)"""
+    if not input_file or not os.path.exists(input_file):
+        raise EngineError("Please select a valid input PDF file")
+    if target_dpi < 1 or not 1 <= quality <= 95:
+        raise EngineError("Use a positive DPI and a JPEG quality between 1 and 95")
+    if image_format not in IMAGE_FORMATS:
+        raise EngineError(f"Unknown image format: {image_format}")
+    options = OptimizeOptions(target_dpi=target_dpi, quality=quality, image_format=image_format)
+    return _optimize_output_to(input_file, output_file, options, progress, cancel)
+
+
+# Compact output
+def _check_compact(options: Optional[CompactOptions]) -> None:
+    """Fail before any work when linearization is asked for without qpdf"""
+    if options is not None and options.linearize and find_qpdf() is None:
+        raise EngineError(QPDF_MISSING_MESSAGE)
+
+
+def _compact_output(output_file: str, options: Optional[CompactOptions],
+                    progress: Optional[ProgressCallback],
+                    cancel: Optional[threading.Event]) -> Optional[CompactResult]:
+    """Repack a finished output with object streams and/or linearize it, in place"""
+    if options is None:
+        return None
+    _check_cancelled(cancel)
+    try:
+        with pdf_metrics.span("compact") as span:
+            compacted = compact_pdf(output_file, options=options, progress=progress, cancel=cancel)
+            span.add(objects=compacted.objects_packed)
+            return compacted
+    except CompactCancelled:
+        raise Cancelled("Operation cancelled")
+    except QpdfNotFoundError as e:
+        raise EngineError(str(e))
+
+
+# Merge
+@pdf_metrics.timed_job("merge")
+def merge(input_files: Sequence[str], output_file: str,
+          streaming: bool = False,
+          dedup: bool = False,
+          append: bool = False,
+          optimize: Optional[OptimizeOptions] = None,
+          incremental: bool = False,
+          compact: Optional[CompactOptions] = None,
+          preflight: Optional[PreflightOptions] = None,
+          progress: Optional[ProgressCallback] = None,
+          cancel: Optional[threading.Event] = None) -> MergeResult:
+    """Merge ``input_files`` in order into ``output_file``; missing files are skipped
+
+    ``streaming`` copies pages straight to disk one input at a time, keeping
+    memory bounded for very long merge lists (outlines are not carried over).
+    ``dedup`` stores identical fonts and images shared by the inputs once.
+    ``append`` adds the pages to an existing ``output_file`` as an incremental
+    update, so the cost grows with the pages added rather than the file size;
+    it always copies in streaming mode.  ``optimize`` downsamples and
+    recompresses the images of the merged file.  ``incremental`` records the
+    inputs in a manifest next to the output, so running the same merge
+    again only copies the inputs that changed (see ``pdf_remerge``); it
+    copies in streaming mode too.  ``compact`` repacks the output with
+    object streams and/or linearizes it (see ``pdf_compact``).
+    ``preflight`` checks every input in worker processes before anything
+    is written (see ``pdf_preflight``): files that fail are left out and
+    listed in ``result.preflight``, and with ``repair`` recoverable ones are
+    merged from a repaired copy.
+    """
+    if not input_files:
+        raise EngineError("Please add PDF files to merge")
+    if not output_file:
+        raise EngineError("Please select an output file location")
+    append = append and os.path.exists(output_file)
+    if append and optimize is not None:
+        raise EngineError("Image optimization rewrites the whole file and cannot be combined with append")
+    if incremental and (append or optimize is not None):
+        raise EngineError("Incremental re-merge cannot be combined with append or image optimization")
+    if append and compact is not None:
+        raise EngineError(COMPACT_APPEND_MESSAGE)
+    _check_compact(compact)
+
+    result = MergeResult(output_file=output_file)
+    if dedup:
+        result.dedup = DedupStats()
+    repair_dir = None
+    if preflight is not None and preflight.repair:
+        repair_dir = tempfile.mkdtemp(prefix="pdf-repair-")
+    try:
+        sources: Dict[str, Any] = {}
+        if preflight is not None:
+            input_files = _preflight_inputs(input_files, preflight, repair_dir, sources, result,
+                                            progress, cancel)
+        if incremental:
+            _merge_incremental(input_files, output_file, result, sources, compact, progress, cancel)
+            result.peak_rss_bytes = peak_rss_bytes()
+            return result
+        remove_merge_manifest(output_file)
+        if append:
+            writer = _append_incremental(
+                output_file,
+                lambda writer: _copy_inputs(writer, input_files, result, sources, progress, cancel),
+                dedup=dedup)
+            if result.dedup is not None:
+                result.dedup = writer.dedup_stats
+        elif streaming:
+            _merge_streaming(input_files, output_file, result, sources, progress, cancel)
+        else:
+            _merge_in_memory(input_files, output_file, result, sources, progress, cancel)
+    finally:
+        if repair_dir is not None:
+            shutil.rmtree(repair_dir, ignore_errors=True)
+    result.optimized = _optimize_output(output_file, optimize, progress, cancel)
+    result.compacted = _compact_output(output_file, compact, progress, cancel)
+    result.peak_rss_bytes = peak_rss_bytes()
+    return result
+
+
+def _preflight_inputs(input_files: Sequence[str], options: PreflightOptions, repair_dir: Optional[str],
+                      sources: Dict[str, Any], result: MergeResult,
+                      progress: Optional[ProgressCallback],
+                      cancel: Optional[threading.Event]) -> List[str]:
+    """Check the inputs; returns those that passed and fills ``sources`` with what to read them from"""
+    pdf_files = _existing_files(input_files, result.missing_files)
+    readers: Dict[str, PdfReader] = {}
+    try:
+        with pdf_metrics.span("preflight", files=len(pdf_files)) as span:
+            report = preflight_files(pdf_files, options, repair_dir=repair_dir, readers=readers,
+                                     progress=progress, cancel=cancel)
+            span.add(pages=report.pages, quarantined=len(report.quarantined), repaired=len(report.repaired))
+    except PreflightCancelled:
+        raise Cancelled("Operation cancelled")
+    result.preflight = report
+    if pdf_files and not report.passed:
+        raise EngineError("None of the files can be merged:\n" + "\n".join(
+            f"{os.path.basename(check.path)}: {check.reason}" for check in report.quarantined))
+    for check in report.passed:
+        source = readers.get(check.path) or check.xref or check.repaired_file
+        check.xref = None  # the merge's to use; not part of the reported result
+        if source is not None:
+            sources[os.path.abspath(check.path)] = source
+    return [check.path for check in report.passed]
+
+
+def _source(sources: Sources, pdf_file: str) -> Any:
+    """What to read ``pdf_file`` from: a reader or repaired copy from the pre-flight check, or itself
+
+    Readers are opened from a check's cross-reference snapshot only here,
+    as each file is copied, so a long list does not hold every file open.
+    """
+    source = sources.get(os.path.abspath(pdf_file), pdf_file)
+    if isinstance(source, XrefSnapshot):
+        return source.open() or source.path
+    return source
+
+
+def _merge_in_memory(input_files: Sequence[str], output_file: str, result: MergeResult, sources: Sources,
+                     progress: Optional[ProgressCallback],
+                     cancel: Optional[threading.Event]) -> None:
+    merger = PdfMerger()
+    if result.dedup is not None:
+        merger.output = DedupingPdfWriter()
+    try:
+        for i, pdf_file in enumerate(input_files):
+            _check_cancelled(cancel)
+            if not os.path.exists(pdf_file):
+                result.missing_files.append(pdf_file)
+                continue
+            reader = open_reader(_source(sources, pdf_file))
+            with pdf_metrics.span("copy", file=os.path.basename(pdf_file)) as span:
+                merger.append(reader)
+                span.add(pages=len(reader.pages))
+            result.merged_files.append(pdf_file)
+            result.pages_written += len(reader.pages)
+            _report(progress, i + 1, len(input_files),
+                    f"Added {os.path.basename(pdf_file)} ({result.pages_written} pages so far)")
+
+        _check_cancelled(cancel)
+        _report(progress, len(input_files), len(input_files), "Writing output")
+        with pdf_metrics.span("write") as span:
+            with replacing(output_file) as partial_file:
+                merger.write(partial_file)
+            span.add(output_bytes=os.path.getsize(output_file))
+        if result.dedup is not None:
+            result.dedup = merger.output.dedup_stats
+    finally:
+        merger.close()
+
+
+def _merge_streaming(input_files: Sequence[str], output_file: str, result: MergeResult, sources: Sources,
+                     progress: Optional[ProgressCallback],
+                     cancel: Optional[threading.Event]) -> None:
+    with replacing(output_file) as partial_file, open(partial_file, 'wb') as out:
+        writer = StreamingPdfWriter(out, dedup=result.dedup is not None)
+        _copy_inputs(writer, input_files, result, sources, progress, cancel)
+        with pdf_metrics.span("write") as span:
+            writer.close()
+            span.add(output_bytes=out.tell())
+        if result.dedup is not None:
+            result.dedup = writer.dedup_stats
+
+
+def _merge_incremental(input_files: Sequence[str], output_file: str, result: MergeResult, sources: Sources,
+                       compact: Optional[CompactOptions],
+                       progress: Optional[ProgressCallback],
+                       cancel: Optional[threading.Event]) -> None:
+    dedup = result.dedup is not None
+    pdf_files = _existing_files(input_files, result.missing_files)
+    previous = load_merge_manifest(output_file)
+    with pdf_metrics.span("probe", files=len(pdf_files)):
+        inputs = describe_inputs(pdf_files, previous)
+    reuse = match_segments(inputs, previous)
+    result.merged_files = pdf_files
+    result.reused_files = [pdf_file for pdf_file, segment in zip(pdf_files, reuse) if segment is not None]
+
+    if previous is not None and [segment.node for segment in previous.segments] == \
+            [segment.node if segment else None for segment in reuse]:
+        # Same contents in the same order: the output is already up to date
+        for described, segment in zip(inputs, reuse):
+            described.first_page, described.pages, described.node = segment.first_page, segment.pages, segment.node
+        result.pages_written = sum(segment.pages for segment in inputs)
+        manifest = MergeManifest(dedup=dedup, stale_bytes=previous.stale_bytes, segments=inputs)
+    else:
+        manifest = MergeManifest(dedup=dedup, segments=inputs)
+        if previous is not None:
+            used = {id(segment) for segment in reuse if segment is not None}
+            manifest.stale_bytes = previous.stale_bytes + sum(segment.size for segment in previous.segments
+                                                              if id(segment) not in used)
+        if previous is None or manifest.needs_compaction():
+            _write_segments(output_file, inputs, reuse, result, sources, progress, cancel)
+            manifest.stale_bytes = 0
+        else:
+            def copy(writer: IncrementalPdfWriter) -> None:
+                writer.root_kids = _copy_segments(writer, inputs, reuse, None, result, sources, progress, cancel)
+
+            st = os.stat(output_file)
+            try:
+                writer = _append_incremental(output_file, copy, dedup=dedup)
+            except BaseException:
+                # The update was truncated away; keep the manifest valid for the next run
+                os.utime(output_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+                raise
+            if result.dedup is not None:
+                result.dedup = writer.dedup_stats
+    result.compacted = _compact_output(output_file, compact, progress, cancel)
+    if result.compacted is not None and result.compacted.linearized:
+        # qpdf renumbers every object, so the recorded segments no longer
+        # exist in the output; the next run rewrites it in full
+        remove_merge_manifest(output_file)
+        return
+    if result.compacted is not None:
+        # Object streams keep object numbers, so the segments stay valid;
+        # the replaced objects are dropped
+        manifest.stale_bytes = 0
+    save_merge_manifest(output_file, manifest)
+
+
+def _write_segments(output_file: str, inputs: Sequence, reuse: Sequence, result: MergeResult,
+                    sources: Sources,
+                    progress: Optional[ProgressCallback],
+                    cancel: Optional[threading.Event]) -> None:
+    """Rewrite ``output_file`` in full, copying reused segments from its previous version"""
+    with replacing(output_file) as partial_file, open(partial_file, 'wb') as out:
+        writer = StreamingPdfWriter(out, dedup=result.dedup is not None)
+        previous = open_reader(output_file) if any(reuse) else None
+        _copy_segments(writer, inputs, reuse, previous, result, sources, progress, cancel)
+        with pdf_metrics.span("write") as span:
+            writer.close()
+            span.add(output_bytes=out.tell())
+        if result.dedup is not None:
+            result.dedup = writer.dedup_stats
+
+
+def _copy_segments(writer: StreamingPdfWriter, inputs: Sequence, reuse: Sequence,
+                   previous: Optional[PdfReader], result: MergeResult, sources: Sources,
+                   progress: Optional[ProgressCallback],
+                   cancel: Optional[threading.Event]) -> List[IndirectObject]:
+    """Add one segment per input, filling in its page span and node; returns the segment nodes
+
+    Reused segments are copied from ``previous`` when given, otherwise
+    referenced where they already are in the file being updated.
+    """
+    nodes = []
+    first_page = 0
+    for i, (described, segment) in enumerate(zip(inputs, reuse)):
+        _check_cancelled(cancel)
+        name = os.path.basename(described.path)
+        if segment is not None and previous is None:
+            node = IndirectObject(segment.node[0], segment.node[1], None)
+            pages = segment.pages
+        else:
+            def on_page(copied: int, i: int = i, name: str = name) -> None:
+                _check_cancelled(cancel)
+                _report(progress, i, len(inputs), f"Copying {name} page {copied}")
+
+            with pdf_metrics.span("copy", file=name) as span:
+                if segment is not None:
+                    node = writer.append_segment(previous, on_page=on_page, page_indices=range(
+                        segment.first_page, segment.first_page + segment.pages))
+                else:
+                    node = writer.append_segment(_source(sources, described.path), on_page=on_page)
+                pages = writer.segment_pages[node.idnum]
+                span.add(pages=pages)
+        described.first_page, described.pages, described.node = first_page, pages, (node.idnum, node.generation)
+        first_page += pages
+        nodes.append(node)
+        _report(progress, i + 1, len(inputs),
+                f"{'Kept' if segment is not None else 'Added'} {name} ({first_page} pages so far)")
+    result.pages_written = first_page
+    _check_cancelled(cancel)
+    return nodes
+
+
+def _copy_inputs(writer: StreamingPdfWriter, input_files: Sequence[str], result: MergeResult,
+                 sources: Sources,
+                 progress: Optional[ProgressCallback],
+                 cancel: Optional[threading.Event]) -> None:
+    for i, pdf_file in enumerate(input_files):
+        _check_cancelled(cancel)
+        if not os.path.exists(pdf_file):
+            result.missing_files.append(pdf_file)
+            continue
+
+        def on_page(copied: int, i: int = i, pdf_file: str = pdf_file) -> None:
+            _check_cancelled(cancel)
+            _report(progress, i, len(input_files),
+                    f"Copying {os.path.basename(pdf_file)} page {copied}")
+
+        with pdf_metrics.span("copy", file=os.path.basename(pdf_file)) as span:
+            pages = writer.append(_source(sources, pdf_file), on_page=on_page)
+            span.add(pages=pages)
+        result.pages_written += pages
+        result.merged_files.append(pdf_file)
+        _report(progress, i + 1, len(input_files),
+                f"Added {os.path.basename(pdf_file)} ({result.pages_written} pages so far)")
+    _check_cancelled(cancel)
+
+
+def _merge_converted(pdf_files: Sequence[str], output_file: str,
+                     dedup: bool = False) -> Optional[DedupStats]:
+    merger = PdfMerger()
+    if dedup:
+        merger.output = DedupingPdfWriter()
+    try:
+        with pdf_metrics.span("merge", files=len(pdf_files)):
+            for pdf in pdf_files:
+                merger.append(open_reader(pdf))
+        with pdf_metrics.span("write") as span:
+            with replacing(output_file) as partial_file:
+                merger.write(partial_file)
+            span.add(output_bytes=os.path.getsize(output_file))
+        return merger.output.dedup_stats if dedup else None
+    finally:
+        merger.close()
+
+
+# PPTX to PDF
+def _existing_files(input_files: Sequence[str], missing: List[str]) -> List[str]:
+    existing = []
+    for path in input_files:
+        if os.path.exists(path):
+            existing.append(path)
+        else:
+            missing.append(path)
+    return existing
+
+
+def _resolve_cache(cache: CacheOption) -> Optional[ConversionCache]:
+    if cache is True:
+        return default_cache()
+    return cache or None
+
+
+def _lookup_cached(pptx_files: Sequence[str], cache: Optional[ConversionCache],
+                   converter_id: str) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+    """Return (cache keys, cached PDFs) aligned with ``pptx_files``; misses are None
+
+    The keys are pinned in ``cache``; release them once the PDFs are merged.
+    """
+    if cache is None:
+        return [None] * len(pptx_files), [None] * len(pptx_files)
+    with pdf_metrics.span("cache"):
+        keys = [cache.key(pptx_file, converter_id) for pptx_file in pptx_files]
+        cache.pin(keys)
+        pdfs = [cache.get(key) for key in keys]
+    return keys, pdfs
+
+
+@pdf_metrics.timed_job("convert")
+def convert_with_powerpoint(input_files: Sequence[str], output_file: str,
+                            cache: CacheOption = True,
+                            dedup: bool = False,
+                            optimize: Optional[OptimizeOptions] = None,
+                            compact: Optional[CompactOptions] = None,
+                            progress: Optional[ProgressCallback] = None,
+                            cancel: Optional[threading.Event] = None) -> ConvertResult:
+    """Convert PPTX to PDF on Windows using COM"""
+    _check_compact(compact)
+    result = ConvertResult(output_file=output_file, converter="powerpoint")
+    pptx_files = _existing_files(input_files, result.missing_files)
+    if not pptx_files:
+        raise EngineError("No valid PPTX files to convert")
+
+    cache = _resolve_cache(cache)
+    keys, pdfs = _lookup_cached(pptx_files, cache, powerpoint_id())
+    misses = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    result.cached_files = [f for f, pdf in zip(pptx_files, pdfs) if pdf is not None]
+
+    temp_pdfs = []
+    try:
+        # Cache hits skip PowerPoint entirely
+        with pdf_metrics.span("convert", files=len(misses)):
+            if misses:
+                import comtypes
+                import comtypes.client
+
+                # Jobs run on worker threads, which need their own COM apartment
+                comtypes.CoInitialize()
+                powerpoint = comtypes.client.CreateObject("Powerpoint.Application")
+                powerpoint.Visible = 1
+
+                try:
+                    for done, i in enumerate(misses):
+                        _check_cancelled(cancel)
+                        pptx_file = pptx_files[i]
+                        temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf').name
+                        temp_pdfs.append(temp_pdf)
+
+                        deck = powerpoint.Presentations.Open(os.path.abspath(pptx_file))
+                        deck.SaveAs(os.path.abspath(temp_pdf), 32)  # 32 = PDF format
+                        deck.Close()
+
+                        pdfs[i] = cache.put(keys[i], temp_pdf) if cache is not None else temp_pdf
+                        _report(progress, done + 1, len(misses), f"Converted {os.path.basename(pptx_file)}")
+                finally:
+                    powerpoint.Quit()
+                    comtypes.CoUninitialize()
+        result.converted_files = pptx_files
+
+        _check_cancelled(cancel)
+        _report(progress, len(misses), len(misses), "Merging converted files")
+        result.dedup = _merge_converted(pdfs, output_file, dedup=dedup)
+        result.optimized = _optimize_output(output_file, optimize, progress, cancel)
+        result.compacted = _compact_output(output_file, compact, progress, cancel)
+
+    except EngineError:
+        raise
+    except Exception as e:
+        raise Exception(f"Windows conversion failed: {str(e)}")
+    finally:
+        if cache is not None:
+            cache.release(keys)
+        # Clean up temp files
+        for pdf in temp_pdfs:
+            if os.path.exists(pdf):
+                os.unlink(pdf)
+
+    return result
+
+
+@pdf_metrics.timed_job("convert")
+def convert_with_libreoffice(input_files: Sequence[str], output_file: str,
+                             libreoffice_cmd: Optional[str] = None,
+                             workers: Optional[int] = None,
+                             timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                             resident: Optional[bool] = None,
+                             cache: CacheOption = True,
+                             dedup: bool = False,
+                             optimize: Optional[OptimizeOptions] = None,
+                             compact: Optional[CompactOptions] = None,
+                             progress: Optional[ProgressCallback] = None,
+                             cancel: Optional[threading.Event] = None) -> ConvertResult:
+    """PPTX to PDF conversion using a pool of headless LibreOffice workers
+
+    With ``resident`` (the default whenever the UNO bridge is installed) the
+    workers are long-lived soffice listeners shared by every call, so only
+    the first conversion pays the office start-up.
+    """
+    libreoffice_cmd = libreoffice_cmd or find_libreoffice()
+    if not libreoffice_cmd:
+        raise ConverterNotFoundError(LIBREOFFICE_MISSING_MESSAGE)
+
+    _check_compact(compact)
+    result = ConvertResult(output_file=output_file, converter="libreoffice")
+    pptx_files = _existing_files(input_files, result.missing_files)
+    if not pptx_files:
+        raise EngineError("No valid PPTX files to convert")
+
+    cache = _resolve_cache(cache)
+    keys, pdfs = _lookup_cached(pptx_files, cache, libreoffice_id(libreoffice_cmd))
+    misses = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    result.cached_files = [f for f, pdf in zip(pptx_files, pdfs) if pdf is not None]
+    to_convert = [pptx_files[i] for i in misses]
+
+    converted = []
+
+    def on_done(index: int, pptx_file: str) -> None:
+        converted.append(pptx_file)
+        _report(progress, len(converted), len(to_convert), f"Converted {os.path.basename(pptx_file)}")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        # Cache hits skip LibreOffice entirely.  PDFs come back in input
+        # order, whatever order the workers finish in.
+        with pdf_metrics.span("convert", files=len(to_convert)):
+            if to_convert:
+                if resident is None:
+                    resident = resident_available()
+                if resident:
+                    pool = get_resident_pool(libreoffice_cmd, workers=workers)
+                    temp_pdfs = pool.convert_all(to_convert, temp_dir, cancel=cancel, on_done=on_done,
+                                                 timeout=timeout)
+                else:
+                    workers = min(workers or os.cpu_count() or 1, len(to_convert))
+                    with LibreOfficePool(libreoffice_cmd, workers=workers, timeout=timeout) as pool:
+                        temp_pdfs = pool.convert_all(to_convert, temp_dir, cancel=cancel, on_done=on_done)
+
+                for i, temp_pdf in zip(misses, temp_pdfs):
+                    pdfs[i] = cache.put(keys[i], temp_pdf) if cache is not None else temp_pdf
+        result.converted_files = pptx_files
+
+        _check_cancelled(cancel)
+        _report(progress, len(to_convert), len(to_convert), "Merging converted files")
+        result.dedup = _merge_converted(pdfs, output_file, dedup=dedup)
+        result.optimized = _optimize_output(output_file, optimize, progress, cancel)
+        result.compacted = _compact_output(output_file, compact, progress, cancel)
+
+    except ConversionCancelled:
+        raise Cancelled("Operation cancelled")
+    except EngineError:
+        raise
+    except Exception as e:
+        raise Exception(f"Conversion failed: {str(e)}")
+    finally:
+        if cache is not None:
+            cache.release(keys)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return result
+
+
+@pdf_metrics.timed_job("convert")
+def convert_with_draft(input_files: Sequence[str], output_file: str,
+                       dpi: int = DRAFT_DPI,
+                       workers: Optional[int] = None,
+                       cache: CacheOption = True,
+                       dedup: bool = False,
+                       optimize: Optional[OptimizeOptions] = None,
+                       compact: Optional[CompactOptions] = None,
+                       progress: Optional[ProgressCallback] = None,
+                       cancel: Optional[threading.Event] = None) -> ConvertResult:
+    """Draft-quality PPTX to PDF conversion with the built-in renderer
+
+    Needs neither LibreOffice nor PowerPoint; decks are drawn by
+    ``pdf_render`` in a pool of worker processes, one deck per task.
+    """
+    _check_compact(compact)
+    result = ConvertResult(output_file=output_file, converter="draft")
+    pptx_files = _existing_files(input_files, result.missing_files)
+    if not pptx_files:
+        raise EngineError("No valid PPTX files to convert")
+
+    cache = _resolve_cache(cache)
+    keys, pdfs = _lookup_cached(pptx_files, cache, draft_id(dpi))
+    misses = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    result.cached_files = [f for f, pdf in zip(pptx_files, pdfs) if pdf is not None]
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        jobs = [(pptx_files[i], os.path.join(temp_dir, f"{n:04d}.pdf"), dpi) for n, i in enumerate(misses)]
+        with pdf_metrics.span("convert", files=len(jobs)):
+            workers = min(workers or os.cpu_count() or 1, len(jobs))
+            if workers < 2:
+                temp_pdfs = []
+                for done, job in enumerate(jobs, 1):
+                    _check_cancelled(cancel)
+                    temp_pdfs.append(render_deck(*job))
+                    _report(progress, done, len(jobs), f"Rendered {os.path.basename(job[0])}")
+            else:
+                # spawn: the pool may be started from a GUI or server thread
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                    futures = [executor.submit(render_deck, *job) for job in jobs]
+                    pending = set(futures)
+                    try:
+                        while pending:
+                            finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                            _report(progress, len(jobs) - len(pending), len(jobs), "Rendering slides")
+                            _check_cancelled(cancel)
+                        temp_pdfs = [future.result() for future in futures]
+                    except BaseException:
+                        for future in pending:
+                            future.cancel()
+                        raise
+
+        for i, temp_pdf in zip(misses, temp_pdfs):
+            pdfs[i] = cache.put(keys[i], temp_pdf) if cache is not None else temp_pdf
+        result.converted_files = pptx_files
+
+        _check_cancelled(cancel)
+        _report(progress, len(jobs), len(jobs), "Merging converted files")
+        result.dedup = _merge_converted(pdfs, output_file, dedup=dedup)
+        result.optimized = _optimize_output(output_file, optimize, progress, cancel)
+        result.compacted = _compact_output(output_file, compact, progress, cancel)
+
+    except EngineError:
+        raise
+    except Exception as e:
+        raise Exception(f"Draft conversion failed: {str(e)}")
+    finally:
+        if cache is not None:
+            cache.release(keys)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return result
+
+
+def convert(input_files: Sequence[str], output_file: str,
+            cache: CacheOption = True,
+            dedup: bool = False,
+            optimize: Optional[OptimizeOptions] = None,
+            compact: Optional[CompactOptions] = None,
+            engine: str = 'auto',
+            progress: Optional[ProgressCallback] = None,
+            cancel: Optional[threading.Event] = None) -> ConvertResult:
+    """Convert ``input_files`` to PDF and merge them into ``output_file``
+
+    ``engine`` is one of CONVERT_ENGINES; with 'auto' the draft renderer is
+    used only when no office suite is available.
+    """
+    if not input_files:
+        raise EngineError("Please add PPTX files to convert")
+    if not output_file:
+        raise EngineError("Please select an output file location")
+    if engine not in CONVERT_ENGINES:
+        raise EngineError(f"Unknown conversion engine: {engine} (expected one of {', '.join(CONVERT_ENGINES)})")
+
+    if engine == 'auto':
+        # Check if on Windows for COM support
+        if platform.system() == 'Windows':
+            engine = 'powerpoint'
+        else:
+            engine = 'libreoffice' if find_libreoffice() else 'draft'
+
+    options = dict(cache=cache, dedup=dedup, optimize=optimize, compact=compact, progress=progress,
+                   cancel=cancel)
+    if engine == 'powerpoint':
+        return convert_with_powerpoint(input_files, output_file, **options)
+    if engine == 'draft':
+        return convert_with_draft(input_files, output_file, **options)
+    return convert_with_libreoffice(input_files, output_file, **options)
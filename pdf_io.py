@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped PDF input for PDF Manager
+PdfReader given a path reads the whole file into a BytesIO before parsing,
+so opening a multi-GB source costs its full size in memory and read time
+even when only a few pages are used.  ``open_reader`` maps the file
+read-only instead: the parser seeks and reads through the mapping, pages
+of the file are faulted in only when touched, and they live in the OS page
+cache rather than in the process.  Worker processes that map the same file
+share those pages, so parallel split workers do not each keep a copy of
+the source.
+
+The mapping stays open as long as the reader (and anything still copying
+from it) is alive.  Truncating a mapped file makes reads past the new end
+fault (SIGBUS), so writers that may be handed a path that is also an
+input write through ``replacing``: the output is written next to the
+target and renamed over it, and the old file stays intact for any mapping
+still open on it.  Incremental updates only append.  On Windows a mapped file
+cannot be replaced or deleted, so sources are read into memory there as
+before; ``USE_MMAP`` can also be turned off to compare both paths.
+"""
+
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Any, BinaryIO, Iterator, Union
+
+from PyPDF2 import PdfReader
+
+import pdf_metrics
+
+USE_MMAP = os.name != 'nt'
+
+# The process umask, read once (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def map_file(path: str) -> Union[mmap.mmap, BinaryIO]:
+    """A read-only, seekable view of ``path``: an mmap, or a BytesIO copy without mmap"""
+    with open(path, 'rb') as f:
+        if USE_MMAP:
+            try:
+                # The mapping keeps its own reference to the file; the
+                # descriptor can be closed straight away
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                pass  # empty files cannot be mapped
+        return BytesIO(f.read())
+
+
+@contextmanager
+def replacing(path: str) -> Iterator[str]:
+    """Yield a temporary path to write instead of ``path``; it replaces ``path`` when the block succeeds
+
+    A failed or cancelled write never leaves a truncated file behind, and
+    readers mapping the old file keep reading it.  Each call gets its own
+    temporary name, so concurrent jobs writing the same output do not
+    clobber each other's partial file; the last one to finish wins.
+    """
+    fd, partial_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        prefix=os.path.basename(path) + '.', suffix='.part')
+    os.close(fd)
+    try:
+        yield partial_file
+        # mkstemp creates the file private; give the output the mode open() would
+        os.chmod(partial_file, 0o666 & ~_UMASK)
+        os.replace(partial_file, path)
+    finally:
+        if os.path.exists(partial_file):
+            os.unlink(partial_file)
+
+
+def open_reader(source: Any, strict: bool = False) -> PdfReader:
+    """PdfReader over a memory-mapped path (other sources are passed through)"""
+    if isinstance(source, PdfReader):
+        return source
+    if not isinstance(source, (str, os.PathLike)):
+        return PdfReader(source, strict=strict)
+    path = os.fspath(source)
+    with pdf_metrics.span("parse", file=os.path.basename(path)) as span:
+        reader = PdfReader(map_file(path), strict=strict)
+        span.add(input_bytes=os.path.getsize(path))
+        return reader
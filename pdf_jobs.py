@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Background jobs for PDF Manager
+Engine operations run on a worker pool so the Tk mainloop never blocks.
+Workers never touch widgets: they post progress into a queue that the GUI
+drains with ``root.after`` polling, and stop when their cancel event is set.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+Progress = Tuple[int, int, str]
+
+
+class Job:
+    """A single submitted operation with its progress queue and cancel flag"""
+
+    def __init__(self) -> None:
+        self.cancel_event = threading.Event()
+        self.progress: "queue.Queue[Progress]" = queue.Queue()
+        self.future: Optional[Future] = None
+
+    def report(self, done: int, total: int, message: str) -> None:
+        """Progress callback handed to the engine; called from the worker thread"""
+        self.progress.put((done, total, message))
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def latest_progress(self) -> Optional[Progress]:
+        """Drain the queue and return only the newest update (None if idle)"""
+        latest = None
+        while True:
+            try:
+                latest = self.progress.get_nowait()
+            except queue.Empty:
+                return latest
+
+    def result(self) -> Any:
+        """Return the operation result, re-raising its exception if it failed"""
+        return self.future.result()
+
+
+class JobRunner:
+    """Thread pool that runs engine functions taking ``progress`` and ``cancel``"""
+
+    def __init__(self, max_workers: int = 2) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-job")
+
+    def submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Job:
+        job = Job()
+        job.future = self.executor.submit(func, *args, progress=job.report, cancel=job.cancel_event, **kwargs)
+        return job
+
+    def shutdown(self, wait: bool = False) -> None:
+        self.executor.shutdown(wait=wait, cancel_futures=True)
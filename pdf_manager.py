@@ -3,19 +3,56 @@
 PDF Manager - A GUI application for PDF manipulation
 Features:
 - Slice PDF files to selected page ranges
+- Split a PDF into one file per range, per N pages or per bookmark
 - Merge multiple PDF files
 - Convert PPTX files to PDF and merge them
 - Select custom output paths
+
+Start-up only loads Tk: pdf_engine (and with it PyPDF2 and Pillow) is
+imported by the first job, on its worker thread, and each tab is built the
+first time it is shown.  ``--startup-time`` prints how long the window took
+to appear, and which heavy modules were loaded by then, and exits.
 """
 
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import json
+import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-from PyPDF2 import PdfReader, PdfWriter, PdfMerger
-from pptx import Presentation
-from PIL import Image
-import io
-import tempfile
+import platform
+import threading
+
+from pdf_jobs import JobRunner
+
+# How often running jobs are polled for progress (milliseconds)
+JOB_POLL_MS = 100
+
+# How often the thumbnail panels pick up finished renders (milliseconds)
+THUMB_POLL_MS = 50
+# Rows rendered above and below the visible part of a thumbnail panel
+THUMB_PREFETCH_ROWS = 2
+
+THUMB_SIZE = 160  # longest side of a page thumbnail, in pixels
+
+# Kept here so building the slice tab does not import pdf_engine
+DEFAULT_NAME_TEMPLATE = "{stem}_{index:03d}.pdf"  # pdf_engine.DEFAULT_NAME_TEMPLATE
+
+# Modules --startup-time reports when they are loaded before the window appears
+HEAVY_MODULES = ('PyPDF2', 'PIL', 'pptx', 'lxml', 'pdf_engine', 'comtypes')
+
+# Image optimization settings offered by the merge and PPTX tabs
+OPTIMIZE_DPI = 150
+OPTIMIZE_QUALITY = 75
+OPTIMIZE_LABEL = f"Downsample images to {OPTIMIZE_DPI} DPI and recompress them"
+
+# Output layouts offered by the slice, merge and PPTX tabs (see pdf_compact)
+COMPACT_CHOICES = [("Standard", ""), ("Compact (object streams)", "compact"),
+                   ("Compact + fast web view (needs qpdf)", "web")]
 
 
 class PDFManagerApp:
@@ -27,19 +64,46 @@ class PDFManagerApp:
         # Variables
         self.output_path = tk.StringVar(value=os.path.expanduser("~"))
         
+        # Background jobs, keyed by tab name ("slice", "merge", "pptx")
+        self.jobs = JobRunner()
+        self.active_jobs = {}
+        self.job_buttons = {}
+        self.thumbnail_panels = []
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # Create notebook (tabs)
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=10)
         
-        # Create tabs
-        self.create_slice_tab()
-        self.create_merge_tab()
-        self.create_pptx_tab()
-        
-    def create_slice_tab(self):
+        # Tabs are empty frames until first shown
+        self.tab_builders = {}
+        for text, builder in [("Slice PDF", self.create_slice_tab),
+                              ("Merge PDFs", self.create_merge_tab),
+                              ("PPTX to PDF", self.create_pptx_tab)]:
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=text)
+            self.tab_builders[str(frame)] = (frame, builder)
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.on_tab_changed()
+        
+    def on_tab_changed(self, event=None):
+        """Build the selected tab the first time it is shown; thumbnails of hidden tabs pause"""
+        selected = self.notebook.select()
+        entry = self.tab_builders.pop(selected, None)
+        if entry is not None:
+            frame, builder = entry
+            builder(frame)
+        for panel in self.thumbnail_panels:
+            shown = str(panel).startswith(selected + '.')
+            if shown != panel.shown:
+                panel.set_shown(shown)
+        
+    def create_slice_tab(self, slice_frame):
         """Create the PDF slicing tab"""
-        slice_frame = ttk.Frame(self.notebook)
-        self.notebook.add(slice_frame, text="Slice PDF")
+        # Page thumbnails: click picks a page, shift-click extends, double-click adds it
+        self.slice_thumbs = ThumbnailPanel(slice_frame, on_click=self.on_slice_thumbnail)
+        self.thumbnail_panels.append(self.slice_thumbs)
+        self.slice_thumbs.pack(side='right', fill='y', padx=(0, 10), pady=10)
         
         # Input file
         ttk.Label(slice_frame, text="Select PDF File:").pack(pady=(20, 5))
@@ -52,7 +116,7 @@ class PDFManagerApp:
         ttk.Button(input_frame, text="Browse", command=self.browse_slice_input).pack(side='left', padx=(5, 0))
         
         # Page ranges section
-        ttk.Label(slice_frame, text="Page Ranges (one per line, e.g., '1-5' or '10-15'):").pack(pady=(20, 5))
+        ttk.Label(slice_frame, text="Page Ranges (one per line, e.g., '1-5', '10-', '-3--1', '1-20:2', 'odd', '!7', 'reverse'):").pack(pady=(20, 5))
         
         # Text widget for multiple ranges
         ranges_frame = ttk.Frame(slice_frame)
@@ -94,18 +158,65 @@ class PDFManagerApp:
         ttk.Entry(output_frame, textvariable=self.slice_output_var, width=50).pack(side='left', fill='x', expand=True)
         ttk.Button(output_frame, text="Browse", command=self.browse_slice_output).pack(side='left', padx=(5, 0))
         
+        # Split options: one output file, or a folder of files
+        mode_frame = ttk.Frame(slice_frame)
+        mode_frame.pack(pady=(10, 0))
+        
+        self.slice_mode_var = tk.StringVar(value="single")
+        for text, value in [("Single file", "single"), ("One file per range", "ranges"),
+                            ("Every N pages", "every"), ("One file per bookmark", "bookmarks")]:
+            ttk.Radiobutton(mode_frame, text=text, variable=self.slice_mode_var,
+                            value=value).pack(side='left', padx=5)
+        
+        split_frame = ttk.Frame(slice_frame)
+        split_frame.pack(pady=5)
+        
+        ttk.Label(split_frame, text="N:").pack(side='left')
+        self.slice_every_var = tk.StringVar(value="10")
+        ttk.Entry(split_frame, textvariable=self.slice_every_var, width=6).pack(side='left', padx=5)
+        ttk.Label(split_frame, text="File names:").pack(side='left', padx=(10, 0))
+        self.slice_template_var = tk.StringVar(value=DEFAULT_NAME_TEMPLATE)
+        ttk.Entry(split_frame, textvariable=self.slice_template_var, width=30).pack(side='left', padx=5)
+        
+        self.slice_append_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            slice_frame,
+            text="Append to the output file if it exists (single file mode)",
+            variable=self.slice_append_var
+        ).pack()
+        self.slice_compact_var = self.create_compact_choice(slice_frame)
+        
         # Slice button (larger and centered)
         slice_button = ttk.Button(slice_frame, text="✂️ SLICE PDF", command=self.slice_pdf)
-        slice_button.pack(pady=20, ipadx=20, ipady=10)
+        slice_button.pack(pady=(20, 5), ipadx=20, ipady=10)
+        
+        cancel_button = ttk.Button(slice_frame, text="Cancel", state='disabled',
+                                   command=lambda: self.cancel_job("slice"))
+        cancel_button.pack(pady=(0, 10))
+        self.job_buttons["slice"] = (slice_button, cancel_button)
         
         # Status
         self.slice_status = ttk.Label(slice_frame, text="", foreground="blue")
         self.slice_status.pack(pady=5)
         
-    def create_merge_tab(self):
+    def create_compact_choice(self, parent):
+        """Radio buttons for the output layout; returns their variable"""
+        compact_frame = ttk.Frame(parent)
+        compact_frame.pack(pady=(5, 0))
+        
+        ttk.Label(compact_frame, text="Output:").pack(side='left')
+        compact_var = tk.StringVar(value="")
+        for text, value in COMPACT_CHOICES:
+            ttk.Radiobutton(compact_frame, text=text, variable=compact_var,
+                            value=value).pack(side='left', padx=5)
+        return compact_var
+        
+    def create_merge_tab(self, merge_frame):
         """Create the PDF merging tab"""
-        merge_frame = ttk.Frame(self.notebook)
-        self.notebook.add(merge_frame, text="Merge PDFs")
+        # Pages of the file selected in the list
+        self.merge_thumbs = ThumbnailPanel(merge_frame)
+        self.thumbnail_panels.append(self.merge_thumbs)
+        self.merge_thumbs.pack(side='right', fill='y', padx=(0, 10), pady=10)
         
         # File list
         ttk.Label(merge_frame, text="Select PDF Files to Merge:").pack(pady=(20, 5))
@@ -120,6 +231,7 @@ class PDFManagerApp:
         self.merge_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, height=10)
         self.merge_listbox.pack(side='left', fill='both', expand=True)
         scrollbar.config(command=self.merge_listbox.yview)
+        self.merge_listbox.bind('<<ListboxSelect>>', self.on_merge_select)
         
         # Buttons
         button_frame = ttk.Frame(merge_frame)
@@ -139,19 +251,66 @@ class PDFManagerApp:
         ttk.Entry(output_frame, textvariable=self.merge_output_var, width=50).pack(side='left', fill='x', expand=True)
         ttk.Button(output_frame, text="Browse", command=self.browse_merge_output).pack(side='left', padx=(5, 0))
         
+        # Merge options
+        self.merge_streaming_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            merge_frame,
+            text="Low-memory streaming merge (for very long lists; bookmarks are not kept)",
+            variable=self.merge_streaming_var
+        ).pack(pady=(10, 0))
+        self.merge_dedup_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            merge_frame,
+            text="Store identical fonts and images only once",
+            variable=self.merge_dedup_var
+        ).pack()
+        self.merge_append_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            merge_frame,
+            text="Append to the output file if it exists (only the new pages are written)",
+            variable=self.merge_append_var
+        ).pack()
+        self.merge_optimize_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            merge_frame,
+            text=OPTIMIZE_LABEL,
+            variable=self.merge_optimize_var
+        ).pack()
+        self.merge_incremental_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            merge_frame,
+            text="Re-merge: rebuild only the inputs that changed since the last merge into this file",
+            variable=self.merge_incremental_var
+        ).pack()
+        self.merge_preflight_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            merge_frame,
+            text="Check all files before merging and set aside damaged or encrypted ones",
+            variable=self.merge_preflight_var
+        ).pack()
+        self.merge_repair_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            merge_frame,
+            text="Repair damaged files when possible (with the check above)",
+            variable=self.merge_repair_var
+        ).pack()
+        self.merge_compact_var = self.create_compact_choice(merge_frame)
+        
         # Merge button (larger and centered)
         merge_button = ttk.Button(merge_frame, text="📄 MERGE PDFs", command=self.merge_pdfs)
-        merge_button.pack(pady=20, ipadx=20, ipady=10)
+        merge_button.pack(pady=(20, 5), ipadx=20, ipady=10)
+        
+        cancel_button = ttk.Button(merge_frame, text="Cancel", state='disabled',
+                                   command=lambda: self.cancel_job("merge"))
+        cancel_button.pack(pady=(0, 10))
+        self.job_buttons["merge"] = (merge_button, cancel_button)
         
         # Status
         self.merge_status = ttk.Label(merge_frame, text="", foreground="blue")
         self.merge_status.pack(pady=5)
         
-    def create_pptx_tab(self):
+    def create_pptx_tab(self, pptx_frame):
         """Create the PPTX to PDF conversion tab"""
-        pptx_frame = ttk.Frame(self.notebook)
-        self.notebook.add(pptx_frame, text="PPTX to PDF")
-        
         # File list
         ttk.Label(pptx_frame, text="Select PPTX Files:").pack(pady=(20, 5))
         
@@ -184,9 +343,37 @@ class PDFManagerApp:
         ttk.Entry(output_frame, textvariable=self.pptx_output_var, width=50).pack(side='left', fill='x', expand=True)
         ttk.Button(output_frame, text="Browse", command=self.browse_pptx_output).pack(side='left', padx=(5, 0))
         
+        # Conversion options
+        self.pptx_dedup_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            pptx_frame,
+            text="Store identical fonts and images only once",
+            variable=self.pptx_dedup_var
+        ).pack(pady=(10, 0))
+        self.pptx_optimize_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            pptx_frame,
+            text=OPTIMIZE_LABEL,
+            variable=self.pptx_optimize_var
+        ).pack()
+        
+        engine_frame = ttk.Frame(pptx_frame)
+        engine_frame.pack(pady=(5, 0))
+        self.pptx_engine_var = tk.StringVar(value="auto")
+        ttk.Radiobutton(engine_frame, text="Office suite (exact)", value="auto",
+                        variable=self.pptx_engine_var).pack(side='left', padx=5)
+        ttk.Radiobutton(engine_frame, text="Draft renderer (fast, no office suite)", value="draft",
+                        variable=self.pptx_engine_var).pack(side='left', padx=5)
+        self.pptx_compact_var = self.create_compact_choice(pptx_frame)
+        
         # Convert button (larger and centered)
         convert_button = ttk.Button(pptx_frame, text="🔄 CONVERT TO PDF", command=self.convert_pptx_to_pdf)
-        convert_button.pack(pady=20, ipadx=20, ipady=10)
+        convert_button.pack(pady=(20, 5), ipadx=20, ipady=10)
+        
+        cancel_button = ttk.Button(pptx_frame, text="Cancel", state='disabled',
+                                   command=lambda: self.cancel_job("pptx"))
+        cancel_button.pack(pady=(0, 10))
+        self.job_buttons["pptx"] = (convert_button, cancel_button)
         
         # Status
         self.pptx_status = ttk.Label(pptx_frame, text="", foreground="blue")
@@ -232,13 +419,24 @@ class PDFManagerApp:
             self.slice_input_var.set(filename)
             # Update page count
             try:
-                reader = PdfReader(filename)
-                num_pages = len(reader.pages)
+                import pdf_probe
+                num_pages = pdf_probe.page_count(filename)
                 self.slice_end_var.set(str(num_pages))
                 self.slice_status.config(text=f"PDF loaded: {num_pages} pages", foreground="green")
+                self.slice_thumbs.show(filename, num_pages)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to read PDF: {str(e)}")
                 
+    def on_slice_thumbnail(self, page, action):
+        """Pick pages from the thumbnail panel"""
+        if action == "extend":
+            self.slice_end_var.set(str(page))
+        elif action == "add":
+            self.slice_ranges_text.insert(tk.END, f"{page}\n")
+        else:
+            self.slice_start_var.set(str(page))
+            self.slice_end_var.set(str(page))
+                
     def browse_slice_output(self):
         # Get directory from input file if available, otherwise use home
         initial_dir = os.path.dirname(self.slice_input_var.get()) if self.slice_input_var.get() else os.path.expanduser("~")
@@ -255,91 +453,59 @@ class PDFManagerApp:
         input_file = self.slice_input_var.get()
         output_file = self.slice_output_var.get()
         
-        if not input_file or not os.path.exists(input_file):
-            messagebox.showerror("Error", "Please select a valid input PDF file")
-            return
-            
-        if not output_file:
-            messagebox.showerror("Error", "Please select an output file location")
-            return
-        
         # Get all ranges from the text widget
         ranges_text = self.slice_ranges_text.get("1.0", tk.END).strip()
         
-        if not ranges_text:
-            messagebox.showerror("Error", "Please add at least one page range")
+        mode = self.slice_mode_var.get()
+        if mode != "single":
+            self.split_pdf(mode, input_file, output_file, ranges_text)
             return
-            
-        try:
-            reader = PdfReader(input_file)
-            total_pages = len(reader.pages)
-            writer = PdfWriter()
-            
-            # Parse and process each range
-            ranges = []
-            for line in ranges_text.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Parse range (e.g., "1-5" or "10-15")
-                if '-' in line:
-                    parts = line.split('-')
-                    if len(parts) != 2:
-                        messagebox.showerror("Error", f"Invalid range format: {line}\nUse format: start-end (e.g., 1-5)")
-                        return
-                    
-                    start_page = int(parts[0].strip()) - 1  # Convert to 0-indexed
-                    end_page = int(parts[1].strip()) - 1
-                    
-                    if start_page < 0 or end_page < start_page:
-                        messagebox.showerror("Error", f"Invalid page range: {line}")
-                        return
-                    
-                    if end_page >= total_pages:
-                        messagebox.showerror("Error", f"Range {line} exceeds total pages ({total_pages})")
-                        return
-                    
-                    ranges.append((start_page, end_page))
-                else:
-                    # Single page
-                    page_num = int(line.strip()) - 1
-                    if page_num < 0 or page_num >= total_pages:
-                        messagebox.showerror("Error", f"Page {line} is out of range (1-{total_pages})")
-                        return
-                    ranges.append((page_num, page_num))
-            
-            if not ranges:
-                messagebox.showerror("Error", "No valid page ranges found")
+        
+        self.start_job("slice", self.slice_status, "Failed to slice PDF", self.show_slice_result,
+                       run_engine, "slice", input_file, output_file, ranges_text,
+                       append=self.slice_append_var.get(),
+                       compact=self.slice_compact_var.get())
+        
+    def split_pdf(self, mode, input_file, output_location, ranges_text):
+        # Split modes write into a folder: the output's folder if a file was chosen
+        output_dir = output_location
+        if output_location.lower().endswith('.pdf'):
+            output_dir = os.path.dirname(output_location)
+        
+        every = None
+        if mode == "every":
+            try:
+                every = int(self.slice_every_var.get())
+            except ValueError:
+                messagebox.showerror("Error", "Please enter a valid number of pages per file")
                 return
-            
-            # Add pages from all ranges to the writer
-            total_pages_added = 0
-            for start_page, end_page in ranges:
-                for page_num in range(start_page, end_page + 1):
-                    writer.add_page(reader.pages[page_num])
-                    total_pages_added += 1
-            
-            # Write the output file
-            with open(output_file, 'wb') as output:
-                writer.write(output)
-            
-            # Create summary message
-            ranges_summary = ", ".join([f"{s+1}-{e+1}" if s != e else f"{s+1}" for s, e in ranges])
-            self.slice_status.config(
-                text=f"Success! Extracted {total_pages_added} pages from ranges: {ranges_summary}", 
-                foreground="green"
-            )
-            messagebox.showinfo(
-                "Success", 
-                f"PDF sliced successfully!\n\nExtracted pages: {ranges_summary}\nTotal pages: {total_pages_added}\nSaved to: {output_file}"
-            )
-            
-        except ValueError as e:
-            messagebox.showerror("Error", f"Invalid page number format: {str(e)}")
-        except Exception as e:
-            self.slice_status.config(text="Error occurred", foreground="red")
-            messagebox.showerror("Error", f"Failed to slice PDF: {str(e)}")
+        
+        self.start_job("slice", self.slice_status, "Failed to split PDF", self.show_split_result,
+                       run_engine, "split", input_file, output_dir, mode=mode, ranges=ranges_text,
+                       every=every, name_template=self.slice_template_var.get())
+        
+    def show_split_result(self, result):
+        output_dir = os.path.dirname(result.parts[0].output_file) if result.parts else ""
+        self.slice_status.config(
+            text=f"Success! Wrote {len(result.parts)} files ({result.pages_written} pages)",
+            foreground="green"
+        )
+        messagebox.showinfo(
+            "Success",
+            f"PDF split successfully!\n\nFiles written: {len(result.parts)}\nTotal pages: {result.pages_written}\nSaved to: {output_dir}"
+        )
+        
+    def show_slice_result(self, result):
+        # Create summary message
+        ranges_summary = result.ranges_summary
+        status = f"Success! Extracted {result.pages_written} pages from ranges: {ranges_summary}"
+        if result.compacted is not None:
+            status += f", {format_compacted(result.compacted)}"
+        self.slice_status.config(text=status, foreground="green")
+        messagebox.showinfo(
+            "Success", 
+            f"PDF sliced successfully!\n\nExtracted pages: {ranges_summary}\nTotal pages: {result.pages_written}\nSaved to: {result.output_file}"
+        )
             
     # Merge PDF methods
     def add_merge_files(self):
@@ -362,9 +528,16 @@ class PDFManagerApp:
         selection = self.merge_listbox.curselection()
         if selection:
             self.merge_listbox.delete(selection[0])
+            self.merge_thumbs.show(None)  # its thumbnails were of the removed file
             
     def clear_merge_files(self):
         self.merge_listbox.delete(0, tk.END)
+        self.merge_thumbs.show(None)
+        
+    def on_merge_select(self, event):
+        selection = self.merge_listbox.curselection()
+        if selection:
+            self.merge_thumbs.show(self.merge_listbox.get(selection[0]))
         
     def browse_merge_output(self):
         # Get directory from first file in list if available
@@ -385,34 +558,49 @@ class PDFManagerApp:
             
     def merge_pdfs(self):
         output_file = self.merge_output_var.get()
+        input_files = list(self.merge_listbox.get(0, tk.END))
+        preflight = ""
+        if self.merge_preflight_var.get():
+            preflight = "repair" if self.merge_repair_var.get() else "check"
+        self.start_job("merge", self.merge_status, "Failed to merge PDFs", self.show_merge_result,
+                       run_engine, "merge", input_files, output_file,
+                       streaming=self.merge_streaming_var.get(),
+                       dedup=self.merge_dedup_var.get(),
+                       append=self.merge_append_var.get(),
+                       optimize=self.merge_optimize_var.get(),
+                       incremental=self.merge_incremental_var.get(),
+                       compact=self.merge_compact_var.get(),
+                       preflight=preflight)
+        
+    def show_merge_result(self, result):
+        for pdf_file in result.missing_files:
+            messagebox.showwarning("Warning", f"File not found: {pdf_file}")
+        quarantined = result.preflight.quarantined if result.preflight is not None else []
+        if quarantined:
+            messagebox.showwarning(
+                "Warning",
+                "These files were left out of the merge:\n\n" + "\n".join(
+                    f"{os.path.basename(check.path)}: {check.reason}"
+                    + (" (can be repaired)" if check.repairable else "") for check in quarantined)
+            )
         
-        if self.merge_listbox.size() == 0:
-            messagebox.showerror("Error", "Please add PDF files to merge")
-            return
-            
-        if not output_file:
-            messagebox.showerror("Error", "Please select an output file location")
-            return
-            
-        try:
-            merger = PdfMerger()
-            
-            for i in range(self.merge_listbox.size()):
-                pdf_file = self.merge_listbox.get(i)
-                if not os.path.exists(pdf_file):
-                    messagebox.showwarning("Warning", f"File not found: {pdf_file}")
-                    continue
-                merger.append(pdf_file)
-                
-            merger.write(output_file)
-            merger.close()
-            
-            self.merge_status.config(text=f"Success! Merged {self.merge_listbox.size()} files", foreground="green")
-            messagebox.showinfo("Success", f"PDFs merged successfully!\nSaved to: {output_file}")
-            
-        except Exception as e:
-            self.merge_status.config(text="Error occurred", foreground="red")
-            messagebox.showerror("Error", f"Failed to merge PDFs: {str(e)}")
+        status = f"Success! Merged {len(result.merged_files)} files"
+        if quarantined:
+            status += f" ({len(quarantined)} set aside)"
+        if result.preflight is not None and result.preflight.repaired:
+            status += f", {len(result.preflight.repaired)} repaired"
+        if result.reused_files:
+            status += f" ({len(result.reused_files)} unchanged, kept from the previous output)"
+        if result.dedup is not None and result.dedup.streams_removed:
+            status += f", {format_dedup(result.dedup)}"
+        if result.optimized is not None:
+            status += f", {format_optimized(result.optimized)}"
+        if result.compacted is not None:
+            status += f", {format_compacted(result.compacted)}"
+        if result.peak_rss_bytes:
+            status += f" (peak memory {result.peak_rss_bytes / (1024 * 1024):.0f} MB)"
+        self.merge_status.config(text=status, foreground="green")
+        messagebox.showinfo("Success", f"PDFs merged successfully!\nSaved to: {result.output_file}")
             
     # PPTX to PDF methods
     def add_pptx_files(self):
@@ -467,145 +655,334 @@ class PDFManagerApp:
             messagebox.showerror("Error", "Please select an output file location")
             return
             
-        try:
-            import sys
-            import platform
-            
-            # Check if on Windows for COM support
-            if platform.system() == 'Windows':
-                self.convert_pptx_windows(output_file)
-            else:
-                self.convert_pptx_alternative(output_file)
-                
-        except Exception as e:
-            self.pptx_status.config(text="Error occurred", foreground="red")
-            messagebox.showerror("Error", f"Failed to convert PPTX: {str(e)}")
+        # Check if on Windows for COM support
+        if self.pptx_engine_var.get() == "draft":
+            self.convert_pptx_draft(output_file)
+        elif platform.system() == 'Windows':
+            self.convert_pptx_windows(output_file)
+        else:
+            self.convert_pptx_alternative(output_file)
             
     def convert_pptx_windows(self, output_file):
         """Convert PPTX to PDF on Windows using COM"""
-        try:
-            import comtypes.client
-            
-            powerpoint = comtypes.client.CreateObject("Powerpoint.Application")
-            powerpoint.Visible = 1
-            
-            temp_pdfs = []
-            
-            for i in range(self.pptx_listbox.size()):
-                pptx_file = self.pptx_listbox.get(i)
-                if not os.path.exists(pptx_file):
-                    messagebox.showwarning("Warning", f"File not found: {pptx_file}")
-                    continue
-                    
-                temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf').name
-                
-                deck = powerpoint.Presentations.Open(os.path.abspath(pptx_file))
-                deck.SaveAs(os.path.abspath(temp_pdf), 32)  # 32 = PDF format
-                deck.Close()
-                
-                temp_pdfs.append(temp_pdf)
-                
-            powerpoint.Quit()
-            
-            # Merge all PDFs
-            if len(temp_pdfs) > 0:
-                merger = PdfMerger()
-                for pdf in temp_pdfs:
-                    merger.append(pdf)
-                merger.write(output_file)
-                merger.close()
-                
-                # Clean up temp files
-                for pdf in temp_pdfs:
-                    os.unlink(pdf)
-                    
-                self.pptx_status.config(text=f"Success! Converted {len(temp_pdfs)} files", foreground="green")
-                messagebox.showinfo("Success", f"PPTX files converted successfully!\nSaved to: {output_file}")
-            else:
-                messagebox.showerror("Error", "No valid PPTX files to convert")
-                
-        except Exception as e:
-            raise Exception(f"Windows conversion failed: {str(e)}")
+        input_files = list(self.pptx_listbox.get(0, tk.END))
+        self.start_job("pptx", self.pptx_status, "Failed to convert PPTX", self.show_convert_result,
+                       run_engine, "convert_with_powerpoint", input_files, output_file,
+                       dedup=self.pptx_dedup_var.get(),
+                       optimize=self.pptx_optimize_var.get(),
+                       compact=self.pptx_compact_var.get())
             
     def convert_pptx_alternative(self, output_file):
-        """Alternative PPTX to PDF conversion (uses LibreOffice if available)"""
-        import subprocess
+        """Alternative PPTX to PDF conversion (LibreOffice, or the draft renderer without it)"""
+        input_files = list(self.pptx_listbox.get(0, tk.END))
+        self.start_job("pptx", self.pptx_status, "Failed to convert PPTX", self.show_convert_result,
+                       run_engine, "convert", input_files, output_file, engine="auto",
+                       dedup=self.pptx_dedup_var.get(),
+                       optimize=self.pptx_optimize_var.get(),
+                       compact=self.pptx_compact_var.get())
+        
+    def convert_pptx_draft(self, output_file):
+        """Draft-quality conversion with the built-in renderer"""
+        input_files = list(self.pptx_listbox.get(0, tk.END))
+        self.start_job("pptx", self.pptx_status, "Failed to convert PPTX", self.show_convert_result,
+                       run_engine, "convert_with_draft", input_files, output_file,
+                       dedup=self.pptx_dedup_var.get(),
+                       optimize=self.pptx_optimize_var.get(),
+                       compact=self.pptx_compact_var.get())
+        
+    def show_convert_result(self, result):
+        for pptx_file in result.missing_files:
+            messagebox.showwarning("Warning", f"File not found: {pptx_file}")
+            
+        status = f"Success! Converted {len(result.converted_files)} files"
+        if result.cached_files:
+            status += f" ({len(result.cached_files)} from cache)"
+        if result.converter == "draft":
+            status += ", draft quality"
+        if result.dedup is not None and result.dedup.streams_removed:
+            status += f", {format_dedup(result.dedup)}"
+        if result.optimized is not None:
+            status += f", {format_optimized(result.optimized)}"
+        if result.compacted is not None:
+            status += f", {format_compacted(result.compacted)}"
+        self.pptx_status.config(text=status, foreground="green")
+        messagebox.showinfo("Success", f"PPTX files converted successfully!\nSaved to: {result.output_file}")
+
+    # Background job methods
+    def start_job(self, name, status_label, error_prefix, on_success, func, *args, **kwargs):
+        """Run ``func`` on the job pool and follow it from the Tk loop"""
+        if name in self.active_jobs:
+            return
         
-        # Check if LibreOffice is available
-        libreoffice_cmds = ['libreoffice', 'soffice']
-        libreoffice_cmd = None
+        job = self.jobs.submit(func, *args, **kwargs)
+        self.active_jobs[name] = job
+        self.set_job_running(name, True)
+        status_label.config(text="Working...", foreground="blue")
+        self.root.after(JOB_POLL_MS, self.poll_job, name, job, status_label, error_prefix, on_success)
         
-        for cmd in libreoffice_cmds:
-            try:
-                subprocess.run([cmd, '--version'], capture_output=True, check=True)
-                libreoffice_cmd = cmd
-                break
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                continue
-                
-        if not libreoffice_cmd:
-            messagebox.showerror(
-                "Error",
-                "PPTX to PDF conversion requires LibreOffice on Linux/Mac.\n\n"
-                "Please install LibreOffice:\n"
-                "- Ubuntu/Debian: sudo apt-get install libreoffice\n"
-                "- Mac: brew install libreoffice\n"
-                "- Or download from: https://www.libreoffice.org/"
-            )
-            return
+    def poll_job(self, name, job, status_label, error_prefix, on_success):
+        update = job.latest_progress()
+        if update is not None and not job.cancelled:
+            done, total, message = update
+            status_label.config(text=f"{message} ({done}/{total})", foreground="blue")
             
+        if not job.done():
+            self.root.after(JOB_POLL_MS, self.poll_job, name, job, status_label, error_prefix, on_success)
+            return
+        
+        del self.active_jobs[name]
+        self.set_job_running(name, False)
+        
+        # Loaded by the job itself by now
+        from pdf_engine import Cancelled, EngineError
         try:
-            temp_pdfs = []
-            temp_dir = tempfile.mkdtemp()
-            
-            for i in range(self.pptx_listbox.size()):
-                pptx_file = self.pptx_listbox.get(i)
-                if not os.path.exists(pptx_file):
-                    messagebox.showwarning("Warning", f"File not found: {pptx_file}")
-                    continue
-                    
-                # Convert using LibreOffice
-                result = subprocess.run(
-                    [libreoffice_cmd, '--headless', '--convert-to', 'pdf', 
-                     '--outdir', temp_dir, pptx_file],
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode != 0:
-                    raise Exception(f"LibreOffice conversion failed: {result.stderr}")
-                    
-                # Find the generated PDF
-                pptx_basename = os.path.splitext(os.path.basename(pptx_file))[0]
-                temp_pdf = os.path.join(temp_dir, f"{pptx_basename}.pdf")
-                
-                if os.path.exists(temp_pdf):
-                    temp_pdfs.append(temp_pdf)
-                    
-            # Merge all PDFs
-            if len(temp_pdfs) > 0:
-                merger = PdfMerger()
-                for pdf in temp_pdfs:
-                    merger.append(pdf)
-                merger.write(output_file)
-                merger.close()
-                
-                # Clean up
-                import shutil
-                shutil.rmtree(temp_dir)
-                
-                self.pptx_status.config(text=f"Success! Converted {len(temp_pdfs)} files", foreground="green")
-                messagebox.showinfo("Success", f"PPTX files converted successfully!\nSaved to: {output_file}")
-            else:
-                messagebox.showerror("Error", "No valid PPTX files to convert")
-                
+            result = job.result()
+        except Cancelled:
+            status_label.config(text="Cancelled", foreground="orange")
+        except EngineError as e:
+            status_label.config(text="")
+            messagebox.showerror("Error", str(e))
         except Exception as e:
-            raise Exception(f"Conversion failed: {str(e)}")
+            status_label.config(text="Error occurred", foreground="red")
+            messagebox.showerror("Error", f"{error_prefix}: {str(e)}")
+        else:
+            on_success(result)
+            
+    def set_job_running(self, name, running):
+        action_button, cancel_button = self.job_buttons[name]
+        action_button.config(state='disabled' if running else 'normal')
+        cancel_button.config(state='normal' if running else 'disabled')
+        
+    def cancel_job(self, name):
+        job = self.active_jobs.get(name)
+        if job is not None:
+            job.cancel()
+            self.job_buttons[name][1].config(state='disabled')
+            
+    def on_close(self):
+        for job in self.active_jobs.values():
+            job.cancel()
+        self.jobs.shutdown(wait=False)
+        for panel in self.thumbnail_panels:
+            panel.close()
+        self.root.destroy()
 
 
-def main():
+class ThumbnailPanel(ttk.Frame):
+    """Scrollable page thumbnails of one PDF, rendered as they scroll into view
+    
+    Only the visible rows (plus a little prefetch) have canvas items and
+    PhotoImages; the rest of a long document is empty scroll region.
+    """
+    
+    def __init__(self, parent, on_click=None, size=THUMB_SIZE):
+        super().__init__(parent)
+        self.renderer = None  # started with the first file shown
+        self.on_click = on_click
+        self.size = size
+        self.cell = size + 28  # thumbnail plus page label
+        self.path = None
+        self.page_count = 0
+        self.visible = range(0)
+        self.items = {}   # page -> canvas item ids
+        self.photos = {}  # page -> PhotoImage; Tk drops images nobody references
+        self.counting = None
+        self.shown = True  # False while the panel's tab is hidden
+        self.polling = None  # pending after() id while there is work to collect
+        
+        self.canvas = tk.Canvas(self, width=size + 20, highlightthickness=0, background="#e8e8e8")
+        scrollbar = ttk.Scrollbar(self, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=lambda first, last: (scrollbar.set(first, last), self.refresh()))
+        scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='y', expand=True)
+        
+        self.canvas.bind('<Configure>', lambda event: self.refresh())
+        self.canvas.bind('<MouseWheel>', lambda event: self.canvas.yview_scroll(-event.delta // 120, 'units'))
+        self.canvas.bind('<Button-4>', lambda event: self.canvas.yview_scroll(-1, 'units'))
+        self.canvas.bind('<Button-5>', lambda event: self.canvas.yview_scroll(1, 'units'))
+        if on_click is not None:
+            self.canvas.bind('<Button-1>', lambda event: self.clicked(event, "pick"))
+            self.canvas.bind('<Shift-Button-1>', lambda event: self.clicked(event, "extend"))
+            self.canvas.bind('<Double-Button-1>', lambda event: self.clicked(event, "add"))
+        self.canvas.configure(yscrollincrement=self.cell // 2)
+        
+    def show(self, path, page_count=None):
+        """Show ``path``; without ``page_count`` it is read on a background thread"""
+        self.path = path
+        self.page_count = 0
+        self.clear()
+        if path is None:
+            return
+        if self.renderer is None:
+            from pdf_thumbs import ThumbnailRenderer
+            self.renderer = ThumbnailRenderer(size=self.size)
+        if page_count is not None:
+            self.set_page_count(page_count)
+            return
+        
+        result = {}
+        def count():
+            try:
+                import pdf_probe
+                result['pages'] = pdf_probe.page_count(path)
+            except Exception:
+                result['pages'] = 0
+        worker = threading.Thread(target=count, name="pdf-thumbnail-count", daemon=True)
+        self.counting = (path, worker, result)
+        worker.start()
+        self.schedule()
+        
+    def set_shown(self, shown):
+        """Called as the panel's tab is shown or hidden; hidden panels neither poll nor render"""
+        self.shown = shown
+        if shown:
+            self.visible = range(0)  # re-request whatever is in view
+            self.refresh()
+            self.schedule()
+            return
+        if self.polling is not None:
+            self.after_cancel(self.polling)
+            self.polling = None
+        if self.renderer is not None:
+            self.renderer.cancel()
+        
+    def set_page_count(self, page_count):
+        self.page_count = page_count
+        self.canvas.configure(scrollregion=(0, 0, self.size + 20, page_count * self.cell))
+        self.canvas.yview_moveto(0)
+        self.refresh()
+        
+    def clear(self):
+        self.canvas.delete('all')
+        self.items.clear()
+        self.photos.clear()
+        self.visible = range(0)
+        self.canvas.configure(scrollregion=(0, 0, 0, 0))
+        
+    def refresh(self):
+        """Create items for the rows in view, drop the others and request renders"""
+        if not self.shown or not self.path or not self.page_count:
+            return
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height()
+        first = max(0, int(top // self.cell) - THUMB_PREFETCH_ROWS)
+        last = min(self.page_count, int((top + height) // self.cell) + 1 + THUMB_PREFETCH_ROWS)
+        visible = range(first, last)
+        if visible == self.visible:
+            return
+        self.visible = visible
+        
+        for page in [page for page in self.items if page not in visible]:
+            for item in self.items.pop(page):
+                self.canvas.delete(item)
+            self.photos.pop(page, None)
+        for page in visible:
+            if page not in self.items:
+                y = page * self.cell
+                self.items[page] = [
+                    self.canvas.create_rectangle(10, y + 4, 10 + self.size, y + 4 + self.size,
+                                                 outline="#c0c0c0", fill="white"),
+                    self.canvas.create_text(10 + self.size // 2, y + self.size + 14, text=str(page + 1)),
+                ]
+        # Pages in view first, then the prefetch rows
+        in_view = range(max(first, int(top // self.cell)), min(last, int((top + height) // self.cell) + 1))
+        pages = list(in_view) + [page for page in visible if page not in in_view]
+        self.renderer.request(self.path, [page for page in pages if page not in self.photos])
+        self.schedule()
+        
+    def schedule(self):
+        """Poll for results until the outstanding work is collected"""
+        if self.shown and self.polling is None:
+            self.polling = self.after(THUMB_POLL_MS, self.poll)
+        
+    def poll(self):
+        self.polling = None
+        if self.counting is not None and not self.counting[1].is_alive():
+            path, _, result = self.counting
+            self.counting = None
+            if path == self.path:
+                self.set_page_count(result.get('pages', 0))
+        
+        for path, page, image in self.renderer.results() if self.renderer is not None else ():
+            if path != self.path or page not in self.items or page in self.photos:
+                continue
+            from PIL import ImageTk
+            photo = ImageTk.PhotoImage(image)
+            self.photos[page] = photo
+            y = page * self.cell
+            x = 10 + (self.size - image.width) // 2
+            self.items[page].append(self.canvas.create_image(x, y + 4 + (self.size - image.height) // 2,
+                                                             image=photo, anchor='nw'))
+        if self.counting is not None or (self.renderer is not None and self.renderer.busy()):
+            self.schedule()
+        
+    def close(self):
+        if self.polling is not None:
+            self.after_cancel(self.polling)
+            self.polling = None
+        if self.renderer is not None:
+            self.renderer.close()
+        
+    def clicked(self, event, action):
+        page = int(self.canvas.canvasy(event.y) // self.cell)
+        if 0 <= page < self.page_count:
+            self.on_click(page + 1, action)
+
+
+def format_dedup(stats):
+    return f"{stats.streams_removed} duplicate streams removed ({stats.bytes_saved / 1024:.0f} KB saved)"
+
+
+def format_optimized(result):
+    return f"images optimized ({result.bytes_saved / (1024 * 1024):.1f} MB saved)"
+
+
+def format_compacted(result):
+    mb = 1024 * 1024
+    text = (f"compacted {result.original_bytes / mb:.1f} MB → {result.compacted_bytes / mb:.1f} MB "
+            f"in {result.seconds:.1f}s")
+    return text + " (fast web view)" if result.linearized else text
+
+
+def run_engine(operation, *args, optimize=False, compact='', preflight='', **kwargs):
+    """Job body: run ``pdf_engine.<operation>``, importing the engine on the worker thread"""
+    import pdf_engine
+    from pdf_compact import CompactOptions
+    from pdf_optimize import OptimizeOptions
+    from pdf_preflight import PreflightOptions
+    
+    if optimize:
+        kwargs["optimize"] = OptimizeOptions(target_dpi=OPTIMIZE_DPI, quality=OPTIMIZE_QUALITY)
+    if compact:
+        kwargs["compact"] = CompactOptions(linearize=compact == "web")
+    if preflight:
+        kwargs["preflight"] = PreflightOptions(repair=preflight == "repair")
+    return getattr(pdf_engine, operation)(*args, **kwargs)
+
+
+def report_startup(window_shown):
+    """Print start-up timings as one JSON line"""
+    heavy = sorted(name for name in HEAVY_MODULES if name in sys.modules)
+    print(json.dumps({
+        "window_seconds": round(window_shown - _STARTED, 4),
+        "modules_loaded": len(sys.modules),
+        "heavy_modules_loaded": heavy,
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF Manager")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print how long the window took to appear, then exit")
+    args = parser.parse_args(argv)
+    
     root = tk.Tk()
     app = PDFManagerApp(root)
+    if args.startup_time:
+        root.update()  # map and draw the window
+        report_startup(time.perf_counter())
+        app.on_close()
+        return
     root.mainloop()
 
 
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Timing and profiling instrumentation for PDF Manager
+Engine operations are wrapped in a ``job`` and their phases in named
+``span``s (probe, parse, copy, convert, merge, write, optimize).  Each
+finished span is written as one JSON line:
+
+    {"ts": 1735689600.12, "job": "3f2a9c1d", "operation": "merge",
+     "span": "copy", "seconds": 0.412, "pages": 120, "bytes": 5242880}
+
+Jobs write a closing line with ``"span": "job"``.  Counters (pages,
+input_bytes, output_bytes...) are added with ``add`` on a span or ``count``
+on whatever span is current, and roll up into the enclosing spans, so the
+job line carries the totals.  With a profile directory set, each
+job also runs under cProfile and leaves ``<job>-<operation>.prof`` there;
+only the job's own thread is profiled, not worker processes.
+
+Metrics are off unless ``configure`` is called or PDF_MANAGER_METRICS
+(a .jsonl path) / PDF_MANAGER_PROFILE (a folder) are set.  When off,
+``job`` and ``span`` return a shared no-op object, so an instrumented phase
+costs well under a microsecond.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+METRICS_ENV = "PDF_MANAGER_METRICS"
+PROFILE_ENV = "PDF_MANAGER_PROFILE"
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+class _NoSpan:
+    """Stand-in for a span while metrics are off"""
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+    def add(self, **counters: int) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Sink:
+    def __init__(self, path: Optional[str], profile_dir: Optional[str]) -> None:
+        self.path = path
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8')
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        if self._file is None:
+            return
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_sink: Optional[_Sink] = None
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("pdf_metrics_span", default=None)
+
+
+class Span:
+    """A timed phase; counters added to it are summed into its record"""
+
+    def __init__(self, sink: _Sink, name: str, fields: Dict[str, Any],
+                 job_id: Optional[str] = None, operation: Optional[str] = None) -> None:
+        self.sink = sink
+        self.name = name
+        self.fields = fields
+        self.counters: Dict[str, int] = {}
+        self.job_id = job_id
+        self.operation = operation
+        self.profiler = None
+        self._token = None
+        self._started = 0.0
+
+    def add(self, **counters: int) -> None:
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def __enter__(self) -> "Span":
+        parent = _current.get()
+        if self.job_id is None and parent is not None:
+            self.job_id, self.operation = parent.job_id, parent.operation
+        self._token = _current.set(self)
+        self._started = time.perf_counter()
+        if self.profiler is not None:
+            try:
+                self.profiler.enable()
+            except ValueError:  # another profiler already owns this interpreter
+                self.profiler = None
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        seconds = time.perf_counter() - self._started
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(os.path.join(self.sink.profile_dir,
+                                                  f"{self.job_id}-{self.operation}.prof"))
+        _current.reset(self._token)
+        parent = _current.get()
+        if parent is not None:
+            parent.add(**self.counters)
+        record = {"ts": round(time.time(), 3), "job": self.job_id, "operation": self.operation,
+                  "span": self.name, "seconds": round(seconds, 6)}
+        record.update(self.fields)
+        record.update(self.counters)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        self.sink.emit(record)
+
+
+def configure(path: Optional[str] = None, profile_dir: Optional[str] = None) -> None:
+    """Write metrics to ``path`` and/or cProfile dumps to ``profile_dir``; no arguments turns them off"""
+    global _sink
+    previous, _sink = _sink, (_Sink(path, profile_dir) if path or profile_dir else None)
+    if previous is not None:
+        previous.close()
+
+
+def configure_from_env() -> None:
+    configure(os.environ.get(METRICS_ENV) or None, os.environ.get(PROFILE_ENV) or None)
+
+
+def enabled() -> bool:
+    return _sink is not None
+
+
+def job(operation: str, **fields: Any):
+    """Top-level span of one engine operation; nested jobs count as spans of the outer one"""
+    sink = _sink
+    if sink is None:
+        return _NO_SPAN
+    if _current.get() is not None:
+        return Span(sink, operation, fields)
+    span = Span(sink, "job", fields, job_id=uuid.uuid4().hex[:8], operation=operation)
+    if sink.profile_dir:
+        import cProfile
+        span.profiler = cProfile.Profile()
+    return span
+
+
+def timed_job(operation: str) -> Callable[[F], F]:
+    """Decorator running a function as ``job(operation)``"""
+    def decorate(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with job(operation):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorate
+
+
+def span(name: str, **fields: Any):
+    """A timed phase of the current job (or a standalone one)"""
+    sink = _sink
+    if sink is None:
+        return _NO_SPAN
+    return Span(sink, name, fields)
+
+
+def count(**counters: int) -> None:
+    """Add counters to the current span"""
+    if _sink is None:
+        return
+    current = _current.get()
+    if current is not None:
+        current.add(**counters)
+
+
+configure_from_env()
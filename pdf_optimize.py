@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Image optimization for PDF Manager
+Decks exported to PDF usually embed photos at their full camera resolution.
+This pass finds the image XObjects used by each page (including inside
+form XObjects), downsamples each to a target DPI and recompresses it as
+JPEG or Flate, keeping the new version only when it is smaller.
+
+The display size of an image is not known without interpreting content
+streams, so it is bounded by the largest page the image appears on: an
+image is never reduced below what it would need to fill that page at the
+target DPI.  Decoding and encoding run in a process pool; only 8-bit gray
+and RGB images with a single Flate or DCT filter are touched, and masks,
+CMYK, JPEG 2000 and fax images are left alone.
+"""
+
+import io
+import math
+import multiprocessing
+import os
+import shutil
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, IndirectObject, NameObject, NumberObject
+
+from pdf_io import open_reader, replacing
+
+IMAGE_FORMATS = ('auto', 'jpeg', 'flate')
+
+# Form XObjects nested deeper than this are not searched for images
+MAX_FORM_DEPTH = 8
+
+# Images smaller than this many pixels are not worth a round trip to a worker
+MIN_IMAGE_PIXELS = 64 * 64
+
+ObjectKey = Tuple[int, int]
+
+
+class OptimizeCancelled(Exception):
+    pass
+
+
+@dataclass
+class OptimizeOptions:
+    target_dpi: int = 150
+    quality: int = 75  # JPEG quality, 1-95
+    image_format: str = 'auto'  # 'auto' keeps JPEGs as JPEG and lossless images lossless
+    workers: Optional[int] = None
+
+
+@dataclass
+class OptimizeResult:
+    output_file: str
+    original_bytes: int
+    optimized_bytes: int
+    images_recompressed: int = 0
+    images_skipped: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.optimized_bytes
+
+
+@dataclass
+class _ImageJob:
+    key: ObjectKey
+    data: bytes
+    filter: str
+    decode_parms: Optional[Dict[str, int]]
+    width: int
+    height: int
+    components: int
+    target_width: int
+    target_height: int
+    image_format: str
+    quality: int
+
+
+def _components(image: Any) -> Optional[int]:
+    color_space = image.get('/ColorSpace')
+    if color_space == '/DeviceRGB':
+        return 3
+    if color_space == '/DeviceGray':
+        return 1
+    if isinstance(color_space, ArrayObject) and len(color_space) == 2 and color_space[0] == '/ICCBased':
+        n = color_space[1].get_object().get('/N')
+        return int(n) if n in (1, 3) else None
+    return None
+
+
+def _single_filter(image: Any) -> Optional[str]:
+    filters = image.get('/Filter')
+    if isinstance(filters, ArrayObject):
+        filters = filters[0] if len(filters) == 1 else None
+    return filters if filters in ('/FlateDecode', '/DCTDecode') else None
+
+
+def _plain_parms(parms: Any) -> Optional[Dict[str, int]]:
+    if isinstance(parms, ArrayObject):
+        parms = parms[0] if len(parms) == 1 else None
+    if parms is None:
+        return None
+    parms = parms.get_object()
+    return {str(k): int(v) for k, v in parms.items() if isinstance(v, int)}
+
+
+def _collect_images(reader: PdfReader) -> Dict[ObjectKey, Tuple[IndirectObject, float, float]]:
+    """Image references with the largest page size (in inches) they appear on"""
+    images: Dict[ObjectKey, Tuple[IndirectObject, float, float]] = {}
+
+    def visit(resources: Any, width: float, height: float, depth: int) -> None:
+        xobjects = resources.get('/XObject') if resources is not None else None
+        if xobjects is None:
+            return
+        for ref in xobjects.get_object().values():
+            if not isinstance(ref, IndirectObject):
+                continue
+            xobject = ref.get_object()
+            subtype = xobject.get('/Subtype')
+            if subtype == '/Image':
+                key = (ref.idnum, ref.generation)
+                _, seen_width, seen_height = images.get(key, (ref, 0.0, 0.0))
+                images[key] = (ref, max(width, seen_width), max(height, seen_height))
+            elif subtype == '/Form' and depth < MAX_FORM_DEPTH:
+                visit(xobject.get('/Resources'), width, height, depth + 1)
+
+    for page in reader.pages:
+        box = page.mediabox
+        visit(page.get('/Resources'), abs(float(box.width)) / 72, abs(float(box.height)) / 72, 0)
+    return images
+
+
+def _make_job(key: ObjectKey, image: Any, page_width: float, page_height: float,
+              options: OptimizeOptions) -> Optional[_ImageJob]:
+    filter_name = _single_filter(image)
+    components = _components(image)
+    if (filter_name is None or components is None or image.get('/BitsPerComponent') != 8
+            or image.get('/ImageMask') or '/Decode' in image):
+        return None
+    width, height = int(image['/Width']), int(image['/Height'])
+    if width * height < MIN_IMAGE_PIXELS:
+        return None
+
+    target_width = math.ceil(page_width * options.target_dpi)
+    target_height = math.ceil(page_height * options.target_dpi)
+    scale = min(1.0, max(target_width / width, target_height / height))
+    image_format = options.image_format
+    if image_format == 'auto':
+        image_format = 'jpeg' if filter_name == '/DCTDecode' else 'flate'
+    return _ImageJob(key, image._data, filter_name, _plain_parms(image.get('/DecodeParms')),
+                     width, height, components,
+                     max(1, round(width * scale)), max(1, round(height * scale)),
+                     image_format, options.quality)
+
+
+def _recompress(job: _ImageJob) -> Tuple[ObjectKey, Optional[bytes], str, int, int]:
+    """Worker: decode, resample and re-encode one image; data is None if not smaller"""
+    from PIL import Image
+
+    mode = 'RGB' if job.components == 3 else 'L'
+    if job.filter == '/DCTDecode':
+        image = Image.open(io.BytesIO(job.data))
+        if image.mode != mode:
+            return job.key, None, '', 0, 0
+    else:
+        from PyPDF2.filters import FlateDecode
+        raw = FlateDecode.decode(job.data, job.decode_parms)
+        image = Image.frombytes(mode, (job.width, job.height), raw)
+
+    size = (job.target_width, job.target_height)
+    if size != image.size:
+        image = image.resize(size, Image.LANCZOS)
+
+    if job.image_format == 'jpeg':
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=job.quality, optimize=True)
+        data, filter_name = buffer.getvalue(), '/DCTDecode'
+    else:
+        data, filter_name = zlib.compress(image.tobytes(), 9), '/FlateDecode'
+
+    if len(data) >= len(job.data):
+        return job.key, None, '', 0, 0
+    return job.key, data, filter_name, image.width, image.height
+
+
+def optimize_pdf(input_file: str, output_file: Optional[str] = None,
+                 options: Optional[OptimizeOptions] = None,
+                 progress: Optional[Callable[[int, int, str], None]] = None,
+                 cancel: Optional[threading.Event] = None) -> OptimizeResult:
+    """Downsample and recompress the images of ``input_file``
+
+    The result goes to ``output_file`` (by default ``input_file`` is
+    replaced).  ``cancel`` is checked between images; ``progress`` receives
+    (done, total, message).
+    """
+    options = options or OptimizeOptions()
+    if options.image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format: {options.image_format}")
+    output_file = output_file or input_file
+    original_bytes = os.path.getsize(input_file)
+
+    reader = open_reader(input_file)
+    jobs: List[_ImageJob] = []
+    skipped = 0
+    for key, (ref, page_width, page_height) in _collect_images(reader).items():
+        job = _make_job(key, ref.get_object(), page_width, page_height, options)
+        if job is None:
+            skipped += 1
+        else:
+            jobs.append(job)
+
+    results = []
+    workers = min(options.workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        # spawn: the pool may be started from a GUI or server thread
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            for done, result in enumerate(executor.map(_recompress, jobs), 1):
+                if cancel is not None and cancel.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise OptimizeCancelled("Optimization cancelled")
+                results.append(result)
+                if progress is not None:
+                    progress(done, len(jobs), f"Recompressed image {done}")
+    else:
+        for done, job in enumerate(jobs, 1):
+            if cancel is not None and cancel.is_set():
+                raise OptimizeCancelled("Optimization cancelled")
+            results.append(_recompress(job))
+            if progress is not None:
+                progress(done, len(jobs), f"Recompressed image {done}")
+
+    recompressed = 0
+    for (idnum, generation), data, filter_name, width, height in results:
+        if data is None:
+            skipped += 1
+            continue
+        image = reader.get_object(IndirectObject(idnum, generation, reader))
+        image._data = data
+        image.decoded_self = None
+        image[NameObject('/Filter')] = NameObject(filter_name)
+        image[NameObject('/Width')] = NumberObject(width)
+        image[NameObject('/Height')] = NumberObject(height)
+        if '/DecodeParms' in image:
+            del image['/DecodeParms']
+        recompressed += 1
+
+    result = OptimizeResult(output_file, original_bytes, original_bytes,
+                            images_recompressed=recompressed, images_skipped=skipped)
+    if not recompressed:
+        if output_file != input_file:
+            shutil.copyfile(input_file, output_file)
+        return result
+
+    writer = PdfWriter()
+    writer.append(reader)
+    if reader.metadata:
+        writer.add_metadata(reader.metadata)
+    with replacing(output_file) as partial_file, open(partial_file, 'wb') as out:
+        writer.write(out)
+    result.optimized_bytes = os.path.getsize(output_file)
+    return result
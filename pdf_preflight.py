@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Pre-flight checks of merge inputs for PDF Manager
+A merge reads its inputs one after the other, so a corrupt or encrypted
+file near the end of a long list fails the whole merge after everything
+before it was copied.  ``preflight`` checks every input first, in worker
+processes:
+
+- a ``%PDF-`` header near the start and a ``%%EOF`` marker near the end
+- cross-reference health: ``startxref`` points at a cross-reference
+  section, and every entry points at the object it claims to
+- encryption
+- the page tree: it can be walked, has pages and agrees with its /Count
+
+Files that fail are quarantined with the reasons.  With ``repair``, files
+whose problems are recoverable (damaged cross-reference table, missing
+trailer, wrong /Count) are rewritten into ``repair_dir`` from a
+reconstructed cross-reference table, checked again and merged in their
+place; files that cannot be read at all, have no pages or are encrypted
+are always quarantined.
+
+Page counts come back with the report.  When the checks run in this
+process (one worker, or a single file), the parsed readers are handed back,
+so the merge copies from them instead of parsing the files again.  Worker
+processes cannot hand back a reader, so they send the cross-reference
+tables and trailer they read instead (``XrefSnapshot``): the merge opens
+each file from those without reading its cross-reference sections again,
+unless the file changed in between.  The page tree is walked again either
+way, as copying resolves every page.
+"""
+
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import DictionaryObject, IndirectObject, NameObject
+
+import pdf_metrics
+from pdf_io import map_file, open_reader
+
+# Where the header and %%EOF marker are looked for, in bytes from either end
+HEADER_SEARCH_BYTES = 1024
+EOF_SEARCH_BYTES = 1024
+
+# Appended to a damaged file: an invalid startxref makes the reader rebuild
+# the cross-reference table by scanning for objects
+RECOVERY_TAIL = b"\nstartxref\n1\n%%EOF\n"
+
+_OBJECT_HEADER = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj\b")
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+
+
+class PreflightCancelled(Exception):
+    pass
+
+
+@dataclass
+class PreflightOptions:
+    repair: bool = False  # rewrite recoverable files instead of quarantining them
+    workers: Optional[int] = None  # processes; defaults to the CPU count
+
+
+@dataclass
+class XrefSnapshot:
+    """The cross-reference tables and trailer a check read, to open the file again without them"""
+    path: str  # the file they belong to: the input or its repaired copy
+    size: int
+    mtime_ns: int
+    xref: Dict[int, Dict[int, int]]
+    xref_free_entry: Dict[int, Dict[int, bool]]
+    xref_objStm: Dict[int, Tuple[int, int]]
+    xref_index: int
+    trailer: bytes
+
+    @classmethod
+    def capture(cls, path: str, reader: PdfReader) -> "XrefSnapshot":
+        st = os.stat(path)
+        trailer = io.BytesIO()
+        reader.trailer.write_to_stream(trailer, None)
+        return cls(path, st.st_size, st.st_mtime_ns, reader.xref, reader.xref_free_entry,
+                   reader.xref_objStm, reader.xref_index, trailer.getvalue())
+
+    def open(self) -> Optional[PdfReader]:
+        """A reader over the file using these tables, or None if the file changed since"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (self.size, self.mtime_ns):
+            return None
+        with pdf_metrics.span("parse", file=os.path.basename(self.path)) as span:
+            reader = _SnapshotReader(map_file(self.path), self)
+            span.add(input_bytes=st.st_size)
+            return reader
+
+
+class _SnapshotReader(PdfReader):
+    """PdfReader that takes its cross-reference tables from a snapshot instead of the file"""
+
+    def __init__(self, stream, snapshot: XrefSnapshot) -> None:
+        self._snapshot = snapshot
+        super().__init__(stream)
+
+    def read(self, stream) -> None:
+        snapshot = self._snapshot
+        self.xref = snapshot.xref
+        self.xref_free_entry = snapshot.xref_free_entry
+        self.xref_objStm = snapshot.xref_objStm
+        self.xref_index = snapshot.xref_index
+        self.trailer = DictionaryObject.read_from_stream(io.BytesIO(snapshot.trailer), self)
+
+
+@dataclass
+class FileCheck:
+    path: str
+    pages: int = 0
+    reason: str = ""  # why the file is quarantined; empty when it passed
+    problems: List[str] = field(default_factory=list)  # everything found, repaired or not
+    repairable: bool = False
+    repaired_file: Optional[str] = None  # the rewritten copy to merge instead
+    xref: Optional[XrefSnapshot] = field(default=None, repr=False)  # set by check_file on passed files
+
+    @property
+    def ok(self) -> bool:
+        return not self.reason
+
+
+@dataclass
+class PreflightReport:
+    checks: List[FileCheck] = field(default_factory=list)  # in input order
+
+    @property
+    def passed(self) -> List[FileCheck]:
+        return [check for check in self.checks if check.ok]
+
+    @property
+    def quarantined(self) -> List[FileCheck]:
+        return [check for check in self.checks if not check.ok]
+
+    @property
+    def repaired(self) -> List[FileCheck]:
+        return [check for check in self.checks if check.repaired_file]
+
+    @property
+    def pages(self) -> int:
+        return sum(check.pages for check in self.passed)
+
+
+def _startxref_problem(data: bytes) -> Optional[str]:
+    found = list(_STARTXREF.finditer(data[-EOF_SEARCH_BYTES:]))
+    if not found:
+        return "No startxref"
+    offset = int(found[-1].group(1))
+    if data[offset:offset + 4] != b"xref" and not _OBJECT_HEADER.match(data, offset, offset + 40):
+        return "startxref does not point at a cross-reference section"
+    return None
+
+
+def _xref_problem(data: bytes, reader: PdfReader) -> Optional[str]:
+    """Entries of the cross-reference table that do not point at their object"""
+    entries = wrong = 0
+    for generation, table in reader.xref.items():
+        for number, offset in table.items():
+            if number == 0:
+                continue  # head of the free list
+            entries += 1
+            match = _OBJECT_HEADER.match(data, offset, offset + 40)
+            if match is None or (int(match.group(1)), int(match.group(2))) != (number, generation):
+                wrong += 1
+    if wrong:
+        return f"{wrong} of {entries} cross-reference entries point at the wrong place"
+    return None
+
+
+def _count_pages(reader: PdfReader) -> int:
+    """Pages in the page tree, walked without trusting it (PdfReader.pages can
+    spin for minutes on a tree with missing nodes)"""
+    pages = 0
+    seen = set()
+    pending = [reader.trailer['/Root'].raw_get('/Pages')]
+    while pending:
+        ref = pending.pop()
+        if isinstance(ref, IndirectObject):
+            if (ref.idnum, ref.generation) in seen:
+                raise ValueError(f"Page tree node {ref.idnum} is referenced twice")
+            seen.add((ref.idnum, ref.generation))
+        node = ref.get_object()
+        if not isinstance(node, DictionaryObject):
+            raise ValueError(f"Page tree node {getattr(ref, 'idnum', '?')} is missing")
+        if '/Kids' in node:
+            pending.extend(node['/Kids'])
+        else:
+            pages += 1
+    return pages
+
+
+def _rebuilt_reader(data: bytes) -> PdfReader:
+    """A reader over ``data`` with the cross-reference table rebuilt from the objects found"""
+    reader = PdfReader(io.BytesIO(data[:] + RECOVERY_TAIL), strict=False)
+    _recover_root(reader)
+    return reader
+
+
+def _recover_root(reader: PdfReader) -> None:
+    """Find the document catalog of a file whose trailer was lost"""
+    if '/Root' in reader.trailer:
+        return
+    for generation, table in reader.xref.items():
+        for number in table:
+            try:
+                obj = reader.get_object(IndirectObject(number, generation, reader))
+            except Exception:
+                continue
+            if isinstance(obj, DictionaryObject) and obj.get('/Type') == '/Catalog':
+                reader.trailer[NameObject('/Root')] = IndirectObject(number, generation, reader)
+                return
+    raise ValueError("No document catalog found")
+
+
+def _inspect(path: str) -> Tuple[FileCheck, Optional[PdfReader]]:
+    """Check ``path``; returns the check and, if it could be parsed, the reader"""
+    check = FileCheck(path)
+    if os.path.getsize(path) == 0:
+        check.reason = "Empty file"
+        return check, None
+    data = map_file(path)
+    if isinstance(data, io.BytesIO):
+        data = data.getvalue()
+    if b"%PDF-" not in data[:HEADER_SEARCH_BYTES]:
+        check.reason = "Not a PDF file (no %PDF- header)"
+        return check, None
+
+    truncated = b"%%EOF" not in data[-EOF_SEARCH_BYTES:]
+    if truncated:
+        check.problems.append("No %%EOF marker; the file looks truncated")
+    else:
+        problem = _startxref_problem(data)
+        if problem:
+            check.problems.append(problem)
+    try:
+        reader = _rebuilt_reader(data) if check.problems else open_reader(path)
+        if reader.is_encrypted:
+            check.reason = "Encrypted (password protected)"
+            return check, None
+        if not check.problems:
+            problem = _xref_problem(data, reader)
+            if problem:
+                check.problems.append(problem)
+                reader = _rebuilt_reader(data)
+    except Exception as e:
+        check.reason = f"Cannot be read: {e or type(e).__name__}"
+        return check, None
+
+    try:
+        check.pages = _count_pages(reader)
+        pages_node = reader.trailer['/Root']['/Pages']
+        count = pages_node['/Count'] if '/Count' in pages_node else None
+    except Exception as e:
+        check.reason = f"Damaged page tree: {e or type(e).__name__}"
+        return check, None
+    if check.pages == 0:
+        check.reason = "No pages"
+        return check, None
+    if count != check.pages:
+        check.problems.append(f"Page count says {count} but the page tree has {check.pages} pages")
+    if check.problems:
+        check.repairable = True
+        check.reason = "; ".join(check.problems)
+    return check, reader
+
+
+def _repair(reader: PdfReader, path: str, repair_dir: str) -> str:
+    """Write the pages of ``reader`` to a fresh file in ``repair_dir``"""
+    writer = PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    fd, repaired_file = tempfile.mkstemp(dir=repair_dir, suffix="-" + os.path.basename(path))
+    with os.fdopen(fd, 'wb') as out:
+        writer.write(out)
+    return repaired_file
+
+
+def _check(path: str, repair_dir: Optional[str]) -> Tuple[FileCheck, Optional[PdfReader]]:
+    check, reader = _inspect(path)
+    if check.ok or not check.repairable or repair_dir is None:
+        return check, reader if check.ok else None
+    try:
+        repaired_file = _repair(reader, path, repair_dir)
+    except Exception as e:
+        check.reason += f" (repair failed: {e or type(e).__name__})"
+        return check, None
+    recheck, reader = _inspect(repaired_file)
+    if not recheck.ok:
+        check.reason += f" (repair failed: {recheck.reason})"
+        return check, None
+    check.reason, check.pages, check.repaired_file = "", recheck.pages, repaired_file
+    return check, reader
+
+
+def check_file(path: str, repair_dir: Optional[str] = None) -> FileCheck:
+    """Check one file; with ``repair_dir``, recoverable files are repaired into it
+
+    Passed files carry the cross-reference tables read, in ``check.xref``.
+    """
+    check, reader = _check(path, repair_dir)
+    if reader is not None:
+        check.xref = XrefSnapshot.capture(check.repaired_file or path, reader)
+    return check
+
+
+def preflight(paths: Sequence[str], options: Optional[PreflightOptions] = None,
+              repair_dir: Optional[str] = None,
+              readers: Optional[Dict[str, PdfReader]] = None,
+              progress: Optional[Callable[[int, int, str], None]] = None,
+              cancel: Optional[threading.Event] = None) -> PreflightReport:
+    """Check every file of ``paths`` concurrently
+
+    ``repair_dir`` is required with ``options.repair``.  Readers parsed in
+    this process are stored in ``readers`` by path, for the caller to reuse;
+    checks done in worker processes carry an ``XrefSnapshot`` instead.
+    """
+    options = options or PreflightOptions()
+    if options.repair and repair_dir is None:
+        raise ValueError("Repairing needs a folder for the repaired files")
+    repair_dir = repair_dir if options.repair else None
+    report = PreflightReport()
+    workers = min(options.workers or os.cpu_count() or 1, len(paths))
+    if workers < 2:
+        for done, path in enumerate(paths, 1):
+            if cancel is not None and cancel.is_set():
+                raise PreflightCancelled("Pre-flight check cancelled")
+            check, reader = _check(path, repair_dir)
+            report.checks.append(check)
+            if reader is not None and readers is not None:
+                readers[path] = reader
+            if progress is not None:
+                progress(done, len(paths), f"Checked {os.path.basename(path)}")
+        return report
+
+    # spawn: the pool may be started from a GUI or server thread
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(check_file, path, repair_dir) for path in paths]
+        pending = set(futures)
+        try:
+            while pending:
+                finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                if progress is not None and finished:
+                    progress(len(paths) - len(pending), len(paths), "Checking files")
+                if cancel is not None and cancel.is_set():
+                    raise PreflightCancelled("Pre-flight check cancelled")
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+    report.checks = [future.result() for future in futures]
+    return report
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Fast PDF page-count probe for PDF Manager
+Opening a PDF with PdfReader only parses the header, cross-reference table
+and trailer; it is ``reader.pages`` that walks (and flattens) the whole page
+tree.  The probe reads the page count from the root ``/Pages`` node's
+``/Count`` instead, and keeps the opened reader so the slice that usually
+follows reuses it rather than parsing the file again.
+
+Readers are cached by path and invalidated when the file's mtime or size
+changes.  A cached reader keeps its file mapped (see pdf_io), so only the
+few most recent files are kept.  PdfReader is not thread-safe, so a reader is lent
+to one operation at a time; concurrent operations on the same file each
+get their own.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Tuple
+
+from PyPDF2 import PdfReader
+
+import pdf_metrics
+from pdf_io import open_reader
+
+# Number of recently probed files whose readers are kept
+READER_CACHE_SIZE = 4
+
+FileStamp = Tuple[int, int]
+
+
+@dataclass
+class _Entry:
+    stamp: FileStamp
+    reader: PdfReader
+    page_count: int
+
+
+_readers: "OrderedDict[str, _Entry]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _stamp(path: str) -> FileStamp:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _count_pages(reader: PdfReader) -> int:
+    try:
+        count = reader.trailer['/Root']['/Pages']['/Count']
+        if isinstance(count, int) and count >= 0:
+            return int(count)
+    except Exception:
+        pass
+    # Missing or damaged /Count: fall back to walking the tree
+    return len(reader.pages)
+
+
+def _store(key: str, entry: _Entry) -> None:
+    with _lock:
+        _readers[key] = entry
+        _readers.move_to_end(key)
+        while len(_readers) > READER_CACHE_SIZE:
+            _readers.popitem(last=False)
+
+
+def _open(key: str, stamp: FileStamp) -> _Entry:
+    reader = open_reader(key)
+    return _Entry(stamp, reader, _count_pages(reader))
+
+
+def page_count(path: str) -> int:
+    """Number of pages in ``path``, without walking the page tree"""
+    key = os.path.abspath(path)
+    with pdf_metrics.span("probe"):
+        stamp = _stamp(key)
+        with _lock:
+            entry = _readers.get(key)
+        if entry is None or entry.stamp != stamp:
+            entry = _open(key, stamp)
+            _store(key, entry)
+        return entry.page_count
+
+
+@contextmanager
+def borrow_reader(path: str) -> Iterator[PdfReader]:
+    """Lend the cached PdfReader for ``path`` (or a new one), then cache it again"""
+    key = os.path.abspath(path)
+    stamp = _stamp(key)
+    with _lock:
+        entry = _readers.pop(key, None)
+    if entry is None or entry.stamp != stamp:
+        entry = _open(key, stamp)
+    try:
+        yield entry.reader
+    finally:
+        _store(key, entry)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Merge manifests for incremental re-merging
+A merge written with ``incremental=True`` keeps every input's pages under
+a /Pages node of their own (a segment) and records, next to the output in
+``<output>.merge.json``, each input's SHA-256, size, modification time,
+page span and segment node.  When the same merge is run again:
+
+- inputs whose content is unchanged reuse their segment as it is in the
+  previous output, wherever they now sit in the list
+- changed and new inputs are the only ones parsed and copied, appended as
+  an incremental update that also rewrites the root's list of segments
+
+So the rebuild costs what changed, not the whole merge.  Replaced segments
+stay in the file as unreferenced objects; once they add up to more than
+``COMPACT_RATIO`` times the live content, the output is rewritten in full,
+still copying unchanged segments from the previous output rather than
+re-parsing their inputs.
+
+A manifest only applies to the exact file it was written with: if the
+output's size or modification time differ (edited, optimized, replaced),
+the next run rebuilds from the inputs.
+"""
+
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pdf_cache import file_digest
+
+MANIFEST_SUFFIX = ".merge.json"
+MANIFEST_VERSION = 1
+
+# Full rewrite once replaced segments exceed this share of the live inputs' bytes
+COMPACT_RATIO = 1.0
+
+
+@dataclass
+class Segment:
+    """One input's pages in a merged output"""
+    path: str
+    digest: str
+    size: int
+    mtime_ns: int
+    first_page: int = 0  # 0-based, in the output
+    pages: int = 0
+    node: Tuple[int, int] = (0, 0)  # object number and generation of its /Pages node
+
+
+@dataclass
+class MergeManifest:
+    output_size: int = 0
+    output_mtime_ns: int = 0
+    dedup: bool = False
+    stale_bytes: int = 0  # input bytes of segments no longer referenced
+    segments: List[Segment] = field(default_factory=list)
+
+    @property
+    def live_bytes(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    def needs_compaction(self) -> bool:
+        return self.stale_bytes > COMPACT_RATIO * max(1, self.live_bytes)
+
+
+def manifest_path(output_file: str) -> str:
+    return output_file + MANIFEST_SUFFIX
+
+
+def load_merge_manifest(output_file: str) -> Optional[MergeManifest]:
+    """The manifest written with ``output_file``, or None if missing, unreadable or stale"""
+    try:
+        with open(manifest_path(output_file), encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        segments = [Segment(**dict(segment, node=tuple(segment["node"]))) for segment in data["segments"]]
+        manifest = MergeManifest(output_size=data["output_size"], output_mtime_ns=data["output_mtime_ns"],
+                                 dedup=data["dedup"], stale_bytes=data["stale_bytes"], segments=segments)
+        st = os.stat(output_file)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if (st.st_size, st.st_mtime_ns) != (manifest.output_size, manifest.output_mtime_ns):
+        return None
+    return manifest
+
+
+def save_merge_manifest(output_file: str, manifest: MergeManifest) -> None:
+    """Stamp ``manifest`` with the output's current size and mtime and write it next to the output"""
+    st = os.stat(output_file)
+    manifest.output_size, manifest.output_mtime_ns = st.st_size, st.st_mtime_ns
+    data = dict(asdict(manifest), version=MANIFEST_VERSION)
+    path = manifest_path(output_file)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            json.dump(data, out, indent=1)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def remove_merge_manifest(output_file: str) -> None:
+    try:
+        os.unlink(manifest_path(output_file))
+    except FileNotFoundError:
+        pass
+
+
+def describe_inputs(input_files: Sequence[str], previous: Optional[MergeManifest]) -> List[Segment]:
+    """A Segment (without page span) per input; unchanged size and mtime reuse the recorded hash"""
+    known: Dict[Tuple[str, int, int], str] = {}
+    if previous is not None:
+        known = {(s.path, s.size, s.mtime_ns): s.digest for s in previous.segments}
+    described = []
+    for path in input_files:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        digest = known.get((path, st.st_size, st.st_mtime_ns)) or file_digest(path)
+        described.append(Segment(path, digest, st.st_size, st.st_mtime_ns))
+    return described
+
+
+def match_segments(inputs: Sequence[Segment],
+                   previous: Optional[MergeManifest]) -> List[Optional[Segment]]:
+    """The previous segment each input can reuse (same content), aligned with ``inputs``
+
+    A segment is reused at most once; identical inputs listed twice get a
+    copy the second time.  Same-path matches are preferred.
+    """
+    if previous is None:
+        return [None] * len(inputs)
+    available: Dict[str, List[Segment]] = {}
+    for segment in previous.segments:
+        available.setdefault(segment.digest, []).append(segment)
+    matched: List[Optional[Segment]] = []
+    for described in inputs:
+        candidates = available.get(described.digest) or []
+        segment = next((s for s in candidates if s.path == described.path), candidates[0] if candidates else None)
+        if segment is not None:
+            candidates.remove(segment)
+        matched.append(segment)
+    return matched
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Draft PPTX renderer for PDF Manager
+Draws slides with python-pptx and Pillow, without LibreOffice or PowerPoint:
+- render_slides: one Pillow image per slide, e.g. for previews
+- render_deck: a deck to a PDF with one raster page per slide
+- draft_id: renderer identity used in conversion cache keys
+
+This is a draft-quality engine.  It draws solid backgrounds, pictures,
+rectangles, ellipses, lines, tables and plain text (wrapped to the shape,
+with size, bold, colour and alignment), including the non-placeholder
+shapes of the slide layout and master.  Theme colours, gradients, rotation,
+charts, SmartArt and effects are not interpreted; charts are drawn as an
+outlined box.  Pages are images, so text in the output is not selectable.
+"""
+
+import io
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Bump when the output changes, so cached conversions are redrawn
+RENDERER_VERSION = 1
+
+DEFAULT_DPI = 96
+EMU_PER_INCH = 914400
+
+# Slides kept in memory before they are written to the output PDF
+PAGES_PER_WRITE = 4
+
+JPEG_QUALITY = 85
+
+DEFAULT_FONT_PT = 18
+DEFAULT_TEXT_COLOR = (0, 0, 0)
+# Stand-in for theme and scheme colours, which are not resolved
+SCHEME_FILL_COLOR = (68, 114, 196)
+SCHEME_LINE_COLOR = (47, 82, 143)
+PLACEHOLDER_OUTLINE = (191, 191, 191)
+
+# Looked up on the system font path by Pillow; the first one found is used
+FONT_FILES = ('DejaVuSans.ttf', 'LiberationSans-Regular.ttf', 'Arial.ttf', 'arial.ttf',
+              'Helvetica.ttc')
+BOLD_FONT_FILES = ('DejaVuSans-Bold.ttf', 'LiberationSans-Bold.ttf', 'Arial Bold.ttf',
+                   'arialbd.ttf')
+
+_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+Color = Tuple[int, int, int]
+# Maps shape coordinates (EMU) to pixels: x * scale_x + offset_x
+Transform = Tuple[float, float, float, float]
+
+
+def draft_id(dpi: int = DEFAULT_DPI) -> str:
+    return f"draft-{RENDERER_VERSION}-{dpi}dpi"
+
+
+@lru_cache(maxsize=64)
+def _font(size_px: int, bold: bool) -> Any:
+    for name in (BOLD_FONT_FILES if bold else ()) + FONT_FILES:
+        try:
+            return ImageFont.truetype(name, size_px)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size_px)
+    except TypeError:  # Pillow without FreeType sizes
+        return ImageFont.load_default()
+
+
+def _rgb(color_format: Any, fallback: Optional[Color]) -> Optional[Color]:
+    """An explicit RGB colour, or ``fallback`` for theme colours"""
+    try:
+        if color_format.type is None:
+            return fallback
+        rgb = color_format.rgb
+    except (AttributeError, TypeError, ValueError):
+        return fallback
+    return (rgb[0], rgb[1], rgb[2]) if rgb is not None else fallback
+
+
+def _solid_fill(fill: Any, fallback: Optional[Color],
+                inherited: Optional[Color] = None) -> Optional[Color]:
+    """The fill colour; ``inherited`` is used when the shape sets no fill"""
+    from pptx.enum.dml import MSO_FILL
+
+    try:
+        fill_type = fill.type
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if fill_type is None:
+        return inherited
+    if fill_type == MSO_FILL.SOLID:
+        return _rgb(fill.fore_color, fallback)
+    if fill_type in (MSO_FILL.GRADIENT, MSO_FILL.PATTERNED):
+        return fallback
+    return None
+
+
+class _SlideCanvas:
+    def __init__(self, width_emu: int, height_emu: int, dpi: int,
+                 text_styles: Dict[Any, Dict[str, Dict[int, float]]]) -> None:
+        self.scale = dpi / EMU_PER_INCH
+        self.text_styles = text_styles  # master element -> style name -> level -> size
+        size = (max(1, round(width_emu * self.scale)), max(1, round(height_emu * self.scale)))
+        self.image = Image.new('RGB', size, 'white')
+        self.draw = ImageDraw.Draw(self.image)
+
+    def box(self, shape: Any, transform: Transform) -> Optional[Tuple[int, int, int, int]]:
+        if shape.left is None or shape.top is None or shape.width is None or shape.height is None:
+            return None
+        scale_x, scale_y, offset_x, offset_y = transform
+        left = shape.left * scale_x + offset_x
+        top = shape.top * scale_y + offset_y
+        right = left + shape.width * scale_x
+        bottom = top + shape.height * scale_y
+        return (round(min(left, right)), round(min(top, bottom)),
+                round(max(left, right)), round(max(top, bottom)))
+
+    # Backgrounds and shapes
+    def background(self, slide: Any) -> None:
+        for source in (slide, slide.slide_layout, slide.slide_layout.slide_master):
+            try:
+                color = _solid_fill(source.background.fill, None)
+            except (AttributeError, KeyError):
+                color = None
+            if color is not None:
+                self.draw.rectangle([(0, 0), self.image.size], fill=color)
+                return
+
+    def shapes(self, shapes: Any, transform: Transform, placeholders: bool = True) -> None:
+        from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+        for shape in shapes:
+            if shape.is_placeholder and not placeholders:
+                continue
+            try:
+                shape_type = shape.shape_type
+            except NotImplementedError:
+                shape_type = None
+
+            if shape_type == MSO_SHAPE_TYPE.GROUP:
+                self.shapes(shape.shapes, _group_transform(shape, transform))
+            elif shape_type == MSO_SHAPE_TYPE.LINE or shape.__class__.__name__ == 'Connector':
+                self.connector(shape, transform)
+            elif getattr(shape, 'has_table', False) and shape.has_table:
+                self.table(shape, transform)
+            elif getattr(shape, 'has_chart', False) and shape.has_chart:
+                box = self.box(shape, transform)
+                if box is not None:
+                    self.draw.rectangle(box, outline=PLACEHOLDER_OUTLINE)
+            elif hasattr(shape, 'image'):
+                self.picture(shape, transform)
+            else:
+                self.autoshape(shape, transform)
+
+    def picture(self, shape: Any, transform: Transform) -> None:
+        box = self.box(shape, transform)
+        if box is None or box[2] <= box[0] or box[3] <= box[1]:
+            return
+        try:
+            picture = Image.open(io.BytesIO(shape.image.blob))
+            picture.draft('RGB', (box[2] - box[0], box[3] - box[1]))
+            picture = picture.convert('RGBA')
+        except Exception:
+            # Vector formats (EMF/WMF/SVG) and corrupt images
+            self.draw.rectangle(box, outline=PLACEHOLDER_OUTLINE)
+            return
+        picture = picture.resize((box[2] - box[0], box[3] - box[1]), Image.BILINEAR)
+        self.image.paste(picture, box[:2], picture)
+
+    def autoshape(self, shape: Any, transform: Transform) -> None:
+        from pptx.enum.shapes import MSO_SHAPE
+
+        box = self.box(shape, transform)
+        if box is None:
+            return
+        # Shapes drawn from a theme style (p:style) default to the accent colour
+        styled = _styled(shape)
+        fill = None
+        if hasattr(shape, 'fill'):
+            fill = _solid_fill(shape.fill, SCHEME_FILL_COLOR, SCHEME_FILL_COLOR if styled else None)
+        outline, width = self.line_style(shape)
+        if fill is not None or outline is not None:
+            try:
+                kind = shape.auto_shape_type
+            except (AttributeError, ValueError, NotImplementedError):
+                kind = None
+            if kind in (MSO_SHAPE.OVAL, MSO_SHAPE.FLOWCHART_CONNECTOR):
+                self.draw.ellipse(box, fill=fill, outline=outline, width=width)
+            elif kind in (MSO_SHAPE.ROUNDED_RECTANGLE, MSO_SHAPE.FLOWCHART_ALTERNATE_PROCESS):
+                radius = min(box[2] - box[0], box[3] - box[1]) // 6
+                self.draw.rounded_rectangle(box, radius, fill=fill, outline=outline, width=width)
+            else:
+                self.draw.rectangle(box, fill=fill, outline=outline, width=width)
+        if shape.has_text_frame:
+            self.text(shape.text_frame, box, self.text_style(shape))
+
+    def connector(self, shape: Any, transform: Transform) -> None:
+        scale_x, scale_y, offset_x, offset_y = transform
+        outline, width = self.line_style(shape)
+        try:
+            points = [(shape.begin_x * scale_x + offset_x, shape.begin_y * scale_y + offset_y),
+                      (shape.end_x * scale_x + offset_x, shape.end_y * scale_y + offset_y)]
+        except AttributeError:
+            box = self.box(shape, transform)
+            if box is None:
+                return
+            points = [box[:2], box[2:]]
+        self.draw.line(points, fill=outline or SCHEME_LINE_COLOR, width=width)
+
+    def line_style(self, shape: Any) -> Tuple[Optional[Color], int]:
+        try:
+            line = shape.line
+            color = _solid_fill(line.fill, SCHEME_LINE_COLOR, SCHEME_LINE_COLOR if _styled(shape) else None)
+            width = line.width
+        except (AttributeError, KeyError):
+            return None, 1
+        return color, max(1, round((width or 9525) * self.scale))
+
+    def table(self, shape: Any, transform: Transform) -> None:
+        box = self.box(shape, transform)
+        if box is None:
+            return
+        table = shape.table
+        column_edges = _edges(box[0], box[2], [column.width for column in table.columns])
+        row_edges = _edges(box[1], box[3], [row.height for row in table.rows])
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                if cell.is_spanned:
+                    continue
+                cell_box = (column_edges[c], row_edges[r],
+                            column_edges[min(c + cell.span_width, len(column_edges) - 1)],
+                            row_edges[min(r + cell.span_height, len(row_edges) - 1)])
+                fill = _solid_fill(cell.fill, None)
+                self.draw.rectangle(cell_box, fill=fill, outline=PLACEHOLDER_OUTLINE)
+                self.text(cell.text_frame, cell_box)
+
+    # Text
+    def text_style(self, shape: Any) -> Optional[Dict[int, float]]:
+        """Point sizes per level from the master's title or body text style"""
+        from pptx.enum.shapes import PP_PLACEHOLDER
+
+        if not shape.is_placeholder:
+            return None
+        try:
+            kind = shape.placeholder_format.type
+            master = shape.part.slide_layout.slide_master._element
+        except (AttributeError, ValueError):
+            return None
+        if master not in self.text_styles:
+            self.text_styles[master] = _master_text_sizes(master)
+        name = 'titleStyle' if kind in (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE) else 'bodyStyle'
+        return self.text_styles[master].get(name)
+
+    def text(self, text_frame: Any, box: Tuple[int, int, int, int],
+             style: Optional[Dict[int, float]] = None) -> None:
+        """Draw wrapped text; ``style`` maps outline levels to inherited point sizes"""
+        from pptx.enum.text import PP_ALIGN
+
+        inset = round(91440 * self.scale)  # PowerPoint's default 0.1" margin
+        left, top, right = box[0] + inset, box[1] + inset // 2, box[2] - inset
+        width = max(1, right - left)
+        y = top
+        for paragraph in text_frame.paragraphs:
+            runs = [(run.text, run.font) for run in paragraph.runs if run.text]
+            size_pt = next((font.size.pt for _, font in runs if font.size is not None), None)
+            if size_pt is None:
+                size_pt = (paragraph.font.size.pt if paragraph.font.size is not None
+                           else (style or {}).get(paragraph.level + 1, DEFAULT_FONT_PT))
+            size_px = max(4, round(size_pt / 72 * self.scale * EMU_PER_INCH))
+            bold = any(font.bold for _, font in runs) or bool(paragraph.font.bold)
+            color = next((_rgb(font.color, None) for _, font in runs if _rgb(font.color, None)), None)
+            font = _font(size_px, bold)
+            line_height = round(size_px * 1.2)
+
+            text = ''.join(text for text, _ in runs)
+            if paragraph.level:
+                left_indent = round(paragraph.level * 457200 * self.scale)
+            else:
+                left_indent = 0
+            for line in _wrap(self.draw, text, font, width - left_indent) if text else ['']:
+                line_width = self.draw.textlength(line, font=font)
+                if paragraph.alignment == PP_ALIGN.CENTER:
+                    x = left + (width - line_width) / 2
+                elif paragraph.alignment == PP_ALIGN.RIGHT:
+                    x = right - line_width
+                else:
+                    x = left + left_indent
+                self.draw.text((x, y), line, fill=color or DEFAULT_TEXT_COLOR, font=font)
+                y += line_height
+
+
+def _master_text_sizes(element: Any) -> Dict[str, Dict[int, float]]:
+    sizes: Dict[str, Dict[int, float]] = {}
+    for style in element.findall(f'{_P}txStyles/*'):
+        name = style.tag.rsplit('}', 1)[-1]
+        for level in range(1, 10):
+            default = style.find(f'{_A}lvl{level}pPr/{_A}defRPr')
+            if default is not None and default.get('sz'):
+                sizes.setdefault(name, {})[level] = int(default.get('sz')) / 100
+    return sizes
+
+
+def _styled(shape: Any) -> bool:
+    return shape._element.find(f'{_P}style') is not None
+
+
+def _group_transform(group: Any, transform: Transform) -> Transform:
+    """Compose ``transform`` with the child coordinate space of a group shape"""
+    scale_x, scale_y, offset_x, offset_y = transform
+    xfrm = group._element.grpSpPr.xfrm
+    if xfrm is None or xfrm.chExt is None or not xfrm.chExt.cx or not xfrm.chExt.cy:
+        return transform
+    group_x = group.width / xfrm.chExt.cx
+    group_y = group.height / xfrm.chExt.cy
+    return (scale_x * group_x, scale_y * group_y,
+            offset_x + (group.left - xfrm.chOff.x * group_x) * scale_x,
+            offset_y + (group.top - xfrm.chOff.y * group_y) * scale_y)
+
+
+def _edges(start: int, end: int, sizes: Sequence[int]) -> List[int]:
+    total = sum(sizes) or 1
+    edges, position = [start], 0
+    for size in sizes:
+        position += size
+        edges.append(start + round((end - start) * position / total))
+    return edges
+
+
+def _wrap(draw: Any, text: str, font: Any, width: int) -> List[str]:
+    lines = []
+    for chunk in text.replace('\v', '\n').split('\n'):
+        line = ''
+        for word in chunk.split(' '):
+            candidate = f"{line} {word}" if line else word
+            if line and draw.textlength(candidate, font=font) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def render_slides(pptx_file: str, dpi: int = DEFAULT_DPI,
+                  slides: Optional[Sequence[int]] = None) -> Iterator[Image.Image]:
+    """Yield an RGB image of each slide (or of the 0-based ``slides``)"""
+    from pptx import Presentation
+
+    presentation = Presentation(pptx_file)
+    all_slides = list(presentation.slides)
+    text_styles: Dict[Any, Dict[str, Dict[int, float]]] = {}
+    for index in (range(len(all_slides)) if slides is None else slides):
+        slide = all_slides[index]
+        canvas = _SlideCanvas(presentation.slide_width, presentation.slide_height, dpi, text_styles)
+        transform = (canvas.scale, canvas.scale, 0.0, 0.0)
+        canvas.background(slide)
+        layout = slide.slide_layout
+        canvas.shapes(layout.slide_master.shapes, transform, placeholders=False)
+        canvas.shapes(layout.shapes, transform, placeholders=False)
+        canvas.shapes(slide.shapes, transform)
+        yield canvas.image
+
+
+def render_deck(pptx_file: str, output_file: str, dpi: int = DEFAULT_DPI) -> str:
+    """Render ``pptx_file`` to ``output_file`` as a PDF with one page per slide"""
+    first = True
+    batch: List[Image.Image] = []
+
+    def flush() -> None:
+        nonlocal first
+        batch[0].save(output_file, 'PDF', save_all=True, append_images=batch[1:], append=not first,
+                      resolution=dpi, quality=JPEG_QUALITY)
+        first = False
+        batch.clear()
+
+    for image in render_slides(pptx_file, dpi):
+        batch.append(image)
+        if len(batch) >= PAGES_PER_WRITE:
+            flush()
+    if batch:
+        flush()
+    if first:
+        raise ValueError(f"{os.path.basename(pptx_file)} has no slides")
+    return output_file
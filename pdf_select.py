@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Page selection expressions for PDF Manager
+Items are separated by newlines or commas; pages are 1-based:
+- 7           a single page
+- 3-9         a range; 9-3 gives the same pages in reverse order
+- 10-         page 10 to the last page
+- -1, -5--1   pages counted from the end (-1 is the last page)
+- 1-100:2     every second page of a range
+- odd, even   all odd or even pages; also as a filter, e.g. 1-20:even
+- 1-20:3:odd  a step and then a filter: pages 1, 7, 13 and 19
+- all         every page
+- !4, !10-12  exclude pages from everything else that is selected
+- reverse     reverse the final order
+
+An expression is compiled once into terms that do not depend on the
+document; resolving it against a page count validates every term and
+produces a compact ``array('i')`` of 0-based indices in one pass.
+``runs`` collapses that array into contiguous stretches that can be copied
+in bulk.
+"""
+
+import re
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Union
+
+SelectionInput = Union[str, Sequence[str]]
+
+_ITEM = re.compile(r"""
+    ^(?P<exclude>!)?\s*
+    (?:
+        (?P<keyword>all|odd|even)
+      | (?P<start>-?\d+) \s* (?:(?P<dash>-) \s* (?P<end>-?\d+)?)?
+    )
+    \s* (?::\s*(?P<step>\d+))?
+    \s* (?::\s*(?P<parity>odd|even))? $
+""", re.IGNORECASE | re.VERBOSE)
+
+
+class SelectionError(ValueError):
+    """Raised for an expression that is malformed or does not fit the document"""
+
+
+@dataclass(frozen=True)
+class _Term:
+    text: str
+    start: Optional[int]  # 1-based or negative; None means page 1 / last page
+    end: Optional[int]
+    step: int = 1
+    parity: Optional[int] = None  # keep pages whose 1-based number % 2 == parity
+    exclude: bool = False
+
+    def indices(self, total_pages: int) -> range:
+        """0-based indices of this term, checked against ``total_pages``"""
+        first = self._index(self.start, 0, total_pages)
+        last = self._index(self.end, total_pages - 1, total_pages)
+        direction = 1 if last >= first else -1
+        pages = range(first, last + direction, direction * self.step)
+        if self.parity is not None:
+            # 0-based index i is page i + 1: keep i with (i + 1) % 2 == parity
+            offset = next((n for n, i in enumerate(pages[:2]) if (i + 1) % 2 == self.parity), None)
+            if offset is None:
+                return range(0)
+            pages = pages[offset::1 if self.step % 2 == 0 else 2]
+        return pages
+
+    def _index(self, page: Optional[int], default: int, total_pages: int) -> int:
+        if page is None:
+            return default
+        index = page - 1 if page > 0 else total_pages + page
+        if page == 0 or not 0 <= index < total_pages:
+            if self.start == self.end:
+                raise SelectionError(f"Page {self.text} is out of range (1-{total_pages})")
+            raise SelectionError(f"Range {self.text} exceeds total pages ({total_pages})")
+        return index
+
+
+class PageSelection:
+    """A compiled selection expression"""
+
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self.terms: List[_Term] = []
+        self.reverse = False
+        for item in re.split(r'[\n,]', expression):
+            item = item.strip()
+            if not item:
+                continue
+            if item.lower() == 'reverse':
+                self.reverse = not self.reverse
+            else:
+                self.terms.append(_parse_item(item))
+        if not any(not term.exclude for term in self.terms):
+            raise SelectionError("No valid page ranges found")
+
+    def groups(self, total_pages: int) -> List[array]:
+        """Indices of each included item, with exclusions applied"""
+        if total_pages < 1:
+            raise SelectionError("The document has no pages")
+        excluded = bytearray(total_pages)
+        for term in self.terms:
+            if term.exclude:
+                for i in term.indices(total_pages):
+                    excluded[i] = 1
+        any_excluded = any(excluded)
+
+        groups = []
+        for term in self.terms:
+            if term.exclude:
+                continue
+            indices = term.indices(total_pages)
+            if any_excluded:
+                groups.append(array('i', (i for i in indices if not excluded[i])))
+            else:
+                groups.append(array('i', indices))
+        if self.reverse:
+            groups = [array('i', reversed(group)) for group in reversed(groups)]
+        return groups
+
+    def resolve(self, total_pages: int) -> array:
+        """0-based page indices, in output order"""
+        indices = array('i')
+        for group in self.groups(total_pages):
+            indices.extend(group)
+        if not indices:
+            raise SelectionError("The selection does not include any pages")
+        return indices
+
+
+def _parse_item(item: str) -> _Term:
+    match = _ITEM.match(item)
+    if match is None:
+        if ':' in item and _ITEM.match(item.split(':', 1)[0].strip()):
+            raise SelectionError(f"Invalid filter in {item}\n"
+                                 f"Use :N, :odd, :even or :N:odd (e.g., 1-20:3:odd)")
+        raise SelectionError(f"Invalid range format: {item}\nUse format: start-end (e.g., 1-5)")
+
+    keyword = (match.group('keyword') or '').lower()
+    step = int(match.group('step') or 1)
+    if step < 1:
+        raise SelectionError(f"Invalid step in {item}")
+    parity_text = (match.group('parity') or '').lower()
+    parity = None
+    if parity_text:
+        parity = 1 if parity_text == 'odd' else 0
+
+    if keyword:
+        start = end = None
+        if keyword != 'all':
+            if parity is not None:
+                raise SelectionError(f"Invalid filter in {item}: {keyword} pages cannot be filtered again")
+            parity = 1 if keyword == 'odd' else 0
+    else:
+        start = int(match.group('start'))
+        if match.group('dash'):
+            end = int(match.group('end')) if match.group('end') else None
+        else:
+            end = start
+        if start == 0 or end == 0:
+            raise SelectionError(f"Invalid page range: {item}")
+    return _Term(item, start, end, step, parity, bool(match.group('exclude')))
+
+
+@lru_cache(maxsize=64)
+def _compile(expression: str) -> PageSelection:
+    return PageSelection(expression)
+
+
+def compile_selection(expression: SelectionInput) -> PageSelection:
+    """Compile an expression (or a list of its lines), reusing earlier compilations"""
+    if not isinstance(expression, str):
+        expression = '\n'.join(expression)
+    return _compile(expression)
+
+
+def runs(indices: Sequence[int]) -> List[Tuple[int, int]]:
+    """Collapse indices into inclusive (first, last) runs of consecutive pages
+
+    A run may descend (first > last) for reversed selections.
+    """
+    result: List[Tuple[int, int]] = []
+    count = len(indices)
+    i = 0
+    while i < count:
+        first = indices[i]
+        j = i + 1
+        if j < count and abs(indices[j] - first) == 1:
+            direction = indices[j] - first
+            while j < count and indices[j] - indices[j - 1] == direction:
+                j += 1
+        result.append((first, indices[j - 1]))
+        i = j
+    return result
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Local HTTP job service for PDF Manager
+One long-running process that several tools can share, so the resident
+LibreOffice listeners, the conversion cache and the parsed-reader cache
+stay warm between requests.
+
+- POST /jobs   body (Content-Type: application/json): one job in the
+               pdf_cli manifest format, e.g.
+               {"type": "merge", "inputs": ["/data/a.pdf", "/data/b.pdf"]}
+               Without an "output" the resulting PDF is streamed back;
+               with one (and for split jobs) a JSON summary is returned.
+- GET /health  queue usage as JSON
+
+Jobs run on a worker pool behind a bounded queue: when ``max_pending`` jobs
+are already queued or running, new ones are refused with 503 and a
+Retry-After header instead of piling up.
+
+Input paths are read on the server's filesystem, so the service binds to
+localhost by default, and guards against web pages the user visits:
+requests must name a local Host (which defeats DNS rebinding) and POSTs
+must be JSON (which a page can only send after a CORS preflight this
+server never answers).  Files are only written below ``--output-dir``; a
+job's "output" is taken relative to it and refused without it.
+
+Usage:
+    python pdf_server.py [--port 8765] [--workers 2] [--max-pending 8] [--output-dir DIR]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from dataclasses import asdict, is_dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import pdf_metrics
+from pdf_cli import run_job
+from pdf_engine import EngineError
+from pdf_jobs import JobRunner
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 8
+RETRY_AFTER_SECONDS = 2
+
+# Largest accepted job description; jobs reference files, they do not carry them
+MAX_REQUEST_BYTES = 1024 * 1024
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Host header names always accepted; the --host the server binds is added
+LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1"})
+
+
+class JobQueue:
+    """JobRunner with a cap on jobs queued or running at once"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_pending: int = DEFAULT_MAX_PENDING) -> None:
+        self.runner = JobRunner(max_workers=workers)
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def try_submit(self, job: Dict[str, Any]):
+        """Queue ``job`` and return its pdf_jobs.Job, or None if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            self._pending += 1
+        try:
+            submitted = self.runner.submit(run_job, job)
+        except BaseException:
+            self._release()
+            raise
+        submitted.future.add_done_callback(lambda _: self._release())
+        return submitted
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self) -> None:
+        self.runner.shutdown(wait=False)
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    server_version = "PDFManager/1.0"
+    protocol_version = "HTTP/1.1"
+
+    # Routes
+    def do_GET(self) -> None:
+        if not self._host_allowed():
+            self._refuse(HTTPStatus.FORBIDDEN, "Host not allowed")
+            return
+        if self.path != "/health":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+        jobs = self.server.jobs
+        self._send_json(HTTPStatus.OK, {"pending": jobs.pending, "max_pending": jobs.max_pending})
+
+    def do_POST(self) -> None:
+        # Refused before the body is read, so the connection is closed
+        if not self._host_allowed():
+            self._refuse(HTTPStatus.FORBIDDEN, "Host not allowed")
+            return
+        if self.path != "/jobs":
+            self._refuse(HTTPStatus.NOT_FOUND, "Not found")
+            return
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self._refuse(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "Expected Content-Type: application/json")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            self._refuse(HTTPStatus.BAD_REQUEST, "Expected a JSON job description")
+            return
+        try:
+            spec = self._read_job(length)
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        try:
+            self._place_output(spec)
+        except ValueError as e:
+            self._send_json(HTTPStatus.FORBIDDEN, {"error": str(e)})
+            return
+
+        stream_back = not spec.get("output") and spec.get("type") != "split"
+        scratch = tempfile.mkdtemp(prefix="pdf-server-") if stream_back else None
+        try:
+            if stream_back:
+                spec["output"] = os.path.join(scratch, "result.pdf")
+            self._run(spec, stream_back)
+        finally:
+            if scratch is not None:
+                shutil.rmtree(scratch, ignore_errors=True)
+
+    # Helpers
+    def _host_allowed(self) -> bool:
+        host = (self.headers.get("Host") or "").strip().lower()
+        if host.startswith("["):  # [::1]:8765
+            name = host[1:host.find("]")]
+        else:
+            name = host.rsplit(":", 1)[0] if host.count(":") == 1 else host
+        return name in self.server.allowed_hosts
+
+    def _place_output(self, spec: Dict[str, Any]) -> None:
+        """Resolve the job's "output" below the server's output folder"""
+        output = spec.get("output")
+        if not output:
+            return
+        if self.server.output_dir is None:
+            raise ValueError("This server does not write files (start it with --output-dir); "
+                             "leave out \"output\" to get the PDF back")
+        if not isinstance(output, str):
+            raise ValueError("\"output\" must be a path")
+        root = os.path.realpath(self.server.output_dir)
+        path = os.path.realpath(os.path.join(root, output))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"\"output\" must be inside the server's output folder: {output}")
+        spec["output"] = path
+
+    def _read_job(self, length: int) -> Dict[str, Any]:
+        try:
+            spec = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ValueError("The request body is not valid JSON")
+        if not isinstance(spec, dict):
+            raise ValueError("The job must be a JSON object")
+        return spec
+
+    def _run(self, spec: Dict[str, Any], stream_back: bool) -> None:
+        job = self.server.jobs.try_submit(spec)
+        if job is None:
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Job queue is full"},
+                            {"Retry-After": str(RETRY_AFTER_SECONDS)})
+            return
+
+        try:
+            result = job.result()
+        except EngineError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        except Exception as e:
+            self.log_error("Job failed: %s", e)
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Job failed: {str(e)}"})
+            return
+
+        if stream_back:
+            self._send_file(spec["output"])
+        else:
+            self._send_json(HTTPStatus.OK, asdict(result) if is_dataclass(result) else {})
+
+    def _refuse(self, status: HTTPStatus, message: str) -> None:
+        """Answer a request whose body was not read, closing the connection"""
+        self.close_connection = True
+        self._send_json(status, {"error": message}, {"Connection": "close"})
+
+    def _send_json(self, status: HTTPStatus, body: Dict[str, Any],
+                   headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_file(self, path: str) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, STREAM_CHUNK_SIZE)
+
+
+class JobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Any, workers: int = DEFAULT_WORKERS,
+                 max_pending: int = DEFAULT_MAX_PENDING, output_dir: Optional[str] = None) -> None:
+        super().__init__(address, JobRequestHandler)
+        self.jobs = JobQueue(workers, max_pending)
+        self.output_dir = output_dir  # where jobs may write; None streams results back only
+        self.allowed_hosts = set(LOCAL_HOSTS)
+        if address[0] not in ("", "0.0.0.0", "::"):
+            self.allowed_hosts.add(address[0].lower())
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.jobs.shutdown()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve PDF Manager jobs over local HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="jobs run at once")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="jobs queued or running before new ones get 503")
+    parser.add_argument("--output-dir", metavar="DIR",
+                        help="folder jobs may write their \"output\" into; without it results are only streamed back")
+    parser.add_argument("--metrics", metavar="FILE", help="append JSON-lines timings of each job to FILE")
+    parser.add_argument("--profile-dir", metavar="DIR", help="write a cProfile dump of each job to DIR")
+    args = parser.parse_args(argv)
+    if args.metrics or args.profile_dir:
+        pdf_metrics.configure(args.metrics, args.profile_dir)
+
+    server = JobServer((args.host, args.port), args.workers, max(args.max_pending, args.workers),
+                       output_dir=args.output_dir)
+    print(f"Serving PDF jobs on http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Streaming PDF writer for PDF Manager
+PdfMerger keeps every page tree and shared resource of every input in
+memory until ``write``.  StreamingPdfWriter instead copies the objects
+reachable from each page straight to the output file as it goes, keeping
+only the byte offset of each written object.  Inputs are read from disk on
+demand and closed as soon as their pages are copied, so memory stays
+bounded by the largest single page, not by the number of files or pages.
+
+Only page content is carried over: outlines, named destinations and forms
+of the inputs are not merged in this mode.
+
+With ``dedup`` enabled, identical streams (fonts, images) met in any input
+are written once and shared; the writer then keeps one fingerprint per
+unique stream in memory.
+
+IncrementalPdfWriter appends pages to an existing PDF as an incremental
+update: the new objects, a rewritten root /Pages node and a cross-reference
+section chained to the previous one with /Prev are added at the end of the
+file, and nothing before it is rewritten.
+
+``append_segment`` puts one input's pages under a /Pages node of their own
+below the root.  An incremental update can then replace, drop or reorder
+whole segments by rewriting only the root's /Kids (``root_kids``), which is
+how a merge is rebuilt when only some of its inputs changed.
+"""
+
+import os
+import sys
+import zlib
+from collections import deque
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (ArrayObject, DecodedStreamObject, DictionaryObject,
+                            EncodedStreamObject, IndirectObject, NameObject, NullObject,
+                            NumberObject, StreamObject)
+
+import pdf_metrics
+from pdf_dedup import MAX_FINGERPRINT_DEPTH, DedupStats, fingerprint, is_page_tree_node
+from pdf_io import open_reader
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PDF_HEADER = b"%PDF-1.7\n%\xE2\xE3\xCF\xD3\n"
+
+# Page attributes that may be set on an ancestor /Pages node instead of the page
+INHERITABLE_ATTRIBUTES = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+# Drop the reader's parsed-object cache once it holds this many objects
+READER_CACHE_LIMIT = 5000
+
+# How far from the end of a file to look for its startxref keyword
+STARTXREF_SEARCH_BYTES = 4096
+
+ObjectKey = Tuple[int, int]
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def iter_pages(reader: PdfReader) -> Iterator[Tuple[DictionaryObject, Dict[str, Any]]]:
+    """Walk the page tree lazily, yielding (page, inherited attributes)"""
+    def walk(node: Any, inherited: Dict[str, Any]) -> Iterator[Tuple[DictionaryObject, Dict[str, Any]]]:
+        node = node.get_object()
+        if '/Kids' in node:
+            inherited = dict(inherited)
+            for key in INHERITABLE_ATTRIBUTES:
+                if key in node:
+                    inherited[key] = node[key]
+            for kid in node['/Kids']:
+                yield from walk(kid, inherited)
+        else:
+            yield node, inherited
+
+    yield from walk(reader.trailer['/Root']['/Pages'], {})
+
+
+class StreamingPdfWriter:
+    """Write pages from many PDFs to one output without holding them in memory"""
+
+    def __init__(self, stream: BinaryIO, dedup: bool = False) -> None:
+        self.stream = stream
+        self.dedup = dedup
+        self.dedup_stats = DedupStats()
+        self.stream_index: Dict[bytes, IndirectObject] = {}
+        self.offsets: Dict[int, int] = {}
+        self.next_number = 1
+        self.page_refs: List[IndirectObject] = []
+        self.pages_ref = self._reserve()
+        self._init_tree()
+        self.stream.write(PDF_HEADER)
+
+    def _init_tree(self) -> None:
+        # Children of the root /Pages node, in order: pages and segment nodes
+        self.kids: List[IndirectObject] = []
+        # Page count of each segment node written, by object number
+        self.segment_pages: Dict[int, int] = {}
+        # The /Pages node copied pages are attached to
+        self.parent_ref = self.pages_ref
+        # Extra entries of new segment nodes
+        self.segment_attributes: Dict[str, Any] = {}
+
+    # Object numbering and serialization
+    def _reserve(self) -> IndirectObject:
+        ref = IndirectObject(self.next_number, 0, None)
+        self.next_number += 1
+        return ref
+
+    def _write_object(self, ref: IndirectObject, obj: Any) -> None:
+        self.offsets[ref.idnum] = self.stream.tell()
+        self.stream.write(f"{ref.idnum} 0 obj\n".encode('ascii'))
+        obj.write_to_stream(self.stream, None)
+        self.stream.write(b"\nendobj\n")
+
+    # Copying
+    def append(self, source: Any, page_indices: Optional[Sequence[int]] = None,
+               on_page: Optional[Callable[[int], None]] = None) -> int:
+        """Copy pages from a path, file object or PdfReader; returns pages copied
+
+        ``page_indices`` selects 0-indexed pages (in that order); by default
+        every page is copied.  ``on_page(n)`` runs after each copied page and
+        may raise to abort.
+        """
+        return self._append_reader(open_reader(source), page_indices, on_page)
+
+    def append_segment(self, source: Any, page_indices: Optional[Sequence[int]] = None,
+                       on_page: Optional[Callable[[int], None]] = None) -> IndirectObject:
+        """Copy pages like ``append``, under a /Pages node of their own; returns that node"""
+        node = self._reserve()
+        first = len(self.page_refs)
+        self.parent_ref = node
+        try:
+            copied = self.append(source, page_indices=page_indices, on_page=on_page)
+        finally:
+            self.parent_ref = self.pages_ref
+        segment = DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Parent'): self._segment_parent(),
+            NameObject('/Kids'): ArrayObject(self.page_refs[first:]),
+            NameObject('/Count'): NumberObject(copied),
+        })
+        segment.update(self.segment_attributes)
+        self._write_object(node, segment)
+        self.kids.append(node)
+        self.segment_pages[node.idnum] = copied
+        return node
+
+    def _segment_parent(self) -> IndirectObject:
+        return self.pages_ref
+
+    def _append_reader(self, reader: PdfReader, page_indices: Optional[Sequence[int]],
+                       on_page: Optional[Callable[[int], None]]) -> int:
+        if reader.is_encrypted and not reader.decrypt(''):
+            raise ValueError("PDF is encrypted")
+
+        copier = _ObjectCopier(self, reader, page_indices)
+        if page_indices is None:
+            pages = iter_pages(reader)
+        else:
+            pages = ((reader.pages[i], {}) for i in page_indices)
+
+        first = len(self.page_refs)
+        copied = 0
+        for page, inherited in pages:
+            copier.copy_page(page, inherited)
+            copied += 1
+            if len(reader.resolved_objects) > READER_CACHE_LIMIT:
+                reader.resolved_objects.clear()
+            if on_page is not None:
+                on_page(copied)
+        copier.finish()
+        if self.parent_ref is self.pages_ref:
+            self.kids.extend(self.page_refs[first:])
+        return copied
+
+    # Finishing
+    def close(self) -> None:
+        """Write the page tree, catalog, cross-reference table and trailer"""
+        pages = DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(self.kids),
+            NameObject('/Count'): NumberObject(len(self.page_refs)),
+        })
+        self._write_object(self.pages_ref, pages)
+
+        root_ref = self._reserve()
+        self._write_object(root_ref, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): self.pages_ref,
+        }))
+
+        xref_offset = self.stream.tell()
+        self.stream.write(f"xref\n0 {self.next_number}\n".encode('ascii'))
+        self.stream.write(b"0000000000 65535 f \n")
+        for number in range(1, self.next_number):
+            self.stream.write(f"{self.offsets[number]:010d} 00000 n \n".encode('ascii'))
+
+        trailer = DictionaryObject({
+            NameObject('/Size'): NumberObject(self.next_number),
+            NameObject('/Root'): root_ref,
+        })
+        self.stream.write(b"trailer\n")
+        trailer.write_to_stream(self.stream, None)
+        self.stream.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode('ascii'))
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_refs)
+
+
+# Cross-reference entries: number -> (type, field 2, field 3), where type 1
+# is (1, offset, generation), type 2 (2, object stream number, index) and
+# type 0 a free entry
+XrefEntries = Dict[int, Tuple[int, int, int]]
+
+
+def write_xref_stream(stream: BinaryIO, number: int, entries: XrefEntries, trailer: DictionaryObject) -> None:
+    """Write a compressed cross-reference stream as object ``number``, then startxref
+
+    ``trailer`` holds the entries a classic trailer would (/Size, /Root,
+    /Prev...); the stream's own entry is added to ``entries``.
+    """
+    offset = stream.tell()
+    entries = dict(entries)
+    entries[number] = (1, offset, 0)
+    width = max(1, (max(field for _, field, _ in entries.values()).bit_length() + 7) // 8)
+    index: List[int] = []
+    rows = bytearray()
+    for entry_number in sorted(entries):
+        if index and index[-2] + index[-1] == entry_number:
+            index[-1] += 1
+        else:
+            index += [entry_number, 1]
+        kind, field2, field3 = entries[entry_number]
+        rows += bytes([kind]) + field2.to_bytes(width, 'big') + field3.to_bytes(2, 'big')
+
+    xref = EncodedStreamObject()
+    xref.update(trailer)
+    xref[NameObject('/Type')] = NameObject('/XRef')
+    xref[NameObject('/W')] = ArrayObject([NumberObject(1), NumberObject(width), NumberObject(2)])
+    if index != [0, int(trailer['/Size'])]:
+        xref[NameObject('/Index')] = ArrayObject([NumberObject(value) for value in index])
+    xref[NameObject('/Filter')] = NameObject('/FlateDecode')
+    xref._data = zlib.compress(bytes(rows))
+    stream.write(f"{number} 0 obj\n".encode('ascii'))
+    xref.write_to_stream(stream, None)
+    stream.write(f"\nendobj\nstartxref\n{offset}\n%%EOF\n".encode('ascii'))
+
+
+def _find_startxref(stream: BinaryIO) -> int:
+    """Offset of the last cross-reference section, from the file's tail"""
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(max(0, size - STARTXREF_SEARCH_BYTES))
+    tail = stream.read()
+    position = tail.rfind(b"startxref")
+    if position < 0:
+        raise ValueError("startxref not found; the file is not a complete PDF")
+    return int(tail[position + len(b"startxref"):].split()[0])
+
+
+class IncrementalPdfWriter(StreamingPdfWriter):
+    """Append pages to an existing PDF (opened ``r+b``) as an incremental update
+
+    New pages hang off a fresh /Pages node added to the document's root
+    /Pages node, which is the only existing object written again; segments
+    are added to the root directly.  Setting ``root_kids`` (existing kids
+    of the root and new segment nodes) replaces the root's children
+    instead.  On failure, truncate the file to ``original_size`` to undo
+    the update.
+    """
+
+    def __init__(self, stream: BinaryIO, dedup: bool = False) -> None:
+        stream.seek(0, os.SEEK_END)
+        self.original_size = stream.tell()
+        self.base = PdfReader(stream)
+        if self.base.is_encrypted:
+            raise ValueError("Cannot append to an encrypted PDF")
+        self.prev_xref = _find_startxref(stream)
+        # Files with cross-reference streams are updated with one too
+        stream.seek(self.prev_xref)
+        self.xref_stream = not stream.read(4).startswith(b"xref")
+        trailer = self.base.trailer
+        self.root_pages_ref = trailer['/Root'].raw_get('/Pages')
+        if not isinstance(self.root_pages_ref, IndirectObject):
+            raise ValueError("The PDF's page tree is not an indirect object")
+
+        self.stream = stream
+        self.dedup = dedup
+        self.dedup_stats = DedupStats()
+        self.stream_index: Dict[bytes, IndirectObject] = {}
+        self.offsets: Dict[int, int] = {}
+        if '/Size' in trailer:
+            size = int(trailer['/Size'])
+        else:  # not carried over from cross-reference streams by PyPDF2
+            size = 1 + max([0, *self.base.xref_objStm,
+                            *(number for table in self.base.xref.values() for number in table)])
+        self.first_number = self.next_number = size
+        self.page_refs: List[IndirectObject] = []
+        self.pages_ref = self._reserve()
+        self._init_tree()
+        self.root_kids: Optional[List[IndirectObject]] = None
+        if '/Rotate' in self.base.get_object(self.root_pages_ref):
+            # Copied pages carry their own rotation; do not inherit the root's
+            self.segment_attributes[NameObject('/Rotate')] = NumberObject(0)
+        stream.seek(0, os.SEEK_END)
+        stream.write(b"\n")
+
+    def _segment_parent(self) -> IndirectObject:
+        return self.root_pages_ref
+
+    def _kid_pages(self, kid: IndirectObject) -> int:
+        """Pages below ``kid``, a child of the root /Pages node"""
+        if kid.idnum in self.segment_pages:
+            return self.segment_pages[kid.idnum]
+        if kid.idnum == self.pages_ref.idnum:
+            return len(self._plain_kids())
+        node = self.base.get_object(kid)
+        return int(node['/Count']) if node.get('/Type') == '/Pages' else 1
+
+    def _plain_kids(self) -> List[IndirectObject]:
+        return [kid for kid in self.kids if kid.idnum not in self.segment_pages]
+
+    def close(self) -> None:
+        """Write the new pages node, the updated root, the xref section and trailer"""
+        # Read everything needed from the base file first: the reader shares
+        # the stream, so reading moves the position writes happen at
+        root_pages = self.base.get_object(self.root_pages_ref)
+        updated_root = DictionaryObject(root_pages)
+        plain_kids = self._plain_kids()
+        if self.root_kids is not None:
+            kids = list(self.root_kids)
+            count = sum(self._kid_pages(kid) for kid in kids)
+        else:
+            segments = [kid for kid in self.kids if kid.idnum in self.segment_pages]
+            kids = list(root_pages['/Kids']) + ([self.pages_ref] if plain_kids or not segments else []) + segments
+            count = int(root_pages['/Count']) + len(self.page_refs)
+        updated_root[NameObject('/Kids')] = ArrayObject(kids)
+        updated_root[NameObject('/Count')] = NumberObject(count)
+        self.stream.seek(0, os.SEEK_END)
+
+        if any(kid.idnum == self.pages_ref.idnum for kid in kids):
+            pages = DictionaryObject({
+                NameObject('/Type'): NameObject('/Pages'),
+                NameObject('/Parent'): self.root_pages_ref,
+                NameObject('/Kids'): ArrayObject(plain_kids),
+                NameObject('/Count'): NumberObject(len(plain_kids)),
+            })
+            if '/Rotate' in root_pages:
+                # Copied pages carry their own rotation; do not inherit the root's
+                pages[NameObject('/Rotate')] = NumberObject(0)
+            self._write_object(self.pages_ref, pages)
+        else:
+            self._write_object(self.pages_ref, NullObject())  # reserved but unused
+
+        root_number = self.root_pages_ref.idnum
+        root_generation = self.root_pages_ref.generation
+        root_offset = self.stream.tell()
+        self.stream.write(f"{root_number} {root_generation} obj\n".encode('ascii'))
+        updated_root.write_to_stream(self.stream, None)
+        self.stream.write(b"\nendobj\n")
+
+        if self.xref_stream:
+            entries = {root_number: (1, root_offset, root_generation)}
+            entries.update((number, (1, self.offsets[number], 0))
+                           for number in range(self.first_number, self.next_number))
+            xref_number = self._reserve().idnum
+            write_xref_stream(self.stream, xref_number, entries, self._trailer())
+            return
+
+        xref_offset = self.stream.tell()
+        # The free-list head is repeated so the section starts at object 0,
+        # which some readers otherwise take for a mis-numbered table
+        self.stream.write(b"xref\n0 1\n0000000000 65535 f \n")
+        self.stream.write(f"{root_number} 1\n{root_offset:010d} {root_generation:05d} n \n".encode('ascii'))
+        self.stream.write(f"{self.first_number} {self.next_number - self.first_number}\n".encode('ascii'))
+        for number in range(self.first_number, self.next_number):
+            self.stream.write(f"{self.offsets[number]:010d} 00000 n \n".encode('ascii'))
+
+        self.stream.write(b"trailer\n")
+        self._trailer().write_to_stream(self.stream, None)
+        self.stream.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode('ascii'))
+
+    def _trailer(self) -> DictionaryObject:
+        trailer = DictionaryObject({
+            NameObject('/Size'): NumberObject(self.next_number),
+            NameObject('/Root'): self.base.trailer.raw_get('/Root'),
+            NameObject('/Prev'): NumberObject(self.prev_xref),
+        })
+        for key in ('/Info', '/ID'):
+            if key in self.base.trailer:
+                trailer[NameObject(key)] = self.base.trailer.raw_get(key)
+        return trailer
+
+
+class _ObjectCopier:
+    """Copies objects from one reader, renumbering them for the output"""
+
+    def __init__(self, writer: StreamingPdfWriter, reader: PdfReader,
+                 page_indices: Optional[Sequence[int]]) -> None:
+        self.writer = writer
+        self.reader = reader
+        self.remap: Dict[ObjectKey, IndirectObject] = {}
+        self.pending: deque = deque()
+        # Output numbers reserved for pages, and the ones copy_page has written
+        self.page_numbers: List[IndirectObject] = []
+        self.written_pages = set()
+        self.fingerprints: Dict[ObjectKey, bytes] = {}
+        self.in_progress = set()
+        # Pages that will be in the output; references to any other page become null
+        self.selected_pages = None
+        if page_indices is not None:
+            self.selected_pages = set()
+            for i in page_indices:
+                ref = reader.pages[i].indirect_reference
+                if ref is not None:
+                    self.selected_pages.add((ref.idnum, ref.generation))
+
+    def copy_page(self, page: DictionaryObject, inherited: Dict[str, Any]) -> None:
+        source_ref = page.indirect_reference
+        key = (source_ref.idnum, source_ref.generation) if source_ref is not None else None
+        new_ref = self.remap.get(key) if key is not None else None
+        if new_ref is None or new_ref.idnum in self.written_pages:
+            # A page selected twice is written twice, under separate numbers
+            new_ref = self.writer._reserve()
+            if key is not None and key not in self.remap:
+                self.remap[key] = new_ref
+        self.written_pages.add(new_ref.idnum)
+
+        copy = DictionaryObject()
+        for name, value in inherited.items():
+            copy[NameObject(name)] = self.translate(value)
+        for name, value in page.items():
+            if name != '/Parent':
+                copy[NameObject(name)] = self.translate(value)
+        copy[NameObject('/Parent')] = self.writer.parent_ref
+
+        self.writer._write_object(new_ref, copy)
+        self.writer.page_refs.append(new_ref)
+        self.flush()
+
+    def flush(self) -> None:
+        """Write every object queued by translate() so far"""
+        while self.pending:
+            key, new_ref = self.pending.popleft()
+            obj = self.reader.get_object(IndirectObject(key[0], key[1], self.reader))
+            self.writer._write_object(new_ref, self.translate(obj) if obj is not None else NullObject())
+
+    def finish(self) -> None:
+        """Fill numbers reserved for pages that were referenced but never reached"""
+        for ref in self.page_numbers:
+            if ref.idnum not in self.written_pages:
+                self.writer._write_object(ref, NullObject())
+
+    def reference(self, ref: IndirectObject) -> Any:
+        key = (ref.idnum, ref.generation)
+        new_ref = self.remap.get(key)
+        if new_ref is not None:
+            return new_ref
+
+        target = ref.get_object()
+        if isinstance(target, DictionaryObject) and not isinstance(target, StreamObject):
+            node_type = target.get('/Type')
+            if node_type == '/Pages':
+                return NullObject()
+            if node_type == '/Page':
+                if self.selected_pages is not None and key not in self.selected_pages:
+                    return NullObject()
+                # Written by copy_page when the walk reaches it, not queued here
+                new_ref = self.remap[key] = self.writer._reserve()
+                self.page_numbers.append(new_ref)
+                return new_ref
+
+        if self.writer.dedup and isinstance(target, StreamObject):
+            digest = self.ref_hash(ref, 0)
+            shared = self.writer.stream_index.get(digest)
+            if shared is not None:
+                self.remap[key] = shared
+                self.writer.dedup_stats.streams_removed += 1
+                self.writer.dedup_stats.bytes_saved += len(target._data)
+                pdf_metrics.count(dedup_hits=1, dedup_bytes=len(target._data))
+                return shared
+            new_ref = self.remap[key] = self.writer._reserve()
+            self.writer.stream_index[digest] = new_ref
+            self.pending.append((key, new_ref))
+            return new_ref
+
+        new_ref = self.remap[key] = self.writer._reserve()
+        self.pending.append((key, new_ref))
+        return new_ref
+
+    def ref_hash(self, ref: IndirectObject, depth: int) -> bytes:
+        """Content fingerprint of a source object, for stream deduplication"""
+        key = (ref.idnum, ref.generation)
+        if key in self.fingerprints:
+            return self.fingerprints[key]
+        target = ref.get_object()
+        if (key in self.in_progress or depth > MAX_FINGERPRINT_DEPTH or target is None
+                or is_page_tree_node(target)):
+            # Cycles, page links and very deep graphs compare by identity
+            return b'id:%d:%d:%d' % (id(self), key[0], key[1])
+        self.in_progress.add(key)
+        self.fingerprints[key] = fingerprint(target, self.ref_hash, depth)
+        self.in_progress.discard(key)
+        return self.fingerprints[key]
+
+    def translate(self, obj: Any) -> Any:
+        if isinstance(obj, IndirectObject):
+            return self.reference(obj)
+        if isinstance(obj, StreamObject):
+            copy = EncodedStreamObject() if isinstance(obj, EncodedStreamObject) else DecodedStreamObject()
+            for name, value in obj.items():
+                if name != '/Length':  # rewritten from the data on output
+                    copy[NameObject(name)] = self.translate(value)
+            copy._data = obj._data
+            return copy
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject({NameObject(k): self.translate(v) for k, v in obj.items()})
+        if isinstance(obj, ArrayObject):
+            return ArrayObject([self.translate(v) for v in obj])
+        return obj
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Page thumbnails for PDF Manager
+- ThumbnailCache: in-memory LRU plus an on-disk PNG cache keyed by the
+  file's SHA-256, the page and the thumbnail size
+- ThumbnailRenderer: renders requested pages on a background thread
+
+Rendering uses the first backend found: PyMuPDF (``fitz``), then poppler's
+``pdftoppm``.  Without either, a placeholder with the page's shape and
+number is drawn so the panel still works for picking pages.
+
+Only requested pages are rendered.  Each ``request`` replaces the previous
+one, so a view that scrolls quickly through a long document only pays for
+the pages it stops on.  Results are collected with ``results()`` from the
+caller's thread (the Tk loop polls it); the renderer never calls back into
+the GUI.
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw
+
+from pdf_cache import file_digest
+from pdf_probe import borrow_reader
+
+THUMBNAIL_SIZE = 160  # longest side, in pixels
+
+# Thumbnails kept in memory, across all open files
+MEMORY_CACHE_ITEMS = 512
+
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+# Disk usage is checked once per this many stored thumbnails
+EVICT_EVERY = 200
+
+# Consecutive pending pages of one file rendered by one backend call
+RENDER_BATCH_PAGES = 8
+
+PDFTOPPM_TIMEOUT_SECONDS = 60
+
+PageKey = Tuple[str, int]  # (path, 0-based page)
+FileStamp = Tuple[int, int]
+
+
+def default_thumbnail_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pdf-manager", "thumbnails")
+
+
+def _stamp(path: str) -> FileStamp:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+# Backends: render(path, first, last, size) -> one image per page
+def _render_fitz(path: str, first: int, last: int, size: int) -> List[Image.Image]:
+    import fitz
+
+    images = []
+    with fitz.open(path) as document:
+        for index in range(first, last + 1):
+            page = document[index]
+            zoom = size / max(page.rect.width, page.rect.height)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            images.append(Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples))
+    return images
+
+
+def _render_pdftoppm(path: str, first: int, last: int, size: int) -> List[Image.Image]:
+    temp_dir = tempfile.mkdtemp(prefix="pdf-thumbs-")
+    try:
+        subprocess.run(['pdftoppm', '-f', str(first + 1), '-l', str(last + 1), '-scale-to', str(size),
+                        '-png', path, os.path.join(temp_dir, 'page')],
+                       check=True, capture_output=True, timeout=PDFTOPPM_TIMEOUT_SECONDS)
+        # Output names are zero-padded to the width of the page count
+        names = sorted(os.listdir(temp_dir), key=lambda name: int(name.rsplit('-', 1)[1].split('.')[0]))
+        images = []
+        for name in names:
+            with Image.open(os.path.join(temp_dir, name)) as image:
+                images.append(image.convert('RGB'))
+        return images
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _render_placeholder(path: str, first: int, last: int, size: int) -> List[Image.Image]:
+    images = []
+    with borrow_reader(path) as reader:
+        for index in range(first, last + 1):
+            box = reader.pages[index].mediabox
+            width, height = abs(float(box.width)) or 1, abs(float(box.height)) or 1
+            if int(reader.pages[index].get('/Rotate', 0)) % 180:
+                width, height = height, width
+            scale = size / max(width, height)
+            image = Image.new('RGB', (max(1, round(width * scale)), max(1, round(height * scale))), 'white')
+            draw = ImageDraw.Draw(image)
+            draw.rectangle([(0, 0), (image.width - 1, image.height - 1)], outline=(160, 160, 160))
+            label = str(index + 1)
+            left, top, right, bottom = draw.textbbox((0, 0), label)
+            draw.text(((image.width - right + left) / 2, (image.height - bottom + top) / 2), label,
+                      fill=(96, 96, 96))
+            images.append(image)
+    return images
+
+
+def find_backend():
+    """The best available page renderer"""
+    try:
+        import fitz  # noqa: F401
+        return _render_fitz
+    except ImportError:
+        pass
+    if shutil.which('pdftoppm'):
+        return _render_pdftoppm
+    return _render_placeholder
+
+
+class ThumbnailCache:
+    """Recently used thumbnails in memory, all of them (up to a cap) on disk"""
+
+    def __init__(self, root: Optional[str] = None, memory_items: int = MEMORY_CACHE_ITEMS,
+                 max_bytes: int = DEFAULT_DISK_BYTES) -> None:
+        self.root = root
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[Tuple[str, FileStamp, int, int], Image.Image]" = OrderedDict()
+        self._digests: Dict[Tuple[str, FileStamp], str] = {}
+        self._lock = threading.Lock()
+        self._stored = 0
+
+    # Memory
+    def get_memory(self, path: str, stamp: FileStamp, page: int, size: int) -> Optional[Image.Image]:
+        key = (path, stamp, page, size)
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+            return image
+
+    def put_memory(self, path: str, stamp: FileStamp, page: int, size: int, image: Image.Image) -> None:
+        with self._lock:
+            self._memory[(path, stamp, page, size)] = image
+            self._memory.move_to_end((path, stamp, page, size))
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    # Disk
+    def digest(self, path: str, stamp: FileStamp) -> str:
+        """Content hash of ``path``, computed once per file version"""
+        with self._lock:
+            digest = self._digests.get((path, stamp))
+        if digest is None:
+            digest = file_digest(path)
+            with self._lock:
+                self._digests[(path, stamp)] = digest
+        return digest
+
+    def disk_path(self, digest: str, page: int, size: int) -> Optional[str]:
+        if self.root is None:
+            return None
+        return os.path.join(self.root, digest[:2], f"{digest}-{page}-{size}.png")
+
+    def get_disk(self, digest: str, page: int, size: int) -> Optional[Image.Image]:
+        path = self.disk_path(digest, page, size)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                return image.convert('RGB')
+        except OSError:
+            return None  # a damaged entry is simply rendered again
+
+    def put_disk(self, digest: str, page: int, size: int, image: Image.Image) -> None:
+        path = self.disk_path(digest, page, size)
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                image.save(out, 'PNG', optimize=True)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        self._stored += 1
+        if self._stored % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used thumbnails until the disk cache fits ``max_bytes``"""
+        if self.root is None:
+            return
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith('.png'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+_default_cache: Optional[ThumbnailCache] = None
+
+
+def default_thumbnail_cache() -> ThumbnailCache:
+    """The cache under ``default_thumbnail_dir()``, shared by every renderer"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ThumbnailCache(default_thumbnail_dir())
+    return _default_cache
+
+
+class ThumbnailRenderer:
+    """Renders requested pages on one background thread"""
+
+    def __init__(self, cache: Optional[ThumbnailCache] = None, size: int = THUMBNAIL_SIZE,
+                 backend=None) -> None:
+        self.cache = cache or default_thumbnail_cache()
+        self.size = size
+        self.backend = backend or find_backend()
+        # Placeholders are cheaper to draw than to load, and must not outlive
+        # the installation of a real backend
+        self.persist = self.backend is not _render_placeholder
+        self._pending: "OrderedDict[PageKey, FileStamp]" = OrderedDict()
+        self._results: List[Tuple[str, int, Image.Image]] = []
+        self._errors: Dict[str, str] = {}
+        self._rendering = False
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="pdf-thumbnails", daemon=True)
+        self._thread.start()
+
+    def request(self, path: str, pages: Sequence[int]) -> None:
+        """Render ``pages`` of ``path`` next, in order, dropping earlier requests
+
+        Pages already in memory are returned by the next ``results()`` call
+        without touching the worker.
+        """
+        try:
+            stamp = _stamp(path)
+        except OSError:
+            return
+        with self._condition:
+            self._pending.clear()
+            for page in pages:
+                image = self.cache.get_memory(path, stamp, page, self.size)
+                if image is not None:
+                    self._results.append((path, page, image))
+                else:
+                    self._pending[(path, page)] = stamp
+            self._condition.notify()
+
+    def results(self) -> List[Tuple[str, int, Image.Image]]:
+        """Thumbnails finished since the last call, as (path, page, image)"""
+        with self._condition:
+            results, self._results = self._results, []
+        return results
+
+    def busy(self) -> bool:
+        """Whether requested pages are still queued, rendering or not yet collected"""
+        with self._condition:
+            return bool(self._pending or self._rendering or self._results)
+
+    def cancel(self) -> None:
+        """Drop the pages not yet started"""
+        with self._condition:
+            self._pending.clear()
+
+    def error(self, path: str) -> Optional[str]:
+        with self._condition:
+            return self._errors.get(path)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            self._condition.notify()
+
+    def _next_batch(self) -> Optional[Tuple[str, FileStamp, List[int]]]:
+        """Up to RENDER_BATCH_PAGES consecutive pending pages of one file"""
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            (path, first), stamp = self._pending.popitem(last=False)
+            self._rendering = True
+            pages = [first]
+            while len(pages) < RENDER_BATCH_PAGES and self._pending.get((path, pages[-1] + 1)) == stamp:
+                del self._pending[(path, pages[-1] + 1)]
+                pages.append(pages[-1] + 1)
+            return path, stamp, pages
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            path, stamp, pages = batch
+            try:
+                images = self._render(path, stamp, pages)
+            except Exception as e:
+                with self._condition:
+                    self._errors[path] = str(e)
+                    self._rendering = False
+                continue
+            with self._condition:
+                self._results.extend((path, page, image) for page, image in zip(pages, images))
+                self._rendering = False
+
+    def _render(self, path: str, stamp: FileStamp, pages: List[int]) -> List[Image.Image]:
+        images: Dict[int, Image.Image] = {}
+        digest = self.cache.digest(path, stamp) if self.persist else ''
+        for page in pages if self.persist else ():
+            image = self.cache.get_disk(digest, page, self.size)
+            if image is not None:
+                images[page] = image
+
+        missing = [page for page in pages if page not in images]
+        if missing:
+            rendered = self.backend(path, missing[0], missing[-1], self.size)
+            for page, image in zip(range(missing[0], missing[-1] + 1), rendered):
+                image.thumbnail((self.size, self.size))
+                if page not in images:
+                    images[page] = image
+                    if self.persist:
+                        self.cache.put_disk(digest, page, self.size, image)
+
+        for page, image in images.items():
+            self.cache.put_memory(path, stamp, page, self.size, image)
+        return [images[page] for page in pages]
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Hot-folder watch mode for PDF Manager
+Polls folders where scanners and report generators drop files, groups the
+files that arrive and feeds each group to the merge or convert pipeline:
+
+    {
+      "workers": 2,
+      "poll_seconds": 2,
+      "state": "watch.sqlite",
+      "folders": [
+        {"path": "inbox/scans", "type": "merge", "group_by": "prefix",
+         "separator": "_", "window_seconds": 120,
+         "output": "out/{group}-{date}-{time}.pdf", "options": {"dedup": true}},
+        {"path": "inbox/reports", "type": "convert", "group_by": "window",
+         "window_seconds": 300, "options": {"engine": "auto"}}
+      ]
+    }
+
+Grouping (``group_by``):
+- file: every file is processed on its own
+- prefix: files sharing the name part before ``separator`` form a group,
+  closed once no new file has joined it for ``window_seconds``
+- window: everything arriving within ``window_seconds`` of the group's
+  first file forms one group
+
+A file is only picked up once its size and modification time have not
+changed for ``settle_seconds``, so files still being written are left
+alone.  Only the top level of a folder is scanned; the default output
+folder is a ``processed`` subfolder, which is therefore never ingested.
+
+The SHA-256 of every file handled (and of every output written) is kept in
+a SQLite database, keyed by folder rule, so a restart skips files already
+merged or converted; a file that failed is retried only once its content
+changes.  Groups run concurrently through ``pdf_cli.run_job``, and one
+JSON line per finished group is printed to stdout.
+
+Usage:
+    python pdf_watch.py watch.json [--once] [--workers 4] [--poll 2]
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pdf_metrics
+from pdf_cache import file_digest
+from pdf_cli import ManifestError, load_document, run_job
+
+DEFAULT_WORKERS = 2
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_SETTLE_SECONDS = 5.0
+DEFAULT_WINDOW_SECONDS = 60.0
+DEFAULT_OUTPUT = os.path.join("processed", "{group}-{date}-{time}.pdf")
+
+GROUP_MODES = ('file', 'prefix', 'window')
+JOB_PATTERNS = {"merge": ["*.pdf"], "convert": ["*.pptx"]}
+
+FileSignature = Tuple[int, int]  # (size, mtime_ns)
+
+
+def default_state_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pdf-manager", "watch.sqlite")
+
+
+@dataclass
+class WatchRule:
+    """One watched folder and what to do with the files dropped into it"""
+    path: str
+    type: str
+    name: str = ""
+    patterns: List[str] = field(default_factory=list)
+    group_by: str = 'file'
+    separator: str = '_'
+    window_seconds: float = DEFAULT_WINDOW_SECONDS
+    settle_seconds: float = DEFAULT_SETTLE_SECONDS
+    output: str = ""
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.type not in JOB_PATTERNS:
+            raise ManifestError(f"Unknown watch job type: {self.type!r} "
+                                f"(expected one of {', '.join(JOB_PATTERNS)})")
+        if self.group_by not in GROUP_MODES:
+            raise ManifestError(f"Unknown grouping: {self.group_by!r} "
+                                f"(expected one of {', '.join(GROUP_MODES)})")
+        self.name = self.name or self.path
+        self.patterns = self.patterns or JOB_PATTERNS[self.type]
+        self.output = self.output or os.path.join(self.path, DEFAULT_OUTPUT)
+
+    def matches(self, name: str) -> bool:
+        # Hidden files and Office lock files (~$deck.pptx) are never inputs
+        if name.startswith(('.', '~$')):
+            return False
+        return any(fnmatch.fnmatch(name.lower(), pattern.lower()) for pattern in self.patterns)
+
+    def group_key(self, path: str) -> str:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if self.group_by == 'prefix':
+            return stem.split(self.separator, 1)[0] if self.separator else stem
+        if self.group_by == 'file':
+            return stem
+        return ""
+
+
+def load_watch_config(path: str) -> Dict[str, Any]:
+    """Read a JSON or YAML watch configuration; relative paths are resolved against its folder"""
+    config = load_document(path)
+    if not isinstance(config, dict) or not isinstance(config.get("folders"), list) or not config["folders"]:
+        raise ManifestError("The configuration must contain a list of folders")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    rules = []
+    for index, folder in enumerate(config["folders"], 1):
+        if not isinstance(folder, dict) or not folder.get("path"):
+            raise ManifestError(f"Folder {index} needs a path")
+        folder = dict(folder)
+        folder["path"] = os.path.join(base_dir, os.path.expanduser(folder["path"]))
+        if folder.get("output"):
+            folder["output"] = os.path.join(base_dir, os.path.expanduser(folder["output"]))
+        try:
+            rules.append(WatchRule(**folder))
+        except TypeError as e:
+            raise ManifestError(f"Invalid settings for folder {index}: {e}")
+    config["rules"] = rules
+    if config.get("state"):
+        config["state"] = os.path.join(base_dir, os.path.expanduser(config["state"]))
+    return config
+
+
+class ProcessedStore:
+    """Hashes of the files each rule has handled, kept in SQLite across restarts"""
+
+    def __init__(self, path: str) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path)
+        with self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS processed (
+                rule TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                output TEXT,
+                error TEXT,
+                processed_at REAL NOT NULL,
+                PRIMARY KEY (rule, digest))""")
+
+    def seen(self, rule: str, digest: str) -> bool:
+        row = self._db.execute("SELECT 1 FROM processed WHERE rule = ? AND digest = ?",
+                               (rule, digest)).fetchone()
+        return row is not None
+
+    def record(self, rule: str, files: List[Tuple[str, str]], status: str,
+               output: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Store (path, digest) pairs with the outcome of their group"""
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO processed (rule, digest, path, status, output, error, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(rule, digest, path, status, output, error, now) for path, digest in files])
+
+    def close(self) -> None:
+        self._db.close()
+
+
+@dataclass
+class _Group:
+    rule: WatchRule
+    key: str
+    opened: float
+    updated: float
+    files: List[Tuple[str, str]] = field(default_factory=list)  # (path, digest)
+
+    @property
+    def label(self) -> str:
+        """The grouping key, or the opening time for window groups"""
+        return self.key or time.strftime("%Y%m%d-%H%M%S", time.localtime(self.opened))
+
+
+class FolderWatcher:
+    """Polls the rules' folders and runs each completed group as a merge or convert job
+
+    All scanning, hashing and bookkeeping happens on the thread calling
+    ``poll``; only the jobs themselves run on the worker pool.
+    """
+
+    def __init__(self, rules: List[WatchRule], store: ProcessedStore, workers: int = DEFAULT_WORKERS,
+                 on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        self.rules = rules
+        self.store = store
+        self.on_done = on_done
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pdf-watch")
+        # path -> (signature, first seen with that signature)
+        self._observed: Dict[str, Tuple[FileSignature, float]] = {}
+        # path -> signature already grouped, skipped or processed
+        self._claimed: Dict[str, FileSignature] = {}
+        self._digests: Dict[Tuple[str, FileSignature], str] = {}
+        self._groups: Dict[Tuple[str, str], _Group] = {}
+        self._running: Dict[Future, Tuple[_Group, str, float]] = {}
+
+    def busy(self) -> bool:
+        """Whether files are settling, groups are open or jobs are running"""
+        unsettled = any(self._claimed.get(path) != signature
+                        for path, (signature, _) in self._observed.items())
+        return bool(unsettled or self._groups or self._running)
+
+    def poll(self, flush: bool = False) -> int:
+        """Scan once, start the groups that are complete; returns the number started
+
+        With ``flush``, open groups are started without waiting for their
+        window to close (settling files are still waited for).
+        """
+        now = time.time()
+        self._finish_done()
+        present = set()
+        for rule in self.rules:
+            for path, signature in self._scan(rule):
+                present.add(path)
+                self._observe(rule, path, signature, now)
+        self._forget(present)
+        started = 0
+        for group_id, group in list(self._groups.items()):
+            if flush or self._closed(group, now):
+                del self._groups[group_id]
+                self._start(group, now)
+                started += 1
+        return started
+
+    def run(self, poll_seconds: float = DEFAULT_POLL_SECONDS, once: bool = False,
+            stop: Optional[threading.Event] = None) -> None:
+        """Poll until ``stop`` is set; with ``once``, until everything present has been processed"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            settling = once and any(self._claimed.get(path) != signature
+                                    for path, (signature, _) in self._observed.items())
+            self.poll(flush=once and not settling)
+            if once and not self.busy():
+                return
+            stop.wait(poll_seconds)
+
+    def close(self) -> None:
+        """Wait for running jobs and record their outcome"""
+        self._executor.shutdown(wait=True)
+        self._finish_done()
+
+    # Scanning
+    def _scan(self, rule: WatchRule) -> List[Tuple[str, FileSignature]]:
+        try:
+            entries = list(os.scandir(rule.path))
+        except FileNotFoundError:
+            return []
+        found = []
+        for entry in entries:
+            if not rule.matches(entry.name):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue  # removed while scanning
+            found.append((entry.path, (st.st_size, st.st_mtime_ns)))
+        return found
+
+    def _observe(self, rule: WatchRule, path: str, signature: FileSignature, now: float) -> None:
+        if self._claimed.get(path) == signature:
+            return
+        observed = self._observed.get(path)
+        if observed is None or observed[0] != signature:
+            self._observed[path] = (signature, now)
+            return
+        # Unchanged for settle_seconds, and not touched for as long either
+        # (copies that keep the source's old mtime still change size)
+        if now - observed[1] < rule.settle_seconds or now - signature[1] / 1e9 < rule.settle_seconds:
+            return
+
+        self._claimed[path] = signature
+        try:
+            digest = self._digest(path, signature)
+        except OSError:
+            return
+        if self.store.seen(rule.name, digest) or self._pending(rule, digest):
+            return
+        key = rule.group_key(path)
+        group = self._groups.get((rule.name, key))
+        if group is None:
+            group = self._groups[(rule.name, key)] = _Group(rule, key, opened=now, updated=now)
+        group.files.append((path, digest))
+        group.updated = now
+
+    def _forget(self, present: set) -> None:
+        """Drop the state of files that have been removed"""
+        gone = [path for path in self._observed if path not in present]
+        for path in gone:
+            del self._observed[path]
+            self._claimed.pop(path, None)
+        if gone:
+            self._digests = {key: digest for key, digest in self._digests.items() if key[0] in present}
+
+    def _digest(self, path: str, signature: FileSignature) -> str:
+        digest = self._digests.get((path, signature))
+        if digest is None:
+            digest = self._digests[(path, signature)] = file_digest(path)
+        return digest
+
+    def _pending(self, rule: WatchRule, digest: str) -> bool:
+        """Whether identical content is already waiting or running for ``rule``"""
+        groups = list(self._groups.values()) + [group for group, _, _ in self._running.values()]
+        return any(group.rule is rule and any(d == digest for _, d in group.files) for group in groups)
+
+    def _closed(self, group: _Group, now: float) -> bool:
+        if group.rule.group_by == 'file':
+            return True
+        if group.rule.group_by == 'prefix':
+            return now - group.updated >= group.rule.window_seconds
+        return now - group.opened >= group.rule.window_seconds
+
+    # Processing
+    def _output_file(self, group: _Group, now: float) -> str:
+        stamp = time.localtime(now)
+        return group.rule.output.format(group=group.label, count=len(group.files),
+                                        date=time.strftime("%Y%m%d", stamp),
+                                        time=time.strftime("%H%M%S", stamp))
+
+    def _start(self, group: _Group, now: float) -> None:
+        group.files.sort(key=lambda item: os.path.basename(item[0]))
+        try:
+            output_file = self._output_file(group, now)
+        except (KeyError, IndexError, ValueError) as e:
+            self._report(group, "", now, error=f"Invalid output template: {e}")
+            return
+        if os.path.dirname(output_file):
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        job = dict(group.rule.options)
+        job.update(type=group.rule.type, inputs=[path for path, _ in group.files], output=output_file)
+        future = self._executor.submit(run_job, job)
+        self._running[future] = (group, output_file, time.perf_counter())
+
+    def _finish_done(self) -> None:
+        for future in [future for future in self._running if future.done()]:
+            group, output_file, started = self._running.pop(future)
+            error = future.exception()
+            self._report(group, output_file, started,
+                         error=(str(error) or type(error).__name__) if error is not None else None)
+
+    def _report(self, group: _Group, output_file: str, started: float, error: Optional[str] = None) -> None:
+        rule = group.rule
+        if error is None:
+            self.store.record(rule.name, group.files, "done", output=output_file)
+            try:
+                # Outputs written into a watched folder must not come back as inputs
+                self.store.record(rule.name, [(output_file, file_digest(output_file))], "output")
+            except OSError:
+                pass
+        else:
+            self.store.record(rule.name, group.files, "failed", output=output_file or None, error=error)
+        summary = {
+            "folder": rule.name,
+            "group": group.label,
+            "type": rule.type,
+            "inputs": [path for path, _ in group.files],
+            "output": output_file,
+            "status": "failed" if error is not None else "ok",
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        if error is not None:
+            summary["error"] = error
+        if self.on_done is not None:
+            self.on_done(summary)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Merge or convert files dropped into watched folders")
+    parser.add_argument("config", help="JSON or YAML watch configuration")
+    parser.add_argument("--once", action="store_true",
+                        help="process what is there now, without waiting for group windows, then exit")
+    parser.add_argument("--workers", type=int, help="groups processed at once (overrides the configuration)")
+    parser.add_argument("--poll", type=float, help="seconds between folder scans (overrides the configuration)")
+    parser.add_argument("--metrics", metavar="FILE", help="append JSON-lines timings of each job to FILE")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        pdf_metrics.configure(args.metrics)
+
+    try:
+        config = load_watch_config(args.config)
+    except (OSError, ValueError, ManifestError) as e:
+        print(f"Invalid configuration: {e}", file=sys.stderr)
+        return 2
+
+    def report(summary: Dict[str, Any]) -> None:
+        print(json.dumps(summary), flush=True)
+
+    store = ProcessedStore(config.get("state") or default_state_path())
+    watcher = FolderWatcher(config["rules"], store,
+                            workers=args.workers or config.get("workers") or DEFAULT_WORKERS,
+                            on_done=report)
+    if not args.once:
+        folders = ", ".join(rule.path for rule in watcher.rules)
+        print(f"Watching {folders}", file=sys.stderr)
+    try:
+        watcher.run(args.poll or config.get("poll_seconds") or DEFAULT_POLL_SECONDS, once=args.once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
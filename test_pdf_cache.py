@@ -0,0 +1,46 @@
+"""Tests for the conversion cache in pdf_cache: run with ``python -m pytest``"""
+
+import os
+
+import pdf_cache
+from pdf_cache import ConversionCache
+
+
+def _pdf(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"%" * size)
+    return str(path)
+
+
+def _entries(cache):
+    return sorted(name for _, _, names in os.walk(cache.root) for name in names)
+
+
+def test_puts_do_not_walk_the_cache_until_it_is_full(tmp_path, monkeypatch):
+    cache = ConversionCache(str(tmp_path / "cache"), max_bytes=1000)
+    walks = []
+    original_walk = os.walk
+    monkeypatch.setattr(pdf_cache.os, 'walk', lambda root: walks.append(root) or original_walk(root))
+
+    for i in range(10):
+        cache.put(f"{i:02d}" * 32, _pdf(tmp_path, f"{i}.pdf", 100))
+    assert len(walks) == 1  # the first put learns the size
+
+    cache.put("aa" * 32, _pdf(tmp_path, "a.pdf", 100))
+    assert len(walks) == 2
+    monkeypatch.undo()
+    assert len(_entries(cache)) == 9  # trimmed to 90% of the cap, not just under it
+    assert cache.get("00" * 32) is None and cache.get("01" * 32) is None
+    assert cache.get("aa" * 32) is not None
+
+
+def test_pinned_entries_survive_until_released(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"), max_bytes=250)
+    keys = [f"{i:02d}" * 32 for i in range(4)]
+    cache.pin(keys)
+    for i, key in enumerate(keys):
+        cache.put(key, _pdf(tmp_path, f"{i}.pdf", 100))
+    assert all(cache.get(key) for key in keys)
+
+    cache.release(keys)
+    assert len(_entries(cache)) == 2
@@ -0,0 +1,67 @@
+"""Tests for pdf_compact: run with ``python -m pytest``"""
+
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+from pdf_compact import CompactOptions, compact_pdf
+
+
+def _stream(data, **entries):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    for key, value in entries.items():
+        stream[NameObject('/' + key)] = value
+    return stream
+
+
+def _write_sample(path):
+    """One page drawing a raw RGB image, with an unfiltered embedded font"""
+    writer = PdfWriter()
+    page = PageObject.create_blank_page(None, 200, 200)
+    image = writer._add_object(_stream(
+        bytes(range(256)) * 48, Type=NameObject('/XObject'), Subtype=NameObject('/Image'),
+        Width=NumberObject(64), Height=NumberObject(64), ColorSpace=NameObject('/DeviceRGB'),
+        BitsPerComponent=NumberObject(8)))
+    font_file = writer._add_object(_stream(b"\0" * 4096, Length1=NumberObject(4096)))
+    descriptor = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/FontDescriptor'),
+        NameObject('/FontName'): NameObject('/Sample'),
+        NameObject('/FontFile2'): font_file,
+    }))
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/TrueType'),
+        NameObject('/BaseFont'): NameObject('/Sample'),
+        NameObject('/FontDescriptor'): descriptor,
+    }))
+    page[NameObject('/Resources')] = DictionaryObject({
+        NameObject('/XObject'): DictionaryObject({NameObject('/Im0'): image}),
+        NameObject('/Font'): DictionaryObject({NameObject('/F0'): font}),
+    })
+    page[NameObject('/Contents')] = writer._add_object(_stream(b"q 64 0 0 64 0 0 cm /Im0 Do Q"))
+    writer.add_page(page)
+    with open(path, 'wb') as out:
+        writer.write(out)
+
+
+def _dictionaries(path):
+    page = PdfReader(path).pages[0]
+    image = page['/Resources']['/XObject']['/Im0'].get_object()
+    font_file = page['/Resources']['/Font']['/F0']['/FontDescriptor']['/FontFile2'].get_object()
+    strip = ('/Length', '/Filter')
+    return ({key: value for key, value in image.items() if key not in strip}, image.get_data(),
+            {key: value for key, value in font_file.items() if key not in strip}, font_file.get_data())
+
+
+def test_compaction_keeps_stream_dictionaries(tmp_path):
+    source = str(tmp_path / "in.pdf")
+    output = str(tmp_path / "out.pdf")
+    _write_sample(source)
+
+    result = compact_pdf(source, output, options=CompactOptions())
+
+    assert result.objects_packed > 0
+    assert _dictionaries(output) == _dictionaries(source)
+    image = PdfReader(output).pages[0]['/Resources']['/XObject']['/Im0'].get_object()
+    assert image['/Filter'] == '/FlateDecode'
+    assert image['/Subtype'] == '/Image'
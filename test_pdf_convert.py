@@ -0,0 +1,72 @@
+"""Tests for the resident LibreOffice pool in pdf_convert: run with ``python -m pytest``
+
+soffice is not needed: the office processes are stand-ins.
+"""
+
+import subprocess
+import sys
+import threading
+import time
+
+import pdf_convert
+from pdf_convert import OfficeProcess, ResidentLibreOfficePool
+
+# A process that ignores SIGTERM, like an office stuck in a UNO call
+STUBBORN = [sys.executable, '-c',
+            "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print(flush=True); time.sleep(60)"]
+
+
+class _HungDesktop:
+    def terminate(self):
+        threading.Event().wait()
+
+
+def _office(command, desktop=None):
+    office = OfficeProcess('soffice', '/nonexistent')
+    office.proc = subprocess.Popen(command, stdout=subprocess.PIPE)
+    office.proc.stdout.readline()  # started, and SIGTERM is ignored from here on
+    office.desktop = desktop
+    return office
+
+
+def test_kill_does_not_wait_on_a_hung_office(monkeypatch):
+    monkeypatch.setattr(pdf_convert, 'OFFICE_STOP_TIMEOUT_SECONDS', 0.5)
+    office = _office(STUBBORN, desktop=_HungDesktop())
+    proc = office.proc
+
+    started = time.monotonic()
+    office.kill()
+
+    assert time.monotonic() - started < 5
+    assert proc.returncode is not None
+    assert office.proc is None and office.desktop is None
+
+
+def test_stop_bounds_the_uno_shutdown(monkeypatch):
+    monkeypatch.setattr(pdf_convert, 'OFFICE_STOP_TIMEOUT_SECONDS', 0.5)
+    office = _office(STUBBORN, desktop=_HungDesktop())
+    proc = office.proc
+
+    started = time.monotonic()
+    office.stop()
+
+    assert time.monotonic() - started < 5
+    assert proc.returncode is not None
+
+
+def test_sequential_conversions_reuse_one_office(monkeypatch, tmp_path):
+    used = []
+
+    def convert(office, input_file, pdf_file, timeout, cancel=None):
+        used.append(office)
+        open(pdf_file, 'wb').close()
+
+    monkeypatch.setattr(OfficeProcess, 'convert', convert)
+    pool = ResidentLibreOfficePool('soffice', workers=4)
+    try:
+        for name in ("a", "b", "c"):
+            pool.convert_one(str(tmp_path / f"{name}.pptx"), str(tmp_path))
+    finally:
+        pool.close()
+
+    assert len(used) == 3 and len(set(map(id, used))) == 1
@@ -0,0 +1,37 @@
+"""Tests for pdf_io: run with ``python -m pytest``"""
+
+import os
+import stat
+
+import pytest
+
+from pdf_io import _UMASK, replacing
+
+
+def test_concurrent_replacing_writes_do_not_collide(tmp_path):
+    path = str(tmp_path / "out.pdf")
+
+    with replacing(path) as first, replacing(path) as second:
+        assert first != second
+        with open(first, 'wb') as out:
+            out.write(b"first")
+        with open(second, 'wb') as out:
+            out.write(b"second")
+
+    assert open(path, 'rb').read() == b"first"  # the outer block finished last
+    assert os.listdir(tmp_path) == ["out.pdf"]
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~_UMASK
+
+
+def test_failed_write_leaves_the_old_file(tmp_path):
+    path = tmp_path / "out.pdf"
+    path.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError):
+        with replacing(str(path)) as partial_file:
+            with open(partial_file, 'wb') as out:
+                out.write(b"new")
+            raise RuntimeError
+
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["out.pdf"]
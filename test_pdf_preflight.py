@@ -0,0 +1,70 @@
+"""Tests for pdf_preflight and merging with a pre-flight check: run with ``python -m pytest``"""
+
+import json
+import os
+from dataclasses import asdict
+
+from PyPDF2 import PdfReader, PdfWriter
+
+import pdf_preflight
+from pdf_engine import merge
+from pdf_preflight import PreflightOptions, XrefSnapshot, check_file
+
+
+def _write_pages(path, widths):
+    """A PDF with one blank page per width, so pages can be told apart by size"""
+    writer = PdfWriter()
+    for width in widths:
+        writer.add_blank_page(width, 100)
+    with open(path, 'wb') as out:
+        writer.write(out)
+
+
+def _widths(path):
+    return [int(page.mediabox.width) for page in PdfReader(path).pages]
+
+
+def test_merge_opens_inputs_from_worker_snapshots(tmp_path, monkeypatch):
+    inputs = [str(tmp_path / name) for name in ("a.pdf", "b.pdf", "c.pdf")]
+    for path, widths in zip(inputs, ([101, 102], [201], [301, 302, 303])):
+        _write_pages(path, widths)
+    (tmp_path / "bad.pdf").write_bytes(b"%PDF-1.4\nnot really\n")
+    opened = []
+    original_open = XrefSnapshot.open
+    monkeypatch.setattr(XrefSnapshot, 'open', lambda self: opened.append(self.path) or original_open(self))
+
+    for streaming in (False, True):
+        output = str(tmp_path / f"out-{streaming}.pdf")
+        opened.clear()
+        result = merge(inputs[:2] + [str(tmp_path / "bad.pdf"), inputs[2]], output, streaming=streaming,
+                       preflight=PreflightOptions(workers=2))
+
+        assert _widths(output) == [101, 102, 201, 301, 302, 303]
+        assert opened == inputs
+        assert [check.path for check in result.preflight.quarantined] == [str(tmp_path / "bad.pdf")]
+        json.dumps(asdict(result))  # the snapshots are not part of the result
+
+
+def test_snapshot_reader_matches_a_fresh_parse(tmp_path):
+    path = str(tmp_path / "a.pdf")
+    _write_pages(path, [101, 102, 103])
+
+    check = check_file(path)
+    reader = check.xref.open()
+
+    assert isinstance(reader, pdf_preflight._SnapshotReader)
+    fresh = PdfReader(path)
+    assert reader.xref == fresh.xref
+    assert reader.trailer['/Root']['/Pages']['/Count'] == 3
+    assert [int(page.mediabox.width) for page in reader.pages] == [101, 102, 103]
+
+
+def test_snapshot_of_a_changed_file_is_not_used(tmp_path):
+    path = str(tmp_path / "a.pdf")
+    _write_pages(path, [101])
+    check = check_file(path)
+
+    _write_pages(path, [201, 202])
+    os.utime(path, ns=(check.xref.mtime_ns + 10 ** 9, check.xref.mtime_ns + 10 ** 9))
+
+    assert check.xref.open() is None
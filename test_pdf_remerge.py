@@ -0,0 +1,84 @@
+"""Tests for incremental re-merging (pdf_engine.merge with incremental=True): run with ``python -m pytest``"""
+
+import os
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import DictionaryObject
+
+import pdf_compact
+import pdf_engine
+from pdf_compact import CompactOptions
+from pdf_remerge import load_merge_manifest
+
+
+def _write_pages(path, widths):
+    """A PDF with one blank page per width, so pages can be told apart by size"""
+    writer = PdfWriter()
+    for width in widths:
+        writer.add_blank_page(width, 100)
+    with open(path, 'wb') as out:
+        writer.write(out)
+
+
+def _widths(path):
+    return [int(page.mediabox.width) for page in PdfReader(path).pages]
+
+
+def _renumbering_linearize(qpdf, input_file, output_file, object_streams):
+    """Stands in for qpdf --linearize, which renumbers every object"""
+    reader = PdfReader(input_file)
+    writer = PdfWriter()
+    writer._add_object(DictionaryObject())  # shift every number by one
+    for page in reversed(reader.pages):
+        writer.insert_page(page, 0)
+    with open(output_file, 'wb') as out:
+        writer.write(out)
+
+
+def test_remerge_after_linearization(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_compact, 'find_qpdf', lambda: 'qpdf')
+    monkeypatch.setattr(pdf_engine, 'find_qpdf', lambda: 'qpdf')
+    monkeypatch.setattr(pdf_compact, '_linearize', _renumbering_linearize)
+    inputs = [str(tmp_path / name) for name in ("a.pdf", "b.pdf", "c.pdf")]
+    for path, widths in zip(inputs, ([101, 102], [201], [301, 302, 303])):
+        _write_pages(path, widths)
+    output = str(tmp_path / "out.pdf")
+
+    result = pdf_engine.merge(inputs, output, incremental=True, compact=CompactOptions(linearize=True))
+    assert result.compacted.linearized
+    assert load_merge_manifest(output) is None
+
+    _write_pages(inputs[1], [211, 212])
+    result = pdf_engine.merge(inputs, output, incremental=True)
+    assert result.reused_files == []
+    assert _widths(output) == [101, 102, 211, 212, 301, 302, 303]
+
+    # Without linearization the manifest is kept and the next run reuses segments
+    _write_pages(inputs[2], [321])
+    result = pdf_engine.merge(inputs, output, incremental=True)
+    assert result.reused_files == inputs[:2]
+    assert _widths(output) == [101, 102, 211, 212, 321]
+
+
+def test_up_to_date_output_is_still_compacted(tmp_path):
+    inputs = [str(tmp_path / name) for name in ("a.pdf", "b.pdf")]
+    for path, widths in zip(inputs, ([101], [201, 202])):
+        _write_pages(path, widths)
+    output = str(tmp_path / "out.pdf")
+    pdf_engine.merge(inputs, output, incremental=True)
+    size = os.path.getsize(output)
+
+    result = pdf_engine.merge(inputs, output, incremental=True, compact=CompactOptions(object_streams=True))
+
+    assert result.reused_files == inputs
+    assert result.compacted is not None and result.compacted.objects_packed > 0
+    assert b"/ObjStm" in open(output, 'rb').read()
+    assert result.compacted.original_bytes == size
+    assert _widths(output) == [101, 201, 202]
+    assert load_merge_manifest(output) is not None
+
+    # The compacted output is still a valid base for an incremental update
+    _write_pages(inputs[1], [211])
+    result = pdf_engine.merge(inputs, output, incremental=True)
+    assert result.reused_files == inputs[:1]
+    assert _widths(output) == [101, 211]
@@ -0,0 +1,70 @@
+"""Tests for page selection expressions in pdf_select: run with ``python -m pytest``"""
+
+import pytest
+
+from pdf_select import SelectionError, compile_selection, runs
+
+
+def _pages(expression, total_pages=10):
+    """1-based page numbers selected by ``expression``, in output order"""
+    return [i + 1 for i in compile_selection(expression).resolve(total_pages)]
+
+
+@pytest.mark.parametrize("expression, pages", [
+    ("7", [7]),
+    ("3-5", [3, 4, 5]),
+    ("5-3", [5, 4, 3]),
+    ("8-", [8, 9, 10]),
+    ("-1", [10]),
+    ("-3--1", [8, 9, 10]),
+    ("-1--3", [10, 9, 8]),
+    ("2--2", [2, 3, 4, 5, 6, 7, 8, 9]),
+    ("1-10:3", [1, 4, 7, 10]),
+    ("10-1:4", [10, 6, 2]),
+    ("odd", [1, 3, 5, 7, 9]),
+    ("even", [2, 4, 6, 8, 10]),
+    ("3-8:even", [4, 6, 8]),
+    ("8-3:odd", [7, 5, 3]),
+    ("1-10:3:odd", [1, 7]),
+    ("10-1:3:even", [10, 4]),
+    ("all:4", [1, 5, 9]),
+    ("all, !4, !6-9", [1, 2, 3, 5, 10]),
+    ("1-3, 8, reverse", [8, 3, 2, 1]),
+    ("1-3\n5 - 6, ODD : 5", [1, 2, 3, 5, 6, 1]),
+])
+def test_grammar(expression, pages):
+    assert _pages(expression) == pages
+
+
+def test_list_of_lines_is_one_expression():
+    assert _pages(["1-2", "!2", "9"]) == [1, 9]
+
+
+def test_groups_keep_items_apart():
+    groups = compile_selection("1-3, 5, reverse").groups(10)
+    assert [list(group) for group in groups] == [[4], [2, 1, 0]]
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("a-b", "Invalid range format: a-b\nUse format: start-end (e.g., 1-5)"),
+    ("1-5:x", "Invalid filter in 1-5:x\nUse :N, :odd, :even or :N:odd (e.g., 1-20:3:odd)"),
+    ("1-5:odd:2", "Invalid filter in 1-5:odd:2\nUse :N, :odd, :even or :N:odd (e.g., 1-20:3:odd)"),
+    ("odd:even", "Invalid filter in odd:even: odd pages cannot be filtered again"),
+    ("1-5:0", "Invalid step in 1-5:0"),
+    ("0-3", "Invalid page range: 0-3"),
+    ("!3", "No valid page ranges found"),
+    ("11", "Page 11 is out of range (1-10)"),
+    ("5-12", "Range 5-12 exceeds total pages (10)"),
+    ("-11--1", "Range -11--1 exceeds total pages (10)"),
+    ("10-1:2:odd", "The selection does not include any pages"),
+    ("1-3, !1-3", "The selection does not include any pages"),
+])
+def test_errors(expression, message):
+    with pytest.raises(SelectionError) as error:
+        _pages(expression)
+    assert str(error.value) == message
+
+
+def test_runs():
+    assert runs([0, 1, 2, 5, 4, 3, 7, 9]) == [(0, 2), (5, 3), (7, 7), (9, 9)]
+    assert runs([]) == []
@@ -0,0 +1,100 @@
+"""Tests for pdf_server: run with ``python -m pytest``"""
+
+import http.client
+import json
+import threading
+
+import pytest
+from PyPDF2 import PdfReader, PdfWriter
+
+from pdf_server import MAX_REQUEST_BYTES, JobServer
+
+
+def _write_pages(path, count):
+    writer = PdfWriter()
+    for _ in range(count):
+        writer.add_blank_page(100, 100)
+    with open(path, 'wb') as out:
+        writer.write(out)
+
+
+@pytest.fixture
+def serve(tmp_path):
+    servers = []
+
+    def start(output_dir=None):
+        server = JobServer(("127.0.0.1", 0), workers=1, max_pending=2, output_dir=output_dir)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.server_port
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _post(port, body, content_type="application/json", host=None, length=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    data = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+    connection.putrequest("POST", "/jobs", skip_host=host is not None)
+    if host is not None:
+        connection.putheader("Host", host)
+    connection.putheader("Content-Type", content_type)
+    connection.putheader("Content-Length", str(len(data) if length is None else length))
+    connection.endheaders(data if length is None else b"")
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def test_streams_the_merged_pdf_back(serve, tmp_path):
+    source = str(tmp_path / "a.pdf")
+    _write_pages(source, 2)
+
+    response, body = _post(serve(), {"type": "merge", "inputs": [source, source]})
+
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "application/pdf"
+    assert body.startswith(b"%PDF-")
+
+
+def test_refuses_requests_a_web_page_could_send(serve, tmp_path):
+    port = serve(output_dir=str(tmp_path))
+    job = {"type": "merge", "inputs": [str(tmp_path / "a.pdf")]}
+
+    response, _ = _post(port, json.dumps(job).encode('utf-8'), content_type="text/plain")
+    assert response.status == 415
+    assert response.getheader("Connection") == "close"
+
+    response, _ = _post(port, job, host=f"attacker.example:{port}")
+    assert response.status == 403
+
+
+def test_oversized_body_closes_the_connection(serve):
+    response, body = _post(serve(), b"", length=MAX_REQUEST_BYTES + 1)
+
+    assert response.status == 400
+    assert response.getheader("Connection") == "close"
+    assert json.loads(body)["error"]
+
+
+def test_outputs_stay_inside_the_output_folder(serve, tmp_path):
+    source = str(tmp_path / "a.pdf")
+    _write_pages(source, 2)
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    job = {"type": "merge", "inputs": [source]}
+
+    response, _ = _post(serve(), dict(job, output=str(tmp_path / "b.pdf")))
+    assert response.status == 403
+    assert not (tmp_path / "b.pdf").exists()
+
+    port = serve(output_dir=str(outputs))
+    for escape in ("../b.pdf", str(tmp_path / "b.pdf")):
+        response, _ = _post(port, dict(job, output=escape))
+        assert response.status == 403
+    assert not (tmp_path / "b.pdf").exists()
+
+    response, body = _post(port, dict(job, output="merged/b.pdf"))
+    assert response.status == 200, body
+    assert len(PdfReader(str(outputs / "merged" / "b.pdf")).pages) == 2